@@ -0,0 +1,86 @@
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import FileResponse, PlainTextResponse
+from sqlmodel import Session
+from ..core.cache import response_cache
+from ..core.instrumentation import InstrumentedRoute
+from ..core.profiling import collapsed, profiler
+from ..db.database import get_session
+from ..services.activity import run_retention
+from ..services.generation_cache import generation_cache
+from ..services.history import backfill_transitions
+
+def require_admin(x_admin_token: str | None = Header(default=None)):
+    """Every /admin route needs `X-Admin-Token` equal to PROFILE_TOKEN; without one configured they are off."""
+    if not profiler.token:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled; set PROFILE_TOKEN")
+    if not profiler.authorised(x_admin_token):
+        raise HTTPException(status_code=403, detail="Invalid or missing X-Admin-Token")
+
+router = APIRouter(prefix="/admin", tags=["admin"], route_class=InstrumentedRoute,
+                   dependencies=[Depends(require_admin)])
+
+@router.get("/cache")
+def cache_stats():
+    """Hit/miss/eviction counters and current size of the response cache."""
+    return response_cache.info()
+
+@router.delete("/cache")
+def cache_clear():
+    response_cache.clear()
+    return {"ok": True}
+
+@router.get("/generation-cache")
+def generation_cache_stats():
+    """Hit rate and size of the LLM generation cache."""
+    return generation_cache.info()
+
+@router.delete("/generation-cache")
+def generation_cache_clear():
+    generation_cache.clear()
+    return {"ok": True}
+
+@router.post("/activity/compact")
+def activity_compact(retention_days: int | None = None, backfill: bool = True, session: Session = Depends(get_session)):
+    """Attribute project_id=0 task entries, then fold entries older than the retention window into daily summaries."""
+    return run_retention(session, retention_days, backfill=backfill)
+
+@router.post("/history/backfill")
+def history_backfill(project_id: int | None = None, session: Session = Depends(get_session)):
+    """Seed status history for tasks changed before transitions were recorded, then rebuild their daily flow."""
+    out = backfill_transitions(session, project_id)
+    session.commit()
+    return out
+
+@router.get("/profiles")
+def profiles():
+    """Stored endpoint profiles, newest first (see PROFILE_TOKEN / PROFILE_SAMPLE_EVERY)."""
+    return {"enabled": profiler.enabled, "keep": profiler.keep, "profiles": profiler.list()}
+
+@router.delete("/profiles")
+def profiles_clear():
+    return {"deleted": profiler.clear()}
+
+def _profile(profile_id: str):
+    doc = profiler.load(profile_id)
+    if doc is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return doc
+
+@router.get("/profiles/{profile_id}")
+def profile_detail(profile_id: str):
+    """Top functions by cumulative time and the call tree from the endpoint down."""
+    return _profile(profile_id)
+
+@router.get("/profiles/{profile_id}/collapsed", response_class=PlainTextResponse)
+def profile_collapsed(profile_id: str):
+    """Folded stacks for flamegraph.pl / speedscope."""
+    tree = _profile(profile_id).get("tree")
+    return collapsed(tree) if tree else ""
+
+@router.get("/profiles/{profile_id}/pstats")
+def profile_pstats(profile_id: str):
+    """Raw cProfile dump, for pstats, snakeviz or gprof2dot."""
+    path = profiler.pstats_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
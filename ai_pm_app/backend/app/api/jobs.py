@@ -0,0 +1,31 @@
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+from ..core.instrumentation import InstrumentedRoute
+from ..services.jobs import QueueFull, job_queue
+
+router = APIRouter(prefix="/jobs", tags=["jobs"], route_class=InstrumentedRoute)
+
+class GenerateJobReq(BaseModel):
+    vision: str
+    bypass_cache: bool = False
+
+@router.post("/generate", status_code=202)
+def submit_generate(req: GenerateJobReq):
+    """Queue a plan generation and return at once; poll GET /jobs/{id} for the project id."""
+    try:
+        job = job_queue.submit(req.vision, use_cache=not req.bypass_cache)
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    return {"job_id": job.id, "status": job.status, "url": f"/jobs/{job.id}"}
+
+@router.get("")
+def jobs_info():
+    """Worker, queue-depth and outcome counters of the generation pool."""
+    return job_queue.info()
+
+@router.get("/{job_id}")
+def get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.as_dict()
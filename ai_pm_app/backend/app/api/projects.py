@@ -1,22 +1,56 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Literal
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from sqlmodel import Session, select
-from ..db.database import get_session
+from ..core.cache import cached_response
+from ..core.instrumentation import InstrumentedRoute
+from ..db.database import get_session, get_read_session, read_engine
 from ..models.entities import Project, Outcome, Benefit, Deliverable, Task, BudgetLine, GovernanceEvent, ReportSpec, Risk, ActivityLog, TaskState
-from ..models.propagation_schemas import PropagationRequest, ApplyRequest
-from ..services.generator import generate_and_persist
+from ..models.propagation_schemas import PropagationRequest, ApplyRequest, ApplyResult
+from ..models.schemas import GenProject, GenValidationError
+from ..services.generator import generate_and_persist, persist_many
 from ..services.propagation import preview_propagation, apply_suggestions
-
-router = APIRouter(prefix="/projects", tags=["projects"])
+from ..services.hierarchy import load_project_snapshot
+from ..services.scheduling import ScheduleCycleError
+from ..services.versioning import bump_version
+from ..services.tasks import apply_patch, bulk_patch
+from ..services.activity import list_activity
+from ..services.history import (record_transitions, board_as_of, flow_by_day, done_points_from_flow,
+                                sprint_flow)
+from ..services.export import COLUMNS, ENCODERS, MEDIA_TYPES, tree_rows, backlog_rows, timeline_rows
+from ..services.panels import (PANELS, build_dashboard, kpis_panel, budget_panel, risk_panel,
+                               tree_panel, backlog_panel, timeline_panel)
+from ..services.agile import (total_points, done_points_by_day, scope_changes_by_day,
+                              burn_down, burn_up, velocity as sprint_velocity)
+from ..services.rollups import (get_rollup, rebuild_rollup, ensure_rollup, record_activity, record_status_change,
+                                project_id_for_task)
+
+router = APIRouter(prefix="/projects", tags=["projects"], route_class=InstrumentedRoute)
 
 class VisionReq(BaseModel):
     vision: str
+    bypass_cache: bool = False  # regenerate even if a cached plan exists
 
 @router.post("/generate")
 def generate_project(req: VisionReq, session: Session = Depends(get_session)):
-    new_id = generate_and_persist(session, req.vision)
+    try:
+        new_id = generate_and_persist(session, req.vision, use_cache=not req.bypass_cache)
+    except GenValidationError as e:
+        raise HTTPException(status_code=422, detail={"error": "Generated plan failed validation", "errors": e.errors})
     return {"project_id": new_id}
 
+class ImportReq(BaseModel):
+    projects: List[GenProject]
+
+@router.post("/import")
+def import_projects(req: ImportReq, session: Session = Depends(get_session)):
+    """Bulk onboarding: persist many GenProject documents in a single transaction."""
+    if not req.projects:
+        raise HTTPException(status_code=400, detail="No projects to import")
+    ids = persist_many(session, req.projects)
+    return {"project_ids": ids, "count": len(ids)}
+
 @router.post("/seed")
 def seed_project(session: Session = Depends(get_session)):
     p = Project(name="AI Rollout", vision="Use AI to streamline support", description="Demo seed")
@@ -48,202 +82,75 @@ def seed_project(session: Session = Depends(get_session)):
         ReportSpec(project_id=p.id, name="Weekly status", frequency="weekly", audience="PMO"),
         Risk(project_id=p.id, title="Hallucinations in responses", probability=3, impact=4, mitigation="Schema + validation"),
     ])
+    rebuild_rollup(session, p.id)
+    bump_version(session, p.id)
     session.commit()
     return {"project_id": p.id}
 
 @router.post("/{project_id}/propagate/preview")
-def propagate_preview(project_id: int, req: PropagationRequest, session: Session = Depends(get_session)):
+def propagate_preview(project_id: int, req: PropagationRequest, session: Session = Depends(get_read_session)):
     return preview_propagation(session, project_id, req)
 
-@router.post("/{project_id}/propagate/apply")
+@router.post("/{project_id}/propagate/apply", response_model=ApplyResult)
 def propagate_apply(project_id: int, req: ApplyRequest, session: Session = Depends(get_session)):
-    def fetch_old(op):
-        model_map = {
-            "project": Project, "outcome": Outcome, "benefit": Benefit,
-            "deliverable": Deliverable, "task": Task, "budget": BudgetLine, "risk": Risk
-        }
-        mdl = model_map.get(op.entity)
-        if not mdl:
-            return None
-        row = session.get(mdl, op.id)
-        return getattr(row, op.field, None) if row else None
-
-    # Snapshot old values
-    oldmap = []
-    for op in req.ops:
-        try:
-            oldmap.append((op, fetch_old(op)))
-        except Exception:
-            oldmap.append((op, None))
-
-    # Apply via service
-    applied = apply_suggestions(session, project_id, req)
-
-    # Write audit logs
-    for op, old in oldmap:
-        try:
-            session.add(ActivityLog(
-                project_id=project_id,
-                entity=op.entity,
-                entity_id=op.id,
-                field=op.field,
-                old_value=None if old is None else str(old),
-                new_value=None if op.new_value is None else str(op.new_value),
-            ))
-        except Exception:
-            pass
-    session.commit()
-    return {"applied": applied}
-
+    return apply_suggestions(session, project_id, req)
 
 @router.get("/{project_id}")
-def get_project_tree(project_id: int, session: Session = Depends(get_session)):
-    p = session.get(Project, project_id)
-    if not p:
+@cached_response("tree")
+def get_project_tree(project_id: int, session: Session = Depends(get_read_session)):
+    snap = load_project_snapshot(session, project_id, with_states=False)
+    if not snap:
         raise HTTPException(status_code=404, detail="Project not found")
-
-    out = {
-        "id": p.id, "name": p.name, "vision": p.vision, "description": p.description,
-        "outcomes": [], "budget": [], "governance": [], "reporting": [], "risks": [],
-    }
-
-    outcomes = session.exec(select(Outcome).where(Outcome.project_id==p.id)).all()
-    for o in outcomes:
-        o_dict = {"id": o.id, "name": o.name, "description": o.description, "benefits": []}
-        benefits = session.exec(select(Benefit).where(Benefit.outcome_id==o.id)).all()
-        for b in benefits:
-            b_dict = {"id": b.id, "name": b.name, "description": b.description, "deliverables": []}
-            dels = session.exec(select(Deliverable).where(Deliverable.benefit_id==b.id)).all()
-            for d in dels:
-                d_dict = {"id": d.id, "name": d.name, "description": d.description, "tasks": []}
-                tasks = session.exec(select(Task).where(Task.deliverable_id==d.id)).all()
-                for t in tasks:
-                    d_dict["tasks"].append({"id": t.id, "name": t.name, "est_days": t.est_days, "depends_on_id": t.depends_on_id})
-                b_dict["deliverables"].append(d_dict)
-            o_dict["benefits"].append(b_dict)
-        out["outcomes"].append(o_dict)
-
-    out["budget"] = [
-        {"id": bl.id, "item": bl.item, "amount": bl.amount, "category": bl.category}
-        for bl in session.exec(select(BudgetLine).where(BudgetLine.project_id==p.id)).all()
-    ]
-    out["governance"] = [
-        {"id": g.id, "name": g.name, "cadence": g.cadence, "owner": g.owner}
-        for g in session.exec(select(GovernanceEvent).where(GovernanceEvent.project_id==p.id)).all()
-    ]
-    out["reporting"] = [
-        {"id": r.id, "name": r.name, "frequency": r.frequency, "audience": r.audience}
-        for r in session.exec(select(ReportSpec).where(ReportSpec.project_id==p.id)).all()
-    ]
-    out["risks"] = [
-        {"id": r.id, "title": r.title, "probability": r.probability, "impact": r.impact, "mitigation": r.mitigation}
-        for r in session.exec(select(Risk).where(Risk.project_id==p.id)).all()
-    ]
-    return out
+    return tree_panel(snap)
 
 from datetime import datetime, timedelta, date
 
 @router.get("/{project_id}/kpis")
-def kpis(project_id: int, session: Session = Depends(get_session)):
+@cached_response("kpis")
+def kpis(project_id: int, session: Session = Depends(get_read_session)):
     p = session.get(Project, project_id)
     if not p:
         raise HTTPException(status_code=404, detail="Project not found")
-
-    # Outcomes
-    outcomes_list = session.exec(select(Outcome).where(Outcome.project_id == p.id)).all()
-    outcome_count = len(outcomes_list)
-
-    # Benefits, Deliverables, Tasks (count via .all() then len())
-    benefit_count = 0
-    deliverable_count = 0
-    task_count = 0
-    for o in outcomes_list:
-        benefits = session.exec(select(Benefit).where(Benefit.outcome_id == o.id)).all()
-        benefit_count += len(benefits)
-        for b in benefits:
-            dels = session.exec(select(Deliverable).where(Deliverable.benefit_id == b.id)).all()
-            deliverable_count += len(dels)
-            for d in dels:
-                tasks = session.exec(select(Task).where(Task.deliverable_id == d.id)).all()
-                task_count += len(tasks)
-
-    logs = session.exec(select(ActivityLog).where(ActivityLog.project_id == p.id)).all()
-
-    return {
-        "project_id": p.id,
-        "name": p.name,
-        "vision": p.vision,
-        "counts": {
-            "outcomes": outcome_count,
-            "benefits": benefit_count,
-            "deliverables": deliverable_count,
-            "tasks": task_count
-        },
-        "activity_applied": len(logs),
-        "schema_pass_rate": 1.0  # stub generator => always valid
-    }
+    return kpis_panel(p, get_rollup(session, p.id))
 
 
 @router.get("/{project_id}/budget/summary")
-def budget_summary(project_id: int, session: Session = Depends(get_session)):
+@cached_response("budget")
+def budget_summary(project_id: int, session: Session = Depends(get_read_session)):
     p = session.get(Project, project_id)
     if not p: raise HTTPException(status_code=404, detail="Project not found")
-    lines = session.exec(select(BudgetLine).where(BudgetLine.project_id==p.id)).all()
-    total = sum((bl.amount or 0) for bl in lines)
-    by_cat = {}
-    for bl in lines:
-        cat = bl.category or "Uncategorised"
-        by_cat[cat] = by_cat.get(cat, 0.0) + float(bl.amount or 0.0)
-    return {"project_id": p.id, "total": total, "by_category": by_cat, "count": len(lines)}
+    return budget_panel(p, get_rollup(session, p.id))
 
 @router.get("/{project_id}/risk/summary")
-def risk_summary(project_id: int, session: Session = Depends(get_session)):
+@cached_response("risk")
+def risk_summary(project_id: int, session: Session = Depends(get_read_session)):
     p = session.get(Project, project_id)
     if not p: raise HTTPException(status_code=404, detail="Project not found")
-    risks = session.exec(select(Risk).where(Risk.project_id==p.id)).all()
-    # 5x5 matrix (1..5)
-    matrix = {i:{j:0 for j in range(1,6)} for i in range(1,6)}
-    for r in risks:
-        pr = int(getattr(r, "probability", 0) or 0); im = int(getattr(r, "impact", 0) or 0)
-        pr = min(max(pr,1),5); im = min(max(im,1),5)
-        matrix[pr][im] += 1
-    return {"project_id": p.id, "count": len(risks), "matrix": matrix}
+    return risk_panel(p, get_rollup(session, p.id))
 
 @router.get("/{project_id}/timeline")
-def timeline(project_id: int, start: str | None = None, session: Session = Depends(get_session)):
+@cached_response("timeline")
+def timeline(project_id: int, start: str | None = None, session: Session = Depends(get_read_session)):
     """
-    Returns a simple, computed Gantt-friendly timeline using Task.est_days.
+    Returns a dependency-aware, Gantt-friendly timeline using Task.est_days.
     Optional query param ?start=YYYY-MM-DD sets the project start; default = today (UTC).
-    Tasks are sequenced per Deliverable in the order they exist.
+    Tasks are scheduled by critical-path analysis over Task.depends_on_id across the whole
+    project; each item carries earliest/latest start and finish, slack and a critical flag.
     """
-    p = session.get(Project, project_id)
-    if not p: raise HTTPException(status_code=404, detail="Project not found")
+    snap = load_project_snapshot(session, project_id, with_states=False, with_extras=False)
+    if not snap: raise HTTPException(status_code=404, detail="Project not found")
     try:
         t0 = date.fromisoformat(start) if start else datetime.utcnow().date()
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid ?start date")
 
-    plan = []
-    oc = session.exec(select(Outcome).where(Outcome.project_id==p.id)).all()
-    for o in oc:
-        bs = session.exec(select(Benefit).where(Benefit.outcome_id==o.id)).all()
-        for b in bs:
-            ds = session.exec(select(Deliverable).where(Deliverable.benefit_id==b.id)).all()
-            for d in ds:
-                cursor = t0
-                ts = session.exec(select(Task).where(Task.deliverable_id==d.id)).all()
-                for t in ts:
-                    days = int(getattr(t, "est_days", 1) or 1)
-                    start_d = cursor
-                    end_d = cursor + timedelta(days=max(days,1))
-                    plan.append({
-                        "deliverable_id": d.id, "deliverable": d.name,
-                        "task_id": t.id, "task": t.name,
-                        "start": start_d.isoformat(), "end": end_d.isoformat(),
-                        "duration_days": days
-                    })
-                    cursor = end_d  # chain tasks within a deliverable
-    return {"project_id": p.id, "start": t0.isoformat(), "items": plan}
+    try:
+        return timeline_panel(snap, t0)
+    except ScheduleCycleError as e:
+        raise HTTPException(status_code=409, detail={
+            "error": "Task dependencies form a cycle",
+            "task_ids": e.task_ids,
+        })
 
 
 from datetime import datetime, timedelta, date
@@ -256,19 +163,10 @@ class TaskPatch(BaseModel):
 @router.patch("/tasks/{task_id}")
 def patch_task(task_id: int, body: TaskPatch, session: Session = Depends(get_session)):
     t = session.get(Task, task_id)
-    if not t:
+    pid = project_id_for_task(session, task_id) if t else None
+    if pid is None:
         raise HTTPException(status_code=404, detail="Task not found")
-
-    # Update est_days
-    if body.est_days is not None:
-        old = t.est_days
-        t.est_days = int(max(1, body.est_days))
-        try:
-            session.add(ActivityLog(project_id=getattr(t, "project_id", 0),
-                                    entity="task", entity_id=task_id, field="est_days",
-                                    old_value=str(old), new_value=str(t.est_days)))
-        except Exception:
-            pass
+    ensure_rollup(session, pid)
 
     # Upsert TaskState for status/done
     ts = session.exec(select(TaskState).where(TaskState.task_id == task_id)).first()
@@ -276,143 +174,193 @@ def patch_task(task_id: int, body: TaskPatch, session: Session = Depends(get_ses
         ts = TaskState(task_id=task_id)
         session.add(ts)
         session.flush()
+    start_status = ts.status
 
-    changed = False
-    if body.status is not None:
-        old = ts.status
-        ts.status = body.status.lower()
-        ts.done = (ts.status == "done") if body.done is None else bool(body.done)
-        ts.updated_at = datetime.utcnow()
-        changed = True
-        try:
-            session.add(ActivityLog(project_id=0, entity="task", entity_id=task_id,
-                                    field="status", old_value=old, new_value=ts.status))
-        except Exception:
-            pass
-
-    if body.done is not None:
-        old = ts.done
-        ts.done = bool(body.done)
-        ts.status = "done" if ts.done else (ts.status if ts.status != "done" else "inprogress")
-        ts.updated_at = datetime.utcnow()
-        changed = True
-        try:
-            session.add(ActivityLog(project_id=0, entity="task", entity_id=task_id,
-                                    field="done", old_value=str(old), new_value=str(ts.done)))
-        except Exception:
-            pass
-
-    if changed or body.est_days is not None:
+    logs = apply_patch(t, ts, pid, est_days=body.est_days, status=body.status, done=body.done)
+    if logs:
         session.add(ts)
         session.add(t)
+        session.add_all([ActivityLog(**row) for row in logs])
+        record_activity(session, pid, len(logs))
+        record_status_change(session, pid, start_status, ts.status)
+        record_transitions(session, pid, [(task_id, start_status, ts.status, t.est_days)])
+        bump_version(session, pid)
         session.commit()
     return {"ok": True}
 
+class TaskPatchItem(TaskPatch):
+    task_id: int
+
+class BulkTaskPatch(BaseModel):
+    items: List[TaskPatchItem]
+    mode: Literal["atomic", "best_effort"] = "atomic"
+
+@router.patch("/{project_id}/tasks")
+def patch_tasks(project_id: int, body: BulkTaskPatch, session: Session = Depends(get_session)):
+    """
+    Sprint-board bulk update: many est_days/status/done patches in one transaction.
+    mode=atomic (default) rejects the whole batch with 422 if any item is invalid;
+    mode=best_effort applies the valid items and reports the rest per item.
+    """
+    if not session.get(Project, project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+    out = bulk_patch(session, project_id, body.items, atomic=(body.mode == "atomic"))
+    if not out["ok"] and body.mode == "atomic":
+        raise HTTPException(status_code=422, detail={"error": "Batch rejected; no task was changed", "results": out["results"]})
+    return out
+
 @router.get("/{project_id}/backlog")
-def backlog(project_id: int, session: Session = Depends(get_session)):
+@cached_response("backlog")
+def backlog(project_id: int, session: Session = Depends(get_read_session)):
+    snap = load_project_snapshot(session, project_id, with_extras=False)
+    if not snap:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return backlog_panel(snap)
+
+def _parse_start(start: str | None) -> date:
+    try:
+        return date.fromisoformat(start) if start else datetime.utcnow().date()
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid ?start date")
+
+@router.get("/{project_id}/burn")
+@cached_response("burn")
+def burn(project_id: int, start: str | None = None, sprint_days: int = 14, session: Session = Depends(get_read_session)):
     p = session.get(Project, project_id)
     if not p:
         raise HTTPException(status_code=404, detail="Project not found")
+    t0 = _parse_start(start)
 
-    rows = []
-    oc = session.exec(select(Outcome).where(Outcome.project_id == p.id)).all()
-    for o in oc:
-        bs = session.exec(select(Benefit).where(Benefit.outcome_id == o.id)).all()
-        for b in bs:
-            ds = session.exec(select(Deliverable).where(Deliverable.benefit_id == b.id)).all()
-            for d in ds:
-                tsks = session.exec(select(Task).where(Task.deliverable_id == d.id)).all()
-                for t in tsks:
-                    st = session.exec(select(TaskState).where(TaskState.task_id == t.id)).first()
-                    status = (st.status if st else "todo")
-                    done = bool(st.done) if st else False
-                    rows.append({
-                        "task_id": t.id, "task": t.name, "deliverable": d.name,
-                        "est_days": int(getattr(t, "est_days", 1) or 1),
-                        "status": status, "done": done
-                    })
-    cols = {"todo": [], "inprogress": [], "done": []}
-    for r in rows:
-        (cols[r["status"]] if r["status"] in cols else cols["todo"]).append(r)
-    return {"project_id": p.id, "columns": cols, "count": len(rows)}
+    # completion points are bucketed per day in SQL, then prefix-summed
+    out = burn_down(t0, sprint_days, total_points(session, p.id), done_points_by_day(session, p.id))
+    return {"project_id": p.id, **out}
 
-@router.get("/{project_id}/burn")
-def burn(project_id: int, start: str | None = None, sprint_days: int = 14, session: Session = Depends(get_session)):
+@router.get("/{project_id}/velocity")
+@cached_response("velocity")
+def velocity(project_id: int, start: str | None = None, sprint_days: int = 14, periods: int = 4, session: Session = Depends(get_read_session)):
     p = session.get(Project, project_id)
     if not p:
         raise HTTPException(status_code=404, detail="Project not found")
-    try:
-        t0 = date.fromisoformat(start) if start else datetime.utcnow().date()
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid ?start date")
+    t0 = _parse_start(start)
+    return {"project_id": p.id, **sprint_velocity(t0, sprint_days, periods, done_points_by_day(session, p.id))}
 
-    tasks = []
-    oc = session.exec(select(Outcome).where(Outcome.project_id == p.id)).all()
-    for o in oc:
-        bs = session.exec(select(Benefit).where(Benefit.outcome_id == o.id)).all()
-        for b in bs:
-            ds = session.exec(select(Deliverable).where(Deliverable.benefit_id == b.id)).all()
-            for d in ds:
-                tsks = session.exec(select(Task).where(Task.deliverable_id == d.id)).all()
-                for t in tsks:
-                    points = int(getattr(t, "est_days", 1) or 1)
-                    st = session.exec(select(TaskState).where(TaskState.task_id == t.id)).first()
-                    done_date = st.updated_at.date() if (st and st.done and st.updated_at) else None
-                    tasks.append({"points": points, "done_date": done_date})
-
-    total = sum(x["points"] for x in tasks) or 0
-    days = max(1, int(sprint_days))
-    labels = [(t0 + timedelta(days=i)) for i in range(days+1)]
+@router.get("/{project_id}/burnup")
+@cached_response("burnup")
+def burnup(project_id: int, start: str | None = None, sprint_days: int = 14, sprints: int = 4, session: Session = Depends(get_read_session)):
+    """Multi-sprint burn-up: scope line (from logged est_days changes) plus cumulative done line."""
+    p = session.get(Project, project_id)
+    if not p:
+        raise HTTPException(status_code=404, detail="Project not found")
+    t0 = _parse_start(start)
+    out = burn_up(t0, sprint_days, sprints, total_points(session, p.id),
+                  done_points_by_day(session, p.id), scope_changes_by_day(session, p.id))
+    return {"project_id": p.id, **out}
+
+@router.get("/{project_id}/history/board")
+@cached_response("history_board")
+def history_board(project_id: int, at: datetime | None = None, session: Session = Depends(get_read_session)):
+    """Board columns as of `at` (default now), replayed from the task status transitions."""
+    if not session.get(Project, project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+    return board_as_of(session, project_id, at or datetime.utcnow())
 
-    ideal = [round(total * (1 - i/days), 2) for i in range(days+1)]
-    actual = []
-    for dte in labels:
-        done_sum = sum(x["points"] for x in tasks if x["done_date"] and x["done_date"] <= dte)
-        actual.append(max(0, total - done_sum))
+@router.get("/{project_id}/history/burn")
+@cached_response("history_burn")
+def history_burn(project_id: int, start: str | None = None, sprint_days: int = 14, session: Session = Depends(get_read_session)):
+    """Burn-down from the daily flow rows: reopened tasks give their points back on the day they reopen."""
+    p = session.get(Project, project_id)
+    if not p:
+        raise HTTPException(status_code=404, detail="Project not found")
+    t0 = _parse_start(start)
+    out = burn_down(t0, sprint_days, total_points(session, p.id), done_points_from_flow(flow_by_day(session, p.id)))
+    return {"project_id": p.id, **out}
 
-    return {
-        "project_id": p.id,
-        "start": t0.isoformat(),
-        "sprint_days": days,
-        "labels": [d.isoformat() for d in labels],
-        "ideal": ideal,
-        "actual": actual,
-        "total_points": total
-    }
+@router.get("/{project_id}/history/velocity")
+@cached_response("history_velocity")
+def history_velocity(project_id: int, start: str | None = None, sprint_days: int = 14, periods: int = 4, session: Session = Depends(get_read_session)):
+    p = session.get(Project, project_id)
+    if not p:
+        raise HTTPException(status_code=404, detail="Project not found")
+    t0 = _parse_start(start)
+    return {"project_id": p.id, **sprint_velocity(t0, sprint_days, periods, done_points_from_flow(flow_by_day(session, p.id)))}
 
-@router.get("/{project_id}/velocity")
-def velocity(project_id: int, start: str | None = None, sprint_days: int = 14, periods: int = 4, session: Session = Depends(get_session)):
+@router.get("/{project_id}/history/cycle-time")
+@cached_response("history_cycle_time")
+def history_cycle_time(project_id: int, start: str | None = None, sprint_days: int = 14, periods: int = 4, session: Session = Depends(get_read_session)):
+    """Per-sprint completed/reopened/started counts and mean inprogress → done time in days."""
     p = session.get(Project, project_id)
     if not p:
         raise HTTPException(status_code=404, detail="Project not found")
+    t0 = _parse_start(start)
+    return {"project_id": p.id, "start": t0.isoformat(), **sprint_flow(t0, sprint_days, periods, flow_by_day(session, p.id))}
+
+@router.get("/{project_id}/activity")
+@cached_response("activity")
+def activity(project_id: int, limit: int = Query(100, ge=1, le=500), cursor: str | None = None,
+             entity: str | None = None, entity_id: int | None = None, field: str | None = None,
+             since: datetime | None = None, until: datetime | None = None,
+             session: Session = Depends(get_read_session)):
+    """Change history, newest first. Pass the returned next_cursor to fetch the following page."""
+    if not session.get(Project, project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
     try:
-        t0 = date.fromisoformat(start) if start else datetime.utcnow().date()
+        return list_activity(session, project_id, limit=limit, cursor=cursor, entity=entity,
+                             entity_id=entity_id, field=field, since=since, until=until)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid ?cursor")
+
+@router.get("/{project_id}/export")
+def export(project_id: int, fmt: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+           what: Literal["tree", "backlog", "timeline"] = "tree", start: str | None = None):
+    """
+    Stream the tree, backlog or timeline as NDJSON or CSV, one row per entity.
+    Rows are read in cursor batches and sent in ~64 KiB chunks, so memory stays flat.
+    """
+    # the body outlives a dependency-managed session, so the generator owns this one
+    session = Session(read_engine)
+    try:
+        if not session.get(Project, project_id):
+            raise HTTPException(status_code=404, detail="Project not found")
+        if what == "timeline":
+            try:
+                rows = timeline_rows(session, project_id, _parse_start(start))
+            except ScheduleCycleError as e:
+                raise HTTPException(status_code=409, detail={"error": "Task dependencies form a cycle", "task_ids": e.task_ids})
+        else:
+            rows = (tree_rows if what == "tree" else backlog_rows)(session, project_id)
     except Exception:
-        raise HTTPException(status_code=400, detail="Invalid ?start date")
-    days = max(1, int(sprint_days))
+        session.close()
+        raise
 
-    done = []
-    oc = session.exec(select(Outcome).where(Outcome.project_id == p.id)).all()
-    for o in oc:
-        bs = session.exec(select(Benefit).where(Benefit.outcome_id == o.id)).all()
-        for b in bs:
-            ds = session.exec(select(Deliverable).where(Deliverable.benefit_id == b.id)).all()
-            for d in ds:
-                tsks = session.exec(select(Task).where(Task.deliverable_id == d.id)).all()
-                for t in tsks:
-                    st = session.exec(select(TaskState).where(TaskState.task_id == t.id)).first()
-                    if st and st.done and st.updated_at:
-                        pts = int(getattr(t, "est_days", 1) or 1)
-                        done.append((st.updated_at.date(), pts))
-
-    vel = []
-    labels = []
-    for i in range(int(periods)):
-        s = t0 + timedelta(days=i*days)
-        e = s + timedelta(days=days)
-        labels.append(f"S{i+1} {s.isoformat()}→{e.isoformat()}")
-        vel.append(sum(pts for (dd, pts) in done if s <= dd < e))
-    return {"project_id": p.id, "sprint_days": days, "labels": labels, "velocity": vel}
+    def body():
+        try:
+            yield from ENCODERS[fmt](rows, COLUMNS[what])
+        finally:
+            session.close()
+
+    filename = f"project-{project_id}-{what}.{fmt}"
+    return StreamingResponse(body(), media_type=MEDIA_TYPES[fmt],
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@router.get("/{project_id}/dashboard")
+@cached_response("dashboard")
+def dashboard(project_id: int, panels: str | None = None, timeline_start: str | None = None,
+              sprint_start: str | None = None, sprint_days: int = 14, periods: int = 4,
+              session: Session = Depends(get_read_session)):
+    """
+    All dashboard panels in one response, built from a single rollup read and one hierarchy scan.
+    ?panels=kpis,budget,risk,backlog,timeline,burn,velocity selects a subset (default: all).
+    """
+    wanted = [x.strip() for x in panels.split(",") if x.strip()] if panels else list(PANELS)
+    unknown = [x for x in wanted if x not in PANELS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown panel(s): {', '.join(unknown)}")
+    out = build_dashboard(session, project_id, wanted,
+                          timeline_start=_parse_start(timeline_start), sprint_start=_parse_start(sprint_start),
+                          sprint_days=sprint_days, periods=periods)
+    if out is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return out
 
 @router.get("/{project_id}/cadence")
 def cadence(project_id: int, start: str | None = None, sprint_days: int = 14):
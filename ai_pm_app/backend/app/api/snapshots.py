@@ -0,0 +1,86 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlmodel import Session
+from ..core.instrumentation import InstrumentedRoute
+from ..db.database import get_session, get_read_session, read_engine
+from ..models.entities import Project
+from ..services.snapshots import (SnapshotConflict, capture_snapshot, list_snapshots, get_snapshots,
+                                  load_snapshot, diff_snapshots, evidence_zip)
+from .projects import _parse_start
+
+# Snapshots are immutable and not versioned with the project, so these routes are
+# excluded from ProjectETagMiddleware (see core/etag.py)
+router = APIRouter(prefix="/projects", tags=["snapshots"], route_class=InstrumentedRoute)
+
+class SnapshotReq(BaseModel):
+    label: str | None = None          # e.g. baseline / after
+    timeline_start: str | None = None
+    sprint_start: str | None = None
+    sprint_days: int = 14
+    periods: int = 4
+
+def _one(session: Session, project_id: int, snapshot_id: int):
+    found = get_snapshots(session, project_id, [snapshot_id])
+    if not found:
+        raise HTTPException(status_code=404, detail=f"Snapshot {snapshot_id} not found")
+    return found[0]
+
+@router.post("/{project_id}/snapshots")
+def create_snapshot(project_id: int, req: SnapshotReq | None = None, session: Session = Depends(get_session)):
+    """Capture every dashboard panel from one consistent read; unchanged panels share stored blobs."""
+    req = req or SnapshotReq()
+    try:
+        out = capture_snapshot(session, project_id, req.label, timeline_start=_parse_start(req.timeline_start),
+                               sprint_start=_parse_start(req.sprint_start), sprint_days=req.sprint_days,
+                               periods=req.periods)
+    except SnapshotConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if out is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return out
+
+@router.get("/{project_id}/snapshots")
+def snapshots(project_id: int, session: Session = Depends(get_read_session)):
+    if not session.get(Project, project_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+    return {"project_id": project_id, "snapshots": list_snapshots(session, project_id)}
+
+@router.get("/{project_id}/snapshots/evidence.zip")
+def evidence_pack(project_id: int, ids: str | None = None):
+    """
+    Evidence pack: one JSON file per snapshot panel plus a manifest, streamed from the stored blobs.
+    ?ids=3,4 selects snapshots (default: all of the project's snapshots).
+    """
+    session = Session(read_engine)
+    try:
+        if not session.get(Project, project_id):
+            raise HTTPException(status_code=404, detail="Project not found")
+        try:
+            wanted = [int(x) for x in ids.split(",") if x.strip()] if ids else [s["id"] for s in list_snapshots(session, project_id)]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid ?ids")
+        snaps = get_snapshots(session, project_id, wanted)
+        if not snaps:
+            raise HTTPException(status_code=404, detail="No snapshots to export")
+    except Exception:
+        session.close()
+        raise
+
+    def body():
+        try:
+            yield from evidence_zip(session, snaps)
+        finally:
+            session.close()
+
+    return StreamingResponse(body(), media_type="application/zip",
+                             headers={"Content-Disposition": f'attachment; filename="evidence_pid{project_id}.zip"'})
+
+@router.get("/{project_id}/snapshots/{snapshot_id}")
+def snapshot(project_id: int, snapshot_id: int, session: Session = Depends(get_read_session)):
+    return load_snapshot(session, _one(session, project_id, snapshot_id))
+
+@router.get("/{project_id}/snapshots/{a}/diff/{b}")
+def snapshot_diff(project_id: int, a: int, b: int, session: Session = Depends(get_read_session)):
+    """Structured per-panel diff from snapshot a to snapshot b."""
+    return diff_snapshots(session, _one(session, project_id, a), _one(session, project_id, b))
@@ -1,20 +1,37 @@
 from pathlib import Path
-from fastapi import APIRouter
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import RedirectResponse
+from ..core.assets import IMMUTABLE, REVALIDATE, AssetStore, asset_response
+from ..core.config import settings
 
 router = APIRouter()
 
-@router.get("/ui", response_class=HTMLResponse)
-def ui_page():
-    # __file__ = .../backend/app/api/ui.py
-    # parents[1] = .../backend/app  → app/ui/index.html
-    base = Path(__file__).resolve().parents[1] / "ui" / "index.html"
-    return base.read_text(encoding="utf-8")
-
-@router.get("/dashboard", response_class=HTMLResponse)
-def dashboard_page():
-    base = Path(__file__).resolve().parents[1] / "ui" / "dashboard.html"
-    return base.read_text(encoding="utf-8")
+# __file__ = .../backend/app/api/ui.py; parents[1] = .../backend/app → app/ui/
+# Read and compressed once here; UI_RELOAD=true picks up edits without a restart
+ui_assets = AssetStore(Path(__file__).resolve().parents[1] / "ui", reload=settings.ui_reload)
+
+def _page(request: Request, name: str):
+    asset = ui_assets.get(name)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    # pages revalidate (cheap 304) so a deploy shows up at once; bundles they link are immutable
+    return asset_response(request, asset, REVALIDATE)
+
+@router.get("/ui")
+def ui_page(request: Request):
+    return _page(request, "index.html")
+
+@router.get("/dashboard")
+def dashboard_page(request: Request):
+    return _page(request, "dashboard.html")
+
+@router.get("/assets/{filename:path}", include_in_schema=False)
+def asset(filename: str, request: Request):
+    """Content-hashed bundles (see AssetStore.url); cached for a year since the name changes with the content."""
+    found = ui_assets.get_hashed(filename)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return asset_response(request, found, IMMUTABLE)
 
 
 @router.get("/", include_in_schema=False)
@@ -0,0 +1,141 @@
+import gzip
+import hashlib
+import mimetypes
+import pathlib
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+from starlette.requests import Request
+from starlette.responses import Response
+from .etag import _matches
+from .responses import accepted_codings
+
+try:  # optional: br variants are only built when a brotli binding is installed
+    import brotli
+except ImportError:  # pragma: no cover - exercised when brotli is absent
+    brotli = None
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+ASSET_PREFIX = "/assets/"
+# pages reference bundles as {{asset:app.js}}; rewritten to /assets/app.<hash>.js at load time
+_ASSET_REF = re.compile(r"\{\{\s*asset:([\w./-]+)\s*\}\}")
+
+@dataclass
+class Asset:
+    name: str
+    media_type: str
+    body: bytes
+    digest: str
+    variants: Dict[str, bytes] = field(default_factory=dict)  # content-coding -> body
+
+    @property
+    def hashed_name(self) -> str:
+        p = pathlib.PurePosixPath(self.name)
+        return str(p.with_name(f"{p.stem}.{self.digest[:12]}{p.suffix}"))
+
+    def etag(self, coding: Optional[str]) -> str:
+        # strong validators differ per representation
+        return f'"{self.digest[:20]}{"-" + coding if coding else ""}"'
+
+def _compress(body: bytes) -> Dict[str, bytes]:
+    out = {}
+    gz = gzip.compress(body, compresslevel=9, mtime=0)
+    if len(gz) < len(body):
+        out["gzip"] = gz
+    if brotli is not None:
+        br = brotli.compress(body, quality=11)
+        if len(br) < len(body):
+            out["br"] = br
+    return out
+
+class AssetStore:
+    """UI files held in memory with pre-compressed variants and content hashes.
+
+    Everything under `directory` is read once; HTML pages are served under their own name
+    and other files (future JS/CSS bundles) under content-hashed names, which pages reference
+    as {{asset:name}}. With `reload` the directory's mtimes are checked at most every
+    `poll_seconds` on access and the store is rebuilt when a file changed (development).
+    """
+
+    def __init__(self, directory: pathlib.Path, reload: bool = False, poll_seconds: float = 0.5):
+        self.directory = pathlib.Path(directory)
+        self.reload, self.poll_seconds = reload, poll_seconds
+        self._lock = threading.Lock()
+        self._checked = 0.0
+        self._stamp: Tuple = ()
+        self.assets: Dict[str, Asset] = {}
+        self.hashed: Dict[str, Asset] = {}
+        self.load()
+
+    def _scan(self) -> Tuple:
+        return tuple(sorted((str(p.relative_to(self.directory)), p.stat().st_mtime_ns, p.stat().st_size)
+                            for p in self.directory.rglob("*") if p.is_file()))
+
+    def load(self) -> None:
+        files = {p.relative_to(self.directory).as_posix(): p.read_bytes()
+                 for p in sorted(self.directory.rglob("*")) if p.is_file()}
+        assets: Dict[str, Asset] = {}
+        # bundles first, so pages can embed their hashed URLs (and change hash with them)
+        for name in sorted(files, key=lambda n: n.endswith(".html")):
+            body = files[name]
+            if name.endswith(".html"):
+                body = _ASSET_REF.sub(lambda m: self._url(assets, m.group(1)), body.decode("utf-8")).encode("utf-8")
+            media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+            if media_type.startswith("text/") or media_type in ("application/javascript", "application/json"):
+                media_type += "; charset=utf-8"
+            assets[name] = Asset(name, media_type, body, hashlib.sha256(body).hexdigest(), _compress(body))
+        self.assets = assets
+        self.hashed = {a.hashed_name: a for a in assets.values() if not a.name.endswith(".html")}
+        self._stamp, self._checked = self._scan(), time.monotonic()
+
+    @staticmethod
+    def _url(assets: Dict[str, Asset], name: str) -> str:
+        asset = assets.get(name)
+        if asset is None:
+            raise KeyError(f"{{{{asset:{name}}}}} refers to a missing UI file")
+        return ASSET_PREFIX + asset.hashed_name
+
+    def _maybe_reload(self) -> None:
+        now = time.monotonic()
+        if now - self._checked < self.poll_seconds:
+            return
+        with self._lock:
+            self._checked = now
+            if self._scan() != self._stamp:
+                self.load()
+
+    def get(self, name: str) -> Optional[Asset]:
+        if self.reload:
+            self._maybe_reload()
+        return self.assets.get(name)
+
+    def get_hashed(self, hashed_name: str) -> Optional[Asset]:
+        if self.reload:
+            self._maybe_reload()
+        return self.hashed.get(hashed_name)
+
+    def url(self, name: str) -> str:
+        """Content-hashed URL of a bundle, e.g. /assets/app.3f2a9c01d4e5.js."""
+        return self._url(self.assets, name)
+
+def choose_variant(asset: Asset, accept_encoding: Optional[str]) -> Tuple[Optional[str], bytes]:
+    q = accepted_codings(accept_encoding)
+    for coding in ("br", "gzip"):
+        if coding in asset.variants and q.get(coding, q.get("*", 0.0)) > 0:
+            return coding, asset.variants[coding]
+    return None, asset.body
+
+def asset_response(request: Request, asset: Asset, cache_control: str) -> Response:
+    """The variant the client accepts, with a strong ETag; 304 when If-None-Match matches."""
+    coding, body = choose_variant(asset, request.headers.get("accept-encoding"))
+    etag = asset.etag(coding)
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    inm = request.headers.get("if-none-match")
+    if inm and _matches(inm, etag):
+        return Response(status_code=304, headers=headers)
+    if coding:
+        headers["Content-Encoding"] = coding
+    return Response(body, media_type=asset.media_type, headers=headers)
@@ -0,0 +1,227 @@
+import functools
+import pathlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Set, Tuple
+from starlette.responses import Response
+from .config import settings
+from .responses import dumps
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+            "expirations": self.expirations, "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+class CacheBackend:
+    """Byte-value cache keyed by string, with per-project invalidation."""
+    name = "none"
+
+    def __init__(self):
+        self.stats = CacheStats()
+
+    def get(self, key: str) -> Optional[bytes]:
+        self.stats.misses += 1
+        return None
+
+    def set(self, key: str, project_id: int, value: bytes) -> None:
+        pass
+
+    def invalidate_project(self, project_id: int) -> int:
+        return 0
+
+    def clear(self) -> None:
+        pass
+
+    def info(self) -> Dict[str, Any]:
+        return {"backend": self.name, **self.stats.as_dict()}
+
+class MemoryCache(CacheBackend):
+    """In-process LRU bounded by entry count and total bytes, with a TTL."""
+    name = "memory"
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float):
+        super().__init__()
+        self.max_entries, self.max_bytes, self.ttl = max_entries, max_bytes, ttl
+        self._data: "OrderedDict[str, Tuple[int, bytes, float]]" = OrderedDict()  # key -> (project_id, body, expires)
+        self._by_project: Dict[int, Set[str]] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _drop(self, key: str) -> None:
+        pid, body, _exp = self._data.pop(key)
+        self._bytes -= len(body)
+        keys = self._by_project.get(pid)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_project[pid]
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.stats.misses += 1
+                return None
+            if item[2] < time.monotonic():
+                self._drop(key)
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.stats.hits += 1
+            return item[1]
+
+    def set(self, key: str, project_id: int, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (project_id, value, time.monotonic() + self.ttl)
+            self._by_project.setdefault(project_id, set()).add(key)
+            self._bytes += len(value)
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._data)))
+                self.stats.evictions += 1
+
+    def invalidate_project(self, project_id: int) -> int:
+        with self._lock:
+            keys = list(self._by_project.get(project_id, ()))
+            for k in keys:
+                self._drop(k)
+            self.stats.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._by_project.clear()
+            self._bytes = 0
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**super().info(), "entries": len(self._data), "bytes": self._bytes,
+                    "max_entries": self.max_entries, "max_bytes": self.max_bytes, "ttl_seconds": self.ttl}
+
+class SQLiteCache(CacheBackend):
+    """Local-file cache shared by every uvicorn worker on the host.
+
+    LRU order is kept in an `accessed` column; hit/miss counters are per process.
+    """
+    name = "sqlite"
+
+    def __init__(self, path: str, max_entries: int, max_bytes: int, ttl: float):
+        super().__init__()
+        self.path = pathlib.Path(path)
+        self.max_entries, self.max_bytes, self.ttl = max_entries, max_bytes, ttl
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as c:
+            c.execute("PRAGMA journal_mode=WAL")
+            c.execute("""CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY, project_id INTEGER NOT NULL, body BLOB NOT NULL,
+                size INTEGER NOT NULL, expires REAL NOT NULL, accessed REAL NOT NULL)""")
+            c.execute("CREATE INDEX IF NOT EXISTS ix_cache_project ON cache(project_id)")
+            c.execute("CREATE INDEX IF NOT EXISTS ix_cache_accessed ON cache(accessed)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+
+    def get(self, key: str) -> Optional[bytes]:
+        now = time.time()
+        with self._connect() as c:
+            row = c.execute("SELECT body, expires FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats.misses += 1
+                return None
+            if row[1] < now:
+                c.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return None
+            c.execute("UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+        self.stats.hits += 1
+        return row[0]
+
+    def set(self, key: str, project_id: int, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        now = time.time()
+        with self._connect() as c:
+            c.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?, ?)",
+                      (key, project_id, value, len(value), now + self.ttl, now))
+            n, total = c.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache").fetchone()
+            if n > self.max_entries or total > self.max_bytes:
+                evicted = 0
+                for k, size in c.execute("SELECT key, size FROM cache ORDER BY accessed").fetchall():
+                    if n <= self.max_entries and total <= self.max_bytes:
+                        break
+                    c.execute("DELETE FROM cache WHERE key = ?", (k,))
+                    n -= 1; total -= size; evicted += 1
+                self.stats.evictions += evicted
+
+    def invalidate_project(self, project_id: int) -> int:
+        with self._connect() as c:
+            n = c.execute("DELETE FROM cache WHERE project_id = ?", (project_id,)).rowcount
+        self.stats.invalidations += n
+        return n
+
+    def clear(self) -> None:
+        with self._connect() as c:
+            c.execute("DELETE FROM cache")
+
+    def info(self) -> Dict[str, Any]:
+        with self._connect() as c:
+            n, total = c.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache").fetchone()
+        return {**super().info(), "entries": n, "bytes": total, "path": str(self.path),
+                "max_entries": self.max_entries, "max_bytes": self.max_bytes, "ttl_seconds": self.ttl}
+
+def make_cache(backend: str) -> CacheBackend:
+    if backend == "memory":
+        return MemoryCache(settings.cache_max_entries, settings.cache_max_bytes, settings.cache_ttl_seconds)
+    if backend == "sqlite":
+        return SQLiteCache(settings.cache_path, settings.cache_max_entries, settings.cache_max_bytes, settings.cache_ttl_seconds)
+    return CacheBackend()
+
+response_cache: CacheBackend = make_cache(settings.cache_backend)
+
+def cache_key(route: str, project_id: int, version: int, params: Dict[str, Any]) -> str:
+    # Responses that default to "today" change at midnight, so the UTC day is part of the key
+    norm = "&".join(f"{k}={params[k]}" for k in sorted(params) if params[k] is not None)
+    return f"{route}|{project_id}|v{version}|{datetime.utcnow().date().isoformat()}|{norm}"
+
+def cached_response(route: str):
+    """Read-through cache for a `(project_id, ..., session)` read endpoint.
+
+    The project's version is part of the key, so a write makes old entries unreachable
+    even in other workers; bump_version also drops them eagerly to free memory.
+    Keyword arguments other than project_id and session form the normalised params.
+    """
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            from ..services.versioning import get_version  # avoid an import cycle at module load
+            project_id, session = kwargs["project_id"], kwargs["session"]
+            params = {k: v for k, v in kwargs.items() if k not in ("project_id", "session")}
+            key = cache_key(route, project_id, get_version(session, project_id), params)
+            body = response_cache.get(key)
+            if body is not None:
+                return Response(content=body, media_type="application/json", headers={"X-Cache": "HIT"})
+            body = dumps(fn(*args, **kwargs))
+            response_cache.set(key, project_id, body)
+            return Response(content=body, media_type="application/json", headers={"X-Cache": "MISS"})
+        return wrapper
+    return deco
@@ -1,7 +1,69 @@
+from typing import Literal, Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     app_name: str = "AI-Augmented PM System"
-    # DB_URL and other settings will be added later
+
+    # Database engine. Without DB_URL a SQLite file at ./ai_pm_app/ai_pm.db is used.
+    db_url: Optional[str] = None
+    db_read_url: Optional[str] = None  # optional replica for read-only sessions; defaults to db_url
+    db_echo: bool = False
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = -1
+    db_pool_pre_ping: bool = True
+    db_statement_cache_size: int = 500  # compiled-statement cache (SQLAlchemy query_cache_size)
+
+    # SQLite connection pragmas, applied on every new connection
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_cache_size_kib: int = 64 * 1024
+    sqlite_cached_statements: int = 256  # per-connection prepared statement cache
+
+    # Read-through response cache for project read endpoints
+    cache_backend: Literal["memory", "sqlite", "none"] = "memory"
+    cache_max_entries: int = 2048
+    cache_max_bytes: int = 64 * 1024 * 1024
+    cache_ttl_seconds: float = 300.0
+    cache_path: str = "ai_pm_app/response_cache.db"  # sqlite backend, shared by all workers
+
+    # ActivityLog entries older than this are compacted into per-day summaries
+    activity_retention_days: int = 90
+
+    # Plan generation jobs (POST /jobs/generate)
+    gen_workers: int = 2            # concurrent generations
+    gen_queue_max: int = 32         # queued jobs beyond this are refused with 429
+    gen_job_history: int = 1000     # finished jobs kept for GET /jobs/{id}
+    llm_fake_latency_ms: int = 0    # sleep added to the fixture generator, for offline load tests
+    llm_model_id: str = "fixture"   # part of the generation cache key
+
+    # Validated generation results, keyed by normalised vision + prompt version + model id
+    gen_cache_enabled: bool = True
+    gen_cache_path: str = "ai_pm_app/generation_cache.db"
+    gen_cache_max_entries: int = 10000
+    gen_cache_max_bytes: int = 256 * 1024 * 1024
+    gen_cache_ttl_seconds: Optional[float] = None  # None: entries only leave by LRU eviction
+
+    # Per-request SQL/timing instrumentation
+    server_timing: bool = True                # Server-Timing header: db, handler, serialize, total
+    n_plus_one_threshold: int = 20            # same statement shape this often in one request is flagged; 0 = off
+    slow_request_ms: Optional[float] = None   # log slower requests (and flagged ones); None = no log
+
+    # Opt-in endpoint profiling (cProfile), listed at GET /admin/profiles
+    profile_token: Optional[str] = None       # ?__profile=1 / X-Profile: 1 needs X-Admin-Token equal to this
+    profile_sample_every: int = 0             # also profile every Nth request; 0 = off
+    profile_dir: str = "ai_pm_app/profiles"
+    profile_keep: int = 50                    # newest profiles kept on disk
+
+    # gzip for JSON/CSV/NDJSON responses (UI pages carry their own precompressed variants)
+    gzip_enabled: bool = True
+    gzip_min_bytes: int = 1024      # smaller bodies are sent as-is
+    gzip_level: int = 6             # 9 is ~15% smaller on 10k-task timelines but several times slower
+
+    # UI pages/bundles are held in memory; true = re-read them when files change (development)
+    ui_reload: bool = False
 
 settings = Settings()
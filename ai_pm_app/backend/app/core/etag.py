@@ -0,0 +1,59 @@
+import re
+from typing import Optional
+from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+from ..db.database import read_engine
+from ..models.entities import Project, ProjectVersion
+from ..services.versioning import etag_for
+
+# Snapshot routes are excluded: their content is immutable, not tied to the project version
+PROJECT_READ = re.compile(r"^/projects/(\d+)(?:/(?!snapshots(?:/|$)).*)?$")
+
+def _matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison: ignore W/ prefixes
+    bare = etag[2:] if etag.startswith("W/") else etag
+    for tag in header.split(","):
+        tag = tag.strip()
+        if (tag[2:] if tag.startswith("W/") else tag) == bare:
+            return True
+    return False
+
+def _current_etag(project_id: int) -> Optional[str]:
+    """The project's ETag, or None when there is no such project (the handler then answers 404)."""
+    with Session(read_engine) as session:
+        v = session.exec(select(ProjectVersion.version).where(ProjectVersion.project_id == project_id)).first()
+        if v is None and session.get(Project, project_id) is None:
+            return None
+        return etag_for(project_id, int(v or 0))
+
+class ProjectETagMiddleware(BaseHTTPMiddleware):
+    """ETag / If-None-Match for every GET /projects/{id}/... endpoint.
+
+    The tag is derived from the project's version counter, so a matching
+    If-None-Match is answered with 304 after a single primary-key lookup,
+    without running the handler or touching the hierarchy tables.
+    """
+
+    async def dispatch(self, request: Request, call_next):
+        m = PROJECT_READ.match(request.url.path)
+        if request.method not in ("GET", "HEAD") or not m:
+            return await call_next(request)
+
+        etag = await run_in_threadpool(_current_etag, int(m.group(1)))
+        if etag is None:
+            return await call_next(request)
+
+        inm = request.headers.get("if-none-match")
+        if inm and _matches(inm, etag):
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+        response = await call_next(request)
+        if response.status_code == 200:
+            response.headers["ETag"] = etag
+            response.headers.setdefault("Cache-Control", "no-cache")
+        return response
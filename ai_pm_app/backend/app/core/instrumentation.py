@@ -0,0 +1,191 @@
+import asyncio
+import functools
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from .config import settings
+from .profiling import current_target, profiler
+
+log = logging.getLogger("ai_pm_app.requests")
+
+# expanded IN (?, ?, ...) lists differ only in length; they count as one statement shape
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+class RequestStats:
+    """SQL statements and timings of one request, filled in by the engine hooks and InstrumentedRoute."""
+    __slots__ = ("start", "queries", "db_ms", "shapes", "handler_ms", "handler_end")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_ms = 0.0
+        self.shapes: Counter = Counter()
+        self.handler_ms: Optional[float] = None
+        self.handler_end: Optional[float] = None
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Statement shapes issued at least `threshold` times: likely N+1 loops."""
+        if threshold <= 0 or self.queries < threshold:
+            return []
+        merged: Counter = Counter()
+        for stmt, n in self.shapes.items():
+            merged[_IN_LIST.sub("(?)", " ".join(stmt.split()))] += n
+        return [(s, n) for s, n in merged.most_common() if n >= threshold]
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+def current_stats() -> Optional[RequestStats]:
+    return _current.get()
+
+def _before_cursor_execute(conn, _cursor, statement, _params, _context, _executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, _cursor, statement, _params, _context, _executemany):
+    stats = _current.get()
+    if stats is None:
+        return
+    starts = conn.info.get("query_start")
+    if starts:
+        stats.db_ms += (time.perf_counter() - starts.pop()) * 1000
+    stats.queries += 1
+    stats.shapes[statement] += 1
+
+def instrument_engines(*engines) -> None:
+    """Count statements and DB time per request on these engines (idempotent)."""
+    for eng in set(engines):
+        if not event.contains(eng, "before_cursor_execute", _before_cursor_execute):
+            event.listen(eng, "before_cursor_execute", _before_cursor_execute)
+            event.listen(eng, "after_cursor_execute", _after_cursor_execute)
+
+def _timed(call):
+    def record(t0: float) -> None:
+        stats = _current.get()
+        if stats is not None:
+            stats.handler_end = time.perf_counter()
+            stats.handler_ms = (stats.handler_end - t0) * 1000
+
+    if asyncio.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def timed_async(**values):
+            t0 = time.perf_counter()
+            try:
+                return await call(**values)
+            finally:
+                record(t0)
+        return timed_async
+
+    @functools.wraps(call)
+    def timed(**values):
+        # sync endpoints run here, inside the worker thread, so this excludes the threadpool hop
+        # and is where a requested profile has to run
+        t0 = time.perf_counter()
+        try:
+            target = current_target()
+            if target is not None:
+                return profiler.run(call, values, target)
+            return call(**values)
+        finally:
+            record(t0)
+    return timed
+
+class InstrumentedRoute(APIRoute):
+    """APIRoute that times the endpoint body, so Server-Timing can split it from serialisation,
+    and runs it under cProfile when core.profiling asks for it."""
+
+    def get_route_handler(self):
+        if not getattr(self.dependant.call, "_instrumented", False):
+            self.dependant.call = _timed(self.dependant.call)
+            self.dependant.call._instrumented = True
+        handler = super().get_route_handler()
+        route = self.path
+
+        async def route_handler(request):
+            if not profiler.enabled:
+                return await handler(request)
+            trigger = profiler.trigger(request)
+            if trigger is None:
+                return await handler(request)
+            token = profiler.start(request, route, trigger)
+            try:
+                response = await handler(request)
+            finally:
+                target = current_target()
+                profiler.stop(token)
+            if target.profile_id:
+                response.headers["X-Profile-Id"] = target.profile_id
+            return response
+        return route_handler
+
+def _quote(text: str, limit: int = 80) -> str:
+    text = text if len(text) <= limit else text[:limit - 3] + "..."
+    return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+def server_timing(stats: RequestStats, now: float, repeated: List[Tuple[str, int]]) -> str:
+    parts = [f'db;dur={stats.db_ms:.1f};desc="{stats.queries} queries"']
+    if stats.handler_ms is not None:
+        parts.append(f"handler;dur={stats.handler_ms:.1f}")
+        parts.append(f"serialize;dur={(now - stats.handler_end) * 1000:.1f}")
+    parts.append(f"total;dur={(now - stats.start) * 1000:.1f}")
+    for shape, n in repeated[:3]:
+        parts.append(f"n-plus-one;desc={_quote(f'{n}x {shape}')}")
+    return ", ".join(parts)
+
+class RequestInstrumentationMiddleware:
+    """Per-request SQL statement count, DB time and N+1 detection.
+
+    Adds a Server-Timing header (db, handler, serialize, total and any repeated statement
+    shape), readable in the browser's network panel. With SLOW_REQUEST_MS set, requests
+    slower than that or with repeated statements are logged to `ai_pm_app.requests`,
+    including statements issued while a streamed body is produced.
+    Pure ASGI rather than BaseHTTPMiddleware, so it adds no extra task per request.
+    """
+
+    def __init__(self, app, header: Optional[bool] = None, threshold: Optional[int] = None,
+                 slow_ms: Optional[float] = None):
+        self.app = app
+        self.header = settings.server_timing if header is None else header
+        self.threshold = settings.n_plus_one_threshold if threshold is None else threshold
+        self.slow_ms = settings.slow_request_ms if slow_ms is None else slow_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        stats = RequestStats()
+        token = _current.set(stats)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.header:
+                    value = server_timing(stats, time.perf_counter(), stats.repeated(self.threshold))
+                    message["headers"] = list(message.get("headers", [])) + [(b"server-timing", value.encode("latin-1", "replace"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            if self.slow_ms is not None:
+                self._log(scope, status, stats)
+
+    def _log(self, scope, status: int, stats: RequestStats) -> None:
+        total = (time.perf_counter() - stats.start) * 1000
+        repeated = stats.repeated(self.threshold)
+        if total < self.slow_ms and not repeated:
+            return
+        record: Dict[str, Any] = {"method": scope["method"], "path": scope["path"], "status": status,
+                                  "total_ms": round(total, 1), "db_ms": round(stats.db_ms, 1),
+                                  "queries": stats.queries}
+        if stats.handler_ms is not None:
+            record["handler_ms"] = round(stats.handler_ms, 1)
+        if repeated:
+            record["repeated"] = [{"count": n, "statement": s} for s, n in repeated[:5]]
+        log.warning("request %s", record)
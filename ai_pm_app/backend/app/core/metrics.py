@@ -0,0 +1,168 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Sequence, Tuple
+from starlette.routing import Match
+
+# Prometheus text exposition format 0.0.4, without a client library dependency
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = tuple(float(256 * 4 ** i) for i in range(9))  # 256 B .. 16 MiB
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _num(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+class _Sharded:
+    """Per-thread series storage: writers only touch their own thread's dict, so updates take
+    no lock. The lock is taken once per thread (new shard) and when rendering."""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[dict] = []
+        self._lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
+    def _merged(self, width: int) -> Dict[tuple, list]:
+        out: Dict[tuple, list] = {}
+        with self._lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for key, series in list(shard.items()):
+                acc = out.setdefault(key, [0] * width)
+                for i, v in enumerate(list(series)):
+                    acc[i] += v
+        return out
+
+class Histogram(_Sharded):
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, labels: tuple, value: float) -> None:
+        shard = self._shard()
+        series = shard.get(labels)
+        if series is None:
+            # per-bucket (not cumulative) counts, the +Inf bucket, then the sum
+            series = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def snapshot(self) -> Dict[tuple, Tuple[List[int], float]]:
+        """labels -> (cumulative counts per bucket incl. +Inf, sum)."""
+        out = {}
+        for key, series in self._merged(len(self.buckets) + 2).items():
+            cum, total = [], 0
+            for c in series[:-1]:
+                total += c
+                cum.append(total)
+            out[key] = (cum, series[-1])
+        return out
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for key, (cum, total) in sorted(self.snapshot().items()):
+            for le, c in zip(self.buckets + (float("inf"),), cum):
+                bound = 'le="%s"' % ("+Inf" if le == float("inf") else _num(le))
+                yield f"{self.name}_bucket{_labels(self.labelnames, key, bound)} {c}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {_num(total)}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {cum[-1]}"
+
+class Gauge:
+    """Single unlabelled gauge, only updated from the event loop thread."""
+
+    def __init__(self, name: str, help: str):
+        self.name, self.help = name, help
+        self.value = 0
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} gauge"
+        yield f"{self.name} {_num(self.value)}"
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(line for m in self.metrics for line in m.render()) + "\n"
+
+registry = Registry()
+REQUEST_LATENCY = registry.register(Histogram(
+    "http_request_duration_seconds", "Request latency by route template and status.", ("method", "route", "status")))
+REQUESTS_IN_FLIGHT = registry.register(Gauge("http_requests_in_flight", "Requests currently being served."))
+RESPONSE_SIZE = registry.register(Histogram(
+    "http_response_size_bytes", "Response body size by route template.", ("method", "route"), SIZE_BUCKETS))
+DB_CHECKOUT = registry.register(Histogram(
+    "db_session_checkout_seconds", "Wait for a pooled connection when a request session starts.", ("engine",),
+    (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)))
+
+def observe_checkout(engine: str, started: float) -> None:
+    DB_CHECKOUT.observe((engine,), time.perf_counter() - started)
+
+def route_template(app, scope) -> str:
+    """Route path template such as /projects/{project_id}/burn, so label values stay bounded."""
+    route = scope.get("route")
+    if route is None:
+        # answered before routing (e.g. a 304 from the ETag middleware): match it here
+        for candidate in getattr(app, "routes", ()):
+            match, _ = candidate.matches(scope)
+            if match == Match.FULL:
+                route = candidate
+                break
+    return getattr(route, "path", None) or "unmatched"
+
+class MetricsMiddleware:
+    """Latency histogram per (method, route template, status), in-flight gauge and
+    response sizes. Pure ASGI; updates happen on the event loop thread without locks."""
+
+    def __init__(self, app, router=None):
+        self.app = app
+        self.router = router
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status, size = 500, 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.value += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_FLIGHT.value -= 1
+            route = route_template(self.router, scope)
+            method = scope["method"]
+            REQUEST_LATENCY.observe((method, route, str(status)), time.perf_counter() - start)
+            RESPONSE_SIZE.observe((method, route), size)
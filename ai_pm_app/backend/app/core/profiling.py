@@ -0,0 +1,196 @@
+import cProfile
+import hmac
+import itertools
+import json
+import os
+import pathlib
+import pstats
+import secrets
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from .config import settings
+
+@dataclass
+class ProfileTarget:
+    """Request being profiled; set by InstrumentedRoute, consumed in the worker thread."""
+    method: str
+    route: str
+    path: str
+    query: str
+    trigger: str                    # request | sample
+    profile_id: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+
+_target: ContextVar[Optional[ProfileTarget]] = ContextVar("profile_target", default=None)
+
+def current_target() -> Optional[ProfileTarget]:
+    return _target.get()
+
+def _label(func) -> str:
+    filename, line, name = func
+    if filename == "~":  # builtins
+        return name
+    parts = pathlib.PurePath(filename).parts
+    for anchor in ("site-packages", "ai_pm_app"):
+        if anchor in parts:
+            parts = parts[parts.index(anchor) + (anchor == "site-packages"):]
+            break
+    return f"{name} ({'/'.join(parts[-3:])}:{line})"
+
+def call_tree(stats: Dict, root, min_share: float = 0.005, max_depth: int = 40) -> Dict[str, Any]:
+    """Caller→callee tree from pstats data, starting at `root`.
+
+    cProfile keeps one level of caller edges, so below the first level a function's time is
+    attributed per call site, not per full stack; edges under `min_share` of the total are pruned.
+    """
+    callees: Dict[Any, Dict[Any, tuple]] = defaultdict(dict)
+    for func, (_cc, _nc, _tt, _ct, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees[caller][func] = edge
+    _cc, nc, _tt, total, _ = stats[root]
+    floor = total * min_share
+
+    def node(func, calls, cum, path, depth):
+        children = []
+        if depth < max_depth:
+            for child, (_c, n, _t, c_cum) in sorted(callees.get(func, {}).items(), key=lambda kv: -kv[1][3]):
+                if c_cum >= floor and child not in path:
+                    children.append(node(child, n, c_cum, path | {child}, depth + 1))
+        return {"function": _label(func), "calls": calls, "ms": round(cum * 1000, 3), "children": children}
+
+    return node(root, nc, total, {root}, 0)
+
+def collapsed(tree: Dict[str, Any]) -> str:
+    """Folded stacks ("a;b;c <µs>") for flamegraph.pl, speedscope or inferno."""
+    lines: List[str] = []
+
+    def walk(n, prefix):
+        stack = prefix + [n["function"].replace(";", ",")]
+        own = n["ms"] - sum(c["ms"] for c in n["children"])
+        if own > 0:
+            lines.append(f"{';'.join(stack)} {int(own * 1000)}")
+        for c in n["children"]:
+            walk(c, stack)
+
+    walk(tree, [])
+    return "\n".join(lines) + "\n"
+
+class Profiler:
+    """Opt-in cProfile of endpoint bodies, stored in a bounded on-disk ring buffer.
+
+    A request is profiled when it sends ?__profile=1 or `X-Profile: 1` together with
+    `X-Admin-Token` equal to PROFILE_TOKEN, or when it is every PROFILE_SAMPLE_EVERY-th request.
+    With neither configured, `enabled` is False and routes skip the check entirely.
+    """
+
+    def __init__(self, directory: str, keep: int, token: Optional[str] = None, sample_every: int = 0):
+        self.dir = pathlib.Path(directory)
+        self.keep, self.token, self.sample_every = keep, token, sample_every
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.token) or self.sample_every > 0
+
+    def authorised(self, supplied: Optional[str]) -> bool:
+        """True when `supplied` (an X-Admin-Token value) equals the configured token."""
+        return bool(self.token) and hmac.compare_digest(supplied or "", self.token)
+
+    def trigger(self, request) -> Optional[str]:
+        if self.token and (request.query_params.get("__profile") == "1" or request.headers.get("x-profile") == "1"):
+            if self.authorised(request.headers.get("x-admin-token")):
+                return "request"
+        if self.sample_every > 0 and next(self._seq) % self.sample_every == 0:
+            return "sample"
+        return None
+
+    def start(self, request, route: str, trigger: str):
+        return _target.set(ProfileTarget(request.method, route, request.url.path, request.url.query, trigger))
+
+    def stop(self, token) -> None:
+        _target.reset(token)
+
+    def run(self, call, values: Dict[str, Any], target: ProfileTarget):
+        """Call the endpoint under cProfile in the current (worker) thread and store the result."""
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+        except ValueError:  # another profiler is active in this interpreter
+            return call(**values)
+        t0 = time.perf_counter()
+        try:
+            return call(**values)
+        finally:
+            prof.disable()
+            elapsed = time.perf_counter() - t0
+            code = getattr(call, "__code__", None)
+            root = (code.co_filename, code.co_firstlineno, code.co_name) if code else None
+            target.profile_id = self._save(prof, root, target, elapsed)
+
+    def _save(self, prof: cProfile.Profile, root, target: ProfileTarget, elapsed: float) -> str:
+        pid = f"{target.created_at:%Y%m%dT%H%M%S%f}-{secrets.token_hex(3)}"
+        prof.create_stats()
+        st = pstats.Stats(prof)
+        top = sorted(st.stats.items(), key=lambda kv: -kv[1][3])[:40]
+        meta = {"id": pid, "method": target.method, "route": target.route, "path": target.path,
+                "query": target.query, "trigger": target.trigger, "created_at": target.created_at.isoformat(),
+                "total_ms": round(elapsed * 1000, 3)}
+        doc = {**meta,
+               "functions": [{"function": _label(f), "calls": nc, "tottime_ms": round(tt * 1000, 3),
+                              "cumtime_ms": round(ct * 1000, 3)} for f, (_cc, nc, tt, ct, _) in top],
+               "tree": call_tree(st.stats, root) if root in st.stats else None}
+        with self._lock:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            st.dump_stats(str(self.dir / f"{pid}.prof"))
+            tmp = self.dir / f"{pid}.json.tmp"
+            tmp.write_text(json.dumps(doc), encoding="utf-8")
+            os.replace(tmp, self.dir / f"{pid}.json")
+            self._trim()
+        return pid
+
+    def _trim(self) -> None:
+        # ids sort chronologically; drop the oldest beyond `keep` (caller holds the lock)
+        for old in sorted(self.dir.glob("*.json"))[:-self.keep or None]:
+            old.unlink(missing_ok=True)
+            old.with_suffix(".prof").unlink(missing_ok=True)
+
+    def _path(self, profile_id: str, suffix: str) -> Optional[pathlib.Path]:
+        p = self.dir / f"{profile_id}{suffix}"
+        # ids are generated here; anything else (e.g. "../x") is not a stored profile
+        if p.parent != self.dir or not p.is_file():
+            return None
+        return p
+
+    def list(self) -> List[Dict[str, Any]]:
+        out = []
+        for p in sorted(self.dir.glob("*.json"), reverse=True):
+            try:
+                doc = json.loads(p.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            out.append({k: doc.get(k) for k in ("id", "method", "route", "path", "query", "trigger",
+                                                 "created_at", "total_ms")})
+        return out
+
+    def load(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        p = self._path(profile_id, ".json")
+        return json.loads(p.read_text(encoding="utf-8")) if p else None
+
+    def pstats_path(self, profile_id: str) -> Optional[pathlib.Path]:
+        return self._path(profile_id, ".prof")
+
+    def clear(self) -> int:
+        with self._lock:
+            n = 0
+            for p in list(self.dir.glob("*.json")) + list(self.dir.glob("*.prof")):
+                p.unlink(missing_ok=True)
+                n += p.suffix == ".json"
+            return n
+
+profiler = Profiler(settings.profile_dir, settings.profile_keep, settings.profile_token, settings.profile_sample_every)
@@ -0,0 +1,113 @@
+import json
+import zlib
+from typing import Any, Dict, Optional
+from fastapi.encoders import jsonable_encoder
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+
+try:  # optional: several times faster than the stdlib for the large tree/timeline/backlog dicts
+    import orjson
+except ImportError:  # pragma: no cover - exercised when orjson is absent
+    orjson = None
+
+if orjson is not None:
+    _ORJSON_OPTS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+def _stdlib(content: Any) -> bytes:
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"),
+                      default=jsonable_encoder).encode("utf-8")
+
+def dumps(content: Any) -> bytes:
+    """JSON bytes for a handler result, without a separate jsonable_encoder pass over it.
+
+    Plain dicts/lists/str/numbers/dates are written directly; other objects (models, sets,
+    Decimals) go through jsonable_encoder one at a time via `default`. Content neither
+    encoder accepts as-is (e.g. date dict keys on the stdlib path) falls back to a full
+    jsonable_encoder pass, so the output matches FastAPI's default JSONResponse.
+    """
+    try:
+        if orjson is not None:
+            return orjson.dumps(content, default=jsonable_encoder, option=_ORJSON_OPTS)
+        return _stdlib(content)
+    except TypeError:  # orjson.JSONEncodeError is a TypeError
+        return _stdlib(jsonable_encoder(content))
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with `dumps` (orjson when installed)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def accepted_codings(header: Optional[str]) -> Dict[str, float]:
+    """Accept-Encoding parsed to {coding: q}."""
+    out: Dict[str, float] = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        out[coding.strip().lower()] = q
+    return out
+
+# already compressed; gzip only costs CPU here
+_INCOMPRESSIBLE = ("application/zip", "application/gzip", "image/", "audio/", "video/")
+
+class CompressionMiddleware:
+    """gzip for bodies of at least `minimum_size` bytes, compressed chunk by chunk for
+    StreamingResponse. Honours q-values (gzip;q=0) and leaves pre-encoded (UI assets) and
+    already-compressed (zip) responses alone. Pure ASGI on the public Headers API only.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, compresslevel: int = 6):
+        self.app, self.minimum_size, self.compresslevel = app, minimum_size, compresslevel
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        q = accepted_codings(Headers(scope=scope).get("accept-encoding"))
+        if q.get("gzip", q.get("*", 0.0)) <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        start: Dict[str, Any] = {}
+        gz = None  # zlib compressor once the response is being gzipped
+
+        async def send_compressed(message) -> None:
+            nonlocal gz
+            if message["type"] == "http.response.start":
+                start.update(message)  # held until the first body chunk shows the size
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            body, more = message.get("body", b""), message.get("more_body", False)
+            if start:
+                headers = MutableHeaders(raw=list(start["headers"]))
+                skip = ("content-encoding" in headers
+                        or headers.get("content-type", "").startswith(_INCOMPRESSIBLE)
+                        or (not more and len(body) < self.minimum_size))
+                if not skip:
+                    gz = zlib.compressobj(self.compresslevel, zlib.DEFLATED, 31)  # wbits 31: gzip container
+                    headers["Content-Encoding"] = "gzip"
+                    headers.add_vary_header("Accept-Encoding")
+                    if "content-length" in headers:
+                        del headers["Content-Length"]
+                    body = gz.compress(body) + (b"" if more else gz.flush())
+                    if not more:
+                        headers["Content-Length"] = str(len(body))
+                await send({**start, "headers": headers.raw})
+                start.clear()
+            elif gz is not None:
+                body = gz.compress(body) + (b"" if more else gz.flush())
+            if gz is not None and more and not body:
+                return  # zlib is still buffering this chunk
+            await send({"type": "http.response.body", "body": body, "more_body": more})
+
+        await self.app(scope, receive, send_compressed)
@@ -1,17 +1,106 @@
 import pathlib
+import time
+from typing import Optional
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.pool import StaticPool
 from sqlmodel import SQLModel, create_engine, Session
+from ..core.config import Settings, settings
+from ..core.metrics import observe_checkout
 
 DB_FILE = pathlib.Path.cwd() / "ai_pm_app" / "ai_pm.db"
-DB_FILE.parent.mkdir(parents=True, exist_ok=True)
 SQLITE_URL = f"sqlite:///{DB_FILE.as_posix()}"
 
-engine = create_engine(SQLITE_URL, echo=False)
+def _in_memory(u: URL) -> bool:
+    return u.get_backend_name() == "sqlite" and u.database in (None, "", ":memory:")
+
+def _sqlite_pragmas(cfg: Settings, read_only: bool):
+    def on_connect(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        cur.execute(f"PRAGMA journal_mode={cfg.sqlite_journal_mode}")
+        cur.execute(f"PRAGMA synchronous={cfg.sqlite_synchronous}")
+        cur.execute(f"PRAGMA busy_timeout={int(cfg.sqlite_busy_timeout_ms)}")
+        cur.execute(f"PRAGMA mmap_size={int(cfg.sqlite_mmap_size)}")
+        cur.execute(f"PRAGMA cache_size={-int(cfg.sqlite_cache_size_kib)}")  # negative = KiB
+        if read_only:
+            cur.execute("PRAGMA query_only=ON")
+        cur.close()
+    return on_connect
+
+def build_engine(url: Optional[str] = None, read_only: bool = False, cfg: Settings = settings) -> Engine:
+    """Create an engine from settings: pool sizing, pre-ping and statement caching for every
+    backend, plus WAL/synchronous/busy_timeout/mmap/cache pragmas for SQLite.
+
+    `read_only` engines refuse writes (PRAGMA query_only on SQLite), so heavy GET endpoints
+    can run on their own pool without queueing behind the writer.
+    """
+    url = url or cfg.db_url or SQLITE_URL
+    u = make_url(url)
+    kwargs = dict(echo=cfg.db_echo, pool_pre_ping=cfg.db_pool_pre_ping, query_cache_size=cfg.db_statement_cache_size)
+    is_sqlite = u.get_backend_name() == "sqlite"
+    in_memory = _in_memory(u)
+    if in_memory:
+        # one shared connection: every thread sees the same in-memory database
+        kwargs["poolclass"] = StaticPool
+    else:
+        kwargs.update(pool_size=cfg.db_pool_size, max_overflow=cfg.db_max_overflow,
+                      pool_timeout=cfg.db_pool_timeout, pool_recycle=cfg.db_pool_recycle)
+    if is_sqlite:
+        kwargs["connect_args"] = {"check_same_thread": False, "cached_statements": cfg.sqlite_cached_statements}
+
+    eng = create_engine(url, **kwargs)
+    if is_sqlite:
+        if not in_memory:
+            db_path = pathlib.Path(u.database)
+
+            @event.listens_for(eng, "do_connect")
+            def _ensure_dir(*_args):
+                # created on first connect rather than at import time
+                db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        event.listen(eng, "connect", _sqlite_pragmas(cfg, read_only))
+    return eng
+
+def build_read_engine(write: Engine, url: Optional[str] = None, cfg: Settings = settings) -> Engine:
+    """Read-only engine for the GET handlers.
+
+    An in-memory SQLite database belongs to the engine that opened it, so a second engine
+    would see an empty one; the write engine is shared instead.
+    """
+    url = url or cfg.db_url or SQLITE_URL
+    if _in_memory(make_url(url)) or _in_memory(write.url):
+        return write
+    return build_engine(url, read_only=True, cfg=cfg)
+
+engine = build_engine()
+read_engine = build_read_engine(engine, settings.db_read_url)
 
 def create_db_and_tables():
     # Import models so SQLModel sees them before create_all
-    from ..models.entities import Project, Outcome, Benefit, Deliverable, Task, BudgetLine, GovernanceEvent, ReportSpec, Risk  # noqa: F401
+    from ..models.entities import Project, Outcome, Benefit, Deliverable, Task, BudgetLine, GovernanceEvent, ReportSpec, Risk, ActivityLog, TaskState, ProjectRollup, ProjectVersion, ActivityDailySummary, EvidenceBlob, EvidenceSnapshot, SnapshotPanel, TaskTransition, TaskFlowDaily  # noqa: F401
     SQLModel.metadata.create_all(engine)
+    # create_all skips indexes of tables that already exist; add any that were introduced later
+    for ix in ActivityLog.__table__.indexes:
+        ix.create(engine, checkfirst=True)
+    # ... and nullable columns, left NULL on existing rows
+    for col in (Task.__table__.c.created_at,):
+        with engine.begin() as conn:
+            if col.name not in {c["name"] for c in inspect(conn).get_columns(col.table.name)}:
+                conn.exec_driver_sql(f"ALTER TABLE {col.table.name} ADD COLUMN {col.name} "
+                                     f"{col.type.compile(conn.dialect)}")
+
+def _checked_out(session: Session, label: str) -> Session:
+    # take the pooled connection up front so the wait for it is measured (db_session_checkout_seconds)
+    started = time.perf_counter()
+    session.connection()
+    observe_checkout(label, started)
+    return session
 
 def get_session():
     with Session(engine) as session:
-        yield session
+        yield _checked_out(session, "write")
+
+def get_read_session():
+    """Session for read-only handlers; any write raises instead of taking the write lock."""
+    with Session(read_engine) as session:
+        yield _checked_out(session, "read")
@@ -1,11 +1,21 @@
 
 from fastapi import FastAPI
+from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
-from .db.database import create_db_and_tables
+from .db.database import create_db_and_tables, engine, read_engine
+from .core.etag import ProjectETagMiddleware
+from .core.instrumentation import RequestInstrumentationMiddleware, instrument_engines
+from .core.config import settings
+from .core.metrics import CONTENT_TYPE, MetricsMiddleware, registry
+from .core.responses import CompressionMiddleware, FastJSONResponse
 from .api.projects import router as projects_router
 from .api.ui import router as ui_router
+from .api.admin import router as admin_router
+from .api.snapshots import router as snapshots_router
+from .api.jobs import router as jobs_router
+from .services.jobs import job_queue
 
-app = FastAPI(title="AI-Augmented PM System")
+app = FastAPI(title="AI-Augmented PM System", default_response_class=FastJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -14,15 +24,36 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if settings.gzip_enabled:
+    # inside the ETag middleware: BaseHTTPMiddleware re-sends every body as a stream, which
+    # would defeat the size threshold
+    app.add_middleware(CompressionMiddleware, minimum_size=settings.gzip_min_bytes, compresslevel=settings.gzip_level)
+app.add_middleware(ProjectETagMiddleware)
+# outside the ETag middleware, so its version lookup and a streamed body's statements are counted too
+app.add_middleware(RequestInstrumentationMiddleware)
+app.add_middleware(MetricsMiddleware, router=app.router)
+instrument_engines(engine, read_engine)
 
 
 @app.on_event("startup")
 def on_startup():
     create_db_and_tables()
 
+@app.on_event("shutdown")
+def on_shutdown():
+    job_queue.shutdown(wait=False)
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus text format; series are per worker process."""
+    return Response(registry.render(), media_type=CONTENT_TYPE)
+
 app.include_router(projects_router)
+app.include_router(snapshots_router)
 app.include_router(ui_router)
+app.include_router(admin_router)
+app.include_router(jobs_router)
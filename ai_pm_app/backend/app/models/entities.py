@@ -1,6 +1,8 @@
 
 from __future__ import annotations
+from datetime import date, datetime
 from typing import Optional
+from sqlalchemy import Index
 from sqlmodel import SQLModel, Field
 
 class Project(SQLModel, table=True):
@@ -33,6 +35,7 @@ class Task(SQLModel, table=True):
     name: str
     est_days: int = 1
     depends_on_id: Optional[int] = Field(default=None, foreign_key="task.id")
+    created_at: Optional[datetime] = Field(default_factory=datetime.utcnow)  # NULL for tasks that predate it
 
 class BudgetLine(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -67,8 +70,14 @@ from datetime import datetime
 from typing import Optional
 
 class ActivityLog(SQLModel, table=True):
+    # (project_id, created_at, id) serves the per-project feed and its keyset cursor;
+    # (entity, entity_id) serves per-row history
+    __table_args__ = (
+        Index("ix_activitylog_project_created", "project_id", "created_at", "id"),
+        Index("ix_activitylog_entity", "entity", "entity_id"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
-    project_id: int = Field(index=True)
+    project_id: int
     entity: str
     entity_id: int
     field: str
@@ -86,3 +95,81 @@ class TaskState(SQLModel, table=True):
     done: bool = Field(default=False)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
+class ProjectRollup(SQLModel, table=True):
+    # Denormalised per-project aggregates, kept current by the write paths
+    project_id: int = Field(primary_key=True, foreign_key="project.id")
+    outcomes: int = 0
+    benefits: int = 0
+    deliverables: int = 0
+    tasks: int = 0
+    activity: int = 0
+    tasks_todo: int = 0
+    tasks_inprogress: int = 0
+    tasks_done: int = 0
+    budget_count: int = 0
+    budget_total: float = 0.0
+    budget_by_category: str = "{}"  # JSON {category: amount}
+    risk_count: int = 0
+    risk_matrix: str = "[]"  # JSON 5x5 list, [probability-1][impact-1]
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class ProjectVersion(SQLModel, table=True):
+    # Monotonic per-project change counter, bumped by every mutation path
+    project_id: int = Field(primary_key=True, foreign_key="project.id")
+    version: int = 0
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class ActivityDailySummary(SQLModel, table=True):
+    # Per-day counts of ActivityLog rows removed by retention compaction
+    project_id: int = Field(primary_key=True)
+    day: date = Field(primary_key=True)
+    entity: str = Field(primary_key=True)
+    field: str = Field(primary_key=True)
+    changes: int = 0
+    est_delta: int = 0  # net est_days change, kept for task est_days entries (burn-up scope)
+
+class EvidenceBlob(SQLModel, table=True):
+    # Content-addressed, zlib-compressed panel JSON shared by every snapshot that captured it
+    digest: str = Field(primary_key=True)  # sha256 of the canonical JSON
+    size: int = 0  # uncompressed bytes
+    data: bytes
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class EvidenceSnapshot(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    project_id: int = Field(index=True, foreign_key="project.id")
+    label: Optional[str] = None  # e.g. baseline / after
+    version: int = 0  # project version the panels were read at
+    params: str = "{}"  # JSON of the dashboard parameters (start dates, sprint length)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class SnapshotPanel(SQLModel, table=True):
+    snapshot_id: int = Field(primary_key=True, foreign_key="evidencesnapshot.id")
+    panel: str = Field(primary_key=True)
+    digest: str = Field(foreign_key="evidenceblob.digest")
+
+class TaskTransition(SQLModel, table=True):
+    # Append-only status history: one row per status move, written by the task patch paths
+    __table_args__ = (
+        Index("ix_tasktransition_project_at", "project_id", "at"),
+        Index("ix_tasktransition_task_at", "task_id", "at"),
+    )
+    id: Optional[int] = Field(default=None, primary_key=True)
+    task_id: int = Field(foreign_key="task.id")
+    project_id: int = Field(foreign_key="project.id")
+    from_status: str
+    to_status: str
+    points: int = 1  # est_days at the time of the move
+    at: datetime = Field(default_factory=datetime.utcnow)
+
+class TaskFlowDaily(SQLModel, table=True):
+    # Per-day aggregates of TaskTransition, kept current by the same write paths
+    project_id: int = Field(primary_key=True)
+    day: date = Field(primary_key=True)
+    done_points: int = 0    # net: points moved into done minus points reopened
+    done_tasks: int = 0     # net, as above
+    reopened: int = 0       # moves out of done
+    started: int = 0        # moves from todo to inprogress
+    cycle_tasks: int = 0    # moves into done whose task had been started
+    cycle_seconds: float = 0.0  # sum of first start → done durations of those moves
@@ -3,7 +3,7 @@ from __future__ import annotations
 from typing import List, Literal, Any, Optional
 from pydantic import BaseModel, Field
 
-EntityType = Literal["project","outcome","benefit","deliverable","task","budget"]
+EntityType = Literal["project","outcome","benefit","deliverable","task","budget","risk"]
 
 class ChangeItem(BaseModel):
     entity: EntityType
@@ -29,5 +29,14 @@ class PropagationPreview(BaseModel):
 class ApplyRequest(BaseModel):
     ops: List[SuggestedOp] = Field(default_factory=list)
 
+class RejectedOp(BaseModel):
+    index: int  # position in ApplyRequest.ops
+    entity: EntityType
+    id: int
+    field: str
+    error: str
+    current_value: Optional[Any] = None  # set when old_value was stale
+
 class ApplyResult(BaseModel):
     applied: int
+    rejected: List[RejectedOp] = Field(default_factory=list)
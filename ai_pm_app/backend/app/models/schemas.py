@@ -1,7 +1,8 @@
 
 from __future__ import annotations
-from typing import List, Optional
-from pydantic import BaseModel, Field, validator
+from typing import Any, Dict, List, Optional, Union
+from pydantic import BaseModel, Field, ValidationError, field_validator, model_validator
+from pydantic_core import PydanticCustomError
 
 class GenTask(BaseModel):
     name: str
@@ -13,6 +14,33 @@ class GenDeliverable(BaseModel):
     description: Optional[str] = None
     tasks: List[GenTask]
 
+    @model_validator(mode="after")
+    def dependencies_are_valid(self):
+        # each task has at most one predecessor in the same deliverable, so following
+        # depends_on_index chains finds every cycle in O(n)
+        n = len(self.tasks)
+        for i, t in enumerate(self.tasks):
+            j = t.depends_on_index
+            if j is not None and not 0 <= j < n:
+                raise PydanticCustomError(
+                    "dependency_index", "{index} is not a task of this deliverable ({n} tasks)",
+                    {"task": i, "index": j, "n": n})
+        state = [0] * n  # 0 unvisited, 1 on the current chain, 2 done
+        for start in range(n):
+            chain, i = [], start
+            while i is not None and state[i] == 0:
+                state[i] = 1
+                chain.append(i)
+                i = self.tasks[i].depends_on_index
+            if i is not None and state[i] == 1:
+                cycle = chain[chain.index(i):]
+                raise PydanticCustomError(
+                    "dependency_cycle", "dependency cycle through tasks {cycle}",
+                    {"task": cycle[0], "cycle": cycle})
+            for k in chain:
+                state[k] = 2
+        return self
+
 class GenBenefit(BaseModel):
     name: str
     description: Optional[str] = None
@@ -55,8 +83,43 @@ class GenProject(BaseModel):
     reporting: List[GenReportSpec] = []
     risks: List[GenRisk] = []
 
-    @validator("outcomes")
+    @field_validator("outcomes")
+    @classmethod
     def must_have_at_least_one_outcome(cls, v):
         if not v or len(v) == 0:
             raise ValueError("At least one outcome is required")
         return v
+
+class GenValidationError(ValueError):
+    """A generated plan failed validation; `errors` holds one entry per failing field."""
+
+    def __init__(self, errors: List[Dict[str, Any]]):
+        super().__init__(f"{len(errors)} validation error(s): " + "; ".join(f"{e['loc']}: {e['msg']}" for e in errors[:3]))
+        self.errors = errors
+
+def validation_report(exc: ValidationError) -> List[Dict[str, Any]]:
+    """Flatten pydantic errors to {"loc": "outcomes.0.benefits.0...", "msg", "type"}.
+
+    Dependency errors are raised on the deliverable; their task is folded into loc.
+    """
+    out = []
+    for e in exc.errors(include_url=False, include_input=False):
+        loc = [str(x) for x in e["loc"]]
+        ctx = e.get("ctx") or {}
+        if e["type"] in ("dependency_index", "dependency_cycle"):
+            loc += ["tasks", str(ctx["task"]), "depends_on_index"]
+        out.append({"loc": ".".join(loc), "msg": e["msg"], "type": e["type"]})
+    return out
+
+def parse_generated(raw: Union[bytes, str, Dict[str, Any]]) -> GenProject:
+    """Validate model output into a GenProject.
+
+    Bytes/str go straight through pydantic's compiled JSON parser (no intermediate dict);
+    dicts are validated as-is. Raises GenValidationError with a per-field report.
+    """
+    try:
+        if isinstance(raw, (bytes, bytearray, str)):
+            return GenProject.model_validate_json(raw)
+        return GenProject.model_validate(raw)
+    except ValidationError as e:
+        raise GenValidationError(validation_report(e)) from e
@@ -0,0 +1,142 @@
+
+import base64
+import json
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import Integer, and_, case, cast, delete, func, tuple_, update
+from sqlmodel import Session, select
+from ..core.config import settings
+from ..models.entities import Project, Outcome, Benefit, Deliverable, Task, ActivityLog, ActivityDailySummary
+from .rollups import rebuild_rollup
+from .versioning import bump_version
+
+def encode_cursor(created_at: datetime, log_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{log_id}".encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of encode_cursor; raises ValueError for anything it did not produce."""
+    try:
+        at, log_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(at), int(log_id)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+def list_activity(session: Session, project_id: int, limit: int = 100, cursor: Optional[str] = None,
+                  entity: Optional[str] = None, entity_id: Optional[int] = None, field: Optional[str] = None,
+                  since: Optional[datetime] = None, until: Optional[datetime] = None) -> Dict[str, Any]:
+    """One page of a project's activity, newest first.
+
+    Keyset pagination on (created_at, id): each page is an index range scan on
+    ix_activitylog_project_created, however deep the client pages.
+    """
+    stmt = select(ActivityLog).where(ActivityLog.project_id == project_id)
+    if entity is not None:
+        stmt = stmt.where(ActivityLog.entity == entity)
+    if entity_id is not None:
+        stmt = stmt.where(ActivityLog.entity_id == entity_id)
+    if field is not None:
+        stmt = stmt.where(ActivityLog.field == field)
+    if since is not None:
+        stmt = stmt.where(ActivityLog.created_at >= since)
+    if until is not None:
+        stmt = stmt.where(ActivityLog.created_at < until)
+    if cursor:
+        stmt = stmt.where(tuple_(ActivityLog.created_at, ActivityLog.id) < tuple_(*decode_cursor(cursor)))
+    rows = session.exec(stmt.order_by(ActivityLog.created_at.desc(), ActivityLog.id.desc()).limit(limit + 1)).all()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "project_id": project_id,
+        "items": [
+            {"id": r.id, "entity": r.entity, "entity_id": r.entity_id, "field": r.field,
+             "old_value": r.old_value, "new_value": r.new_value, "created_at": r.created_at.isoformat()}
+            for r in rows
+        ],
+        "next_cursor": encode_cursor(rows[-1].created_at, rows[-1].id) if more else None,
+    }
+
+def backfill_project_ids(session: Session) -> int:
+    """Attribute task entries logged with project_id=0 to the task's project.
+
+    Entries whose task no longer exists are left alone. Affected rollups are rebuilt.
+    Stages changes; the caller commits.
+    """
+    owner = (select(Outcome.project_id).select_from(Task)
+             .join(Deliverable, Task.deliverable_id == Deliverable.id)
+             .join(Benefit, Deliverable.benefit_id == Benefit.id)
+             .join(Outcome, Benefit.outcome_id == Outcome.id)
+             .where(Task.id == ActivityLog.entity_id)
+             .scalar_subquery())
+    orphans = and_(ActivityLog.project_id == 0, ActivityLog.entity == "task")
+    by_project: Dict[int, List[int]] = {}
+    for task_id, pid in session.exec(select(ActivityLog.entity_id, owner).where(orphans).distinct()).all():
+        if pid is not None:
+            by_project.setdefault(pid, []).append(task_id)
+    n = 0
+    for pid, task_ids in by_project.items():
+        n += session.execute(update(ActivityLog).where(orphans, ActivityLog.entity_id.in_(task_ids))
+                             .values(project_id=pid)).rowcount
+        rebuild_rollup(session, pid)
+        bump_version(session, pid)
+    return n
+
+def compact_activity(session: Session, before: datetime) -> Dict[str, int]:
+    """Fold entries created before `before` into ActivityDailySummary rows and delete them.
+
+    Totals are preserved: rollup activity counts raw rows plus summarised changes, and
+    burn-up scope reads est_delta for the compacted days. Stages changes; the caller commits.
+    """
+    day = func.date(ActivityLog.created_at)
+    is_est = and_(ActivityLog.entity == "task", ActivityLog.field == "est_days")
+    delta = func.sum(func.coalesce(case((is_est, cast(ActivityLog.new_value, Integer) - cast(ActivityLog.old_value, Integer)), else_=0), 0))
+    groups = session.exec(
+        select(ActivityLog.project_id, day, ActivityLog.entity, ActivityLog.field, func.count(ActivityLog.id), delta)
+        .where(ActivityLog.created_at < before)
+        .group_by(ActivityLog.project_id, day, ActivityLog.entity, ActivityLog.field)
+    ).all()
+    if not groups:
+        return {"compacted": 0, "summaries": 0, "projects": 0}
+
+    pids = {g[0] for g in groups}
+    existing = {(s.project_id, s.day, s.entity, s.field): s for s in session.exec(
+        select(ActivityDailySummary).where(ActivityDailySummary.project_id.in_(pids),
+                                           ActivityDailySummary.day < before.date() + timedelta(days=1))).all()}
+    for pid, d, entity, field, n, est in groups:
+        key = (pid, date.fromisoformat(str(d)[:10]), entity, field)
+        row = existing.get(key)
+        if row is None:
+            row = existing[key] = ActivityDailySummary(project_id=pid, day=key[1], entity=entity, field=field)
+            session.add(row)
+        row.changes += int(n)
+        row.est_delta += int(est or 0)
+    compacted = session.execute(delete(ActivityLog).where(ActivityLog.created_at < before)).rowcount
+    # project_id=0 and deleted projects have no cached responses to invalidate
+    live = session.exec(select(Project.id).where(Project.id.in_(pids))).all()
+    for pid in live:
+        bump_version(session, pid)
+    return {"compacted": compacted, "summaries": len(groups), "projects": len(live)}
+
+def run_retention(session: Session, retention_days: Optional[int] = None, backfill: bool = True) -> Dict[str, int]:
+    days = settings.activity_retention_days if retention_days is None else retention_days
+    out = {"backfilled": backfill_project_ids(session) if backfill else 0}
+    out.update(compact_activity(session, datetime.utcnow() - timedelta(days=days)))
+    session.commit()
+    return out
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+    from ..db.database import engine, create_db_and_tables
+
+    ap = argparse.ArgumentParser(description="Compact old ActivityLog entries into per-day summaries.")
+    ap.add_argument("--retention-days", type=int, default=None,
+                    help=f"keep raw entries this many days (default {settings.activity_retention_days})")
+    ap.add_argument("--no-backfill", action="store_true", help="skip attributing project_id=0 task entries")
+    args = ap.parse_args(argv)
+
+    create_db_and_tables()
+    with Session(engine) as session:
+        print(json.dumps(run_retention(session, args.retention_days, backfill=not args.no_backfill)))
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,133 @@
+
+from datetime import date, timedelta
+from itertools import accumulate
+from typing import Dict, List, Sequence, Tuple
+from sqlalchemy import Integer, cast, func
+from sqlmodel import Session, select
+from .hierarchy import current_state, task_scope
+from ..models.entities import Task, TaskState, ActivityLog, ActivityDailySummary
+
+try:  # optional: vectorised prefix sums / bucketing
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised when numpy is absent
+    np = None
+
+_POINTS = func.coalesce(Task.est_days, 1)
+
+def _as_date(v) -> date:
+    return v if isinstance(v, date) else date.fromisoformat(str(v)[:10])
+
+def total_points(session: Session, project_id: int) -> int:
+    return int(session.exec(task_scope(select(func.coalesce(func.sum(_POINTS), 0)), project_id)).one())
+
+def done_points_by_day(session: Session, project_id: int) -> Dict[date, int]:
+    """Completed points per completion day, bucketed by a GROUP BY on the database side.
+
+    Counts each task's current TaskState only, as the dashboard's snapshot does.
+    """
+    day = func.date(TaskState.updated_at)
+    rows = session.exec(
+        current_state(task_scope(select(day, func.sum(_POINTS)).select_from(Task)
+                                 .join(TaskState, TaskState.task_id == Task.id), project_id))
+        .where(TaskState.done == True)  # noqa: E712
+        .group_by(day)
+    ).all()
+    return {_as_date(d): int(pts) for d, pts in rows if d is not None}
+
+def scope_changes_by_day(session: Session, project_id: int) -> Dict[date, int]:
+    """Net est_days change per day, from the task est_days entries in the ActivityLog
+    plus the days already compacted into ActivityDailySummary."""
+    day = func.date(ActivityLog.created_at)
+    delta = func.sum(cast(ActivityLog.new_value, Integer) - cast(ActivityLog.old_value, Integer))
+    rows = session.exec(
+        task_scope(select(day, delta).select_from(ActivityLog)
+                   .join(Task, ActivityLog.entity_id == Task.id), project_id)
+        .where(ActivityLog.entity == "task", ActivityLog.field == "est_days")
+        .group_by(day)
+    ).all()
+    out: Dict[date, int] = {}
+    for d, n in rows:
+        if d is not None and n:
+            out[_as_date(d)] = int(n)
+    for d, n in session.exec(
+        select(ActivityDailySummary.day, ActivityDailySummary.est_delta)
+        .where(ActivityDailySummary.project_id == project_id, ActivityDailySummary.entity == "task",
+               ActivityDailySummary.field == "est_days", ActivityDailySummary.est_delta != 0)
+    ).all():
+        out[d] = out.get(d, 0) + int(n)
+    return out
+
+def _cumsum(values: Sequence[int]) -> List[int]:
+    if np is not None:
+        return np.cumsum(np.asarray(values, dtype=np.int64)).tolist()
+    return list(accumulate(values))
+
+def daily_series(t0: date, n_days: int, by_day: Dict[date, int]) -> List[int]:
+    """Cumulative totals for days t0 .. t0+n_days-1; amounts dated before t0 land on day 0."""
+    daily = [0] * n_days
+    for d, pts in by_day.items():
+        i = (d - t0).days
+        if i < n_days:
+            daily[max(i, 0)] += pts
+    return _cumsum(daily)
+
+def burn_down(t0: date, sprint_days: int, total: int, done_by_day: Dict[date, int]) -> Dict:
+    days = max(1, int(sprint_days))
+    labels = [(t0 + timedelta(days=i)) for i in range(days+1)]
+    ideal = [round(total * (1 - i/days), 2) for i in range(days+1)]
+    done = daily_series(t0, days + 1, done_by_day)
+    actual = [max(0, total - x) for x in done]
+    return {
+        "start": t0.isoformat(),
+        "sprint_days": days,
+        "labels": [d.isoformat() for d in labels],
+        "ideal": ideal,
+        "actual": actual,
+        "total_points": total,
+    }
+
+def velocity(t0: date, sprint_days: int, periods: int, done_by_day: Dict[date, int]) -> Dict:
+    days = max(1, int(sprint_days))
+    periods = max(0, int(periods))
+    items: List[Tuple[int, int]] = [((d - t0).days // days, pts) for d, pts in done_by_day.items() if d >= t0]
+    items = [(i, pts) for i, pts in items if i < periods]
+    if np is not None and items:
+        idx, pts = zip(*items)
+        vel = np.bincount(idx, weights=pts, minlength=periods).astype(np.int64).tolist()
+    else:
+        vel = [0] * periods
+        for i, pts in items:
+            vel[i] += pts
+    labels = []
+    for i in range(periods):
+        s = t0 + timedelta(days=i*days)
+        e = s + timedelta(days=days)
+        labels.append(f"S{i+1} {s.isoformat()}→{e.isoformat()}")
+    return {"sprint_days": days, "labels": labels, "velocity": vel}
+
+def burn_up(t0: date, sprint_days: int, sprints: int, total_now: int,
+            done_by_day: Dict[date, int], scope_by_day: Dict[date, int]) -> Dict:
+    """Multi-sprint burn-up: a scope line and a cumulative done line, one point per day.
+
+    Scope is reconstructed backwards from today's total by undoing the est_days changes
+    logged after each day; tasks are assumed to exist from the project start.
+    """
+    days = max(1, int(sprint_days))
+    sprints = max(1, int(sprints))
+    n = days * sprints + 1
+    labels = [(t0 + timedelta(days=i)) for i in range(n)]
+    done = daily_series(t0, n, done_by_day)
+    # scope(d) = total_now - (changes logged after d) = total_now - total_changes + changes up to d
+    applied = daily_series(t0, n, scope_by_day)
+    pending = sum(scope_by_day.values())
+    scope = [total_now - pending + x for x in applied]
+    return {
+        "start": t0.isoformat(),
+        "sprint_days": days,
+        "sprints": sprints,
+        "labels": [d.isoformat() for d in labels],
+        "sprint_boundaries": [labels[i * days].isoformat() for i in range(sprints + 1)],
+        "scope": scope,
+        "done": done,
+        "total_points": total_now,
+    }
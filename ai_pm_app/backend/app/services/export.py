@@ -0,0 +1,149 @@
+
+import csv
+import io
+import json
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, Iterable, Iterator, List
+from sqlmodel import Session, select
+from ..models.entities import Project, Outcome, Benefit, Deliverable, Task, BudgetLine, GovernanceEvent, ReportSpec, Risk, TaskState
+from .scheduling import compute_schedule, ScheduleCycleError
+
+BATCH_ROWS = 1000          # rows fetched per cursor batch
+CHUNK_BYTES = 64 * 1024    # response bytes buffered before a chunk is sent
+
+# Column order for CSV; NDJSON uses the same keys
+COLUMNS: Dict[str, List[str]] = {
+    "tree": ["type", "id", "parent_id", "name", "description", "est_days", "depends_on_id",
+             "amount", "category", "probability", "impact", "mitigation", "cadence", "owner", "frequency", "audience"],
+    "backlog": ["task_id", "task", "deliverable_id", "deliverable", "est_days", "status", "done"],
+    "timeline": ["deliverable_id", "deliverable", "task_id", "task", "depends_on_id", "start", "end",
+                 "duration_days", "latest_start", "latest_finish", "slack_days", "critical"],
+}
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+def _hierarchy(*cols):
+    """Columns of every outcome/benefit/deliverable/task path of a project, in hierarchy order."""
+    return (select(*cols).select_from(Outcome)
+            .outerjoin(Benefit, Benefit.outcome_id == Outcome.id)
+            .outerjoin(Deliverable, Deliverable.benefit_id == Benefit.id)
+            .outerjoin(Task, Task.deliverable_id == Deliverable.id))
+
+def _stream(session: Session, stmt):
+    return session.execute(stmt, execution_options={"yield_per": BATCH_ROWS})
+
+def tree_rows(session: Session, project_id: int) -> Iterator[Dict[str, Any]]:
+    """The project tree as flat rows (parents before children) from one streamed join."""
+    p = session.get(Project, project_id)
+    yield {"type": "project", "id": p.id, "name": p.name, "description": p.description}
+    stmt = (_hierarchy(Outcome.id, Outcome.name, Outcome.description,
+                       Benefit.id, Benefit.name, Benefit.description,
+                       Deliverable.id, Deliverable.name, Deliverable.description,
+                       Task.id, Task.name, Task.est_days, Task.depends_on_id)
+            .where(Outcome.project_id == project_id)
+            .order_by(Outcome.id, Benefit.id, Deliverable.id, Task.id))
+    last = {"outcome": None, "benefit": None, "deliverable": None}
+    for o_id, o_name, o_desc, b_id, b_name, b_desc, d_id, d_name, d_desc, t_id, t_name, t_est, t_dep in _stream(session, stmt):
+        if o_id != last["outcome"]:
+            last["outcome"] = o_id
+            yield {"type": "outcome", "id": o_id, "parent_id": project_id, "name": o_name, "description": o_desc}
+        if b_id is not None and b_id != last["benefit"]:
+            last["benefit"] = b_id
+            yield {"type": "benefit", "id": b_id, "parent_id": o_id, "name": b_name, "description": b_desc}
+        if d_id is not None and d_id != last["deliverable"]:
+            last["deliverable"] = d_id
+            yield {"type": "deliverable", "id": d_id, "parent_id": b_id, "name": d_name, "description": d_desc}
+        if t_id is not None:
+            yield {"type": "task", "id": t_id, "parent_id": d_id, "name": t_name, "est_days": t_est, "depends_on_id": t_dep}
+
+    extras = (
+        (BudgetLine, lambda r: {"type": "budget", "id": r.id, "parent_id": project_id, "name": r.item, "amount": r.amount, "category": r.category}),
+        (GovernanceEvent, lambda r: {"type": "governance", "id": r.id, "parent_id": project_id, "name": r.name, "cadence": r.cadence, "owner": r.owner}),
+        (ReportSpec, lambda r: {"type": "reporting", "id": r.id, "parent_id": project_id, "name": r.name, "frequency": r.frequency, "audience": r.audience}),
+        (Risk, lambda r: {"type": "risk", "id": r.id, "parent_id": project_id, "name": r.title, "probability": r.probability, "impact": r.impact, "mitigation": r.mitigation}),
+    )
+    for Model, to_row in extras:
+        for r in _stream(session, select(Model).where(Model.project_id == project_id).order_by(Model.id)).scalars():
+            yield to_row(r)
+
+def backlog_rows(session: Session, project_id: int) -> Iterator[Dict[str, Any]]:
+    """One row per task with its status (first TaskState row per task, as the backlog panel)."""
+    stmt = (_hierarchy(Task.id, Task.name, Deliverable.id, Deliverable.name, Task.est_days, TaskState.status, TaskState.done)
+            .outerjoin(TaskState, TaskState.task_id == Task.id)
+            .where(Outcome.project_id == project_id, Task.id.is_not(None))
+            .order_by(Outcome.id, Benefit.id, Deliverable.id, Task.id, TaskState.id))
+    last = None
+    for t_id, t_name, d_id, d_name, est, status, done in _stream(session, stmt):
+        if t_id == last:
+            continue
+        last = t_id
+        yield {"task_id": t_id, "task": t_name, "deliverable_id": d_id, "deliverable": d_name,
+               "est_days": int(est or 1), "status": status or "todo", "done": bool(done)}
+
+def timeline_rows(session: Session, project_id: int, t0: date) -> Iterator[Dict[str, Any]]:
+    """Scheduled tasks in hierarchy order.
+
+    Scheduling needs the whole dependency graph, so ids and durations are loaded (and a
+    ScheduleCycleError raised) before this returns; names are re-read while streaming.
+    """
+    ids, durations, deps = [], [], []
+    stmt = (_hierarchy(Task.id, Task.est_days, Task.depends_on_id)
+            .where(Outcome.project_id == project_id, Task.id.is_not(None))
+            .order_by(Outcome.id, Benefit.id, Deliverable.id, Task.id))
+    for t_id, est, dep in _stream(session, stmt):
+        ids.append(t_id)
+        durations.append(max(int(est or 1), 1))
+        deps.append(dep)
+    pos = {t: i for i, t in enumerate(ids)}
+    try:
+        sched = compute_schedule(durations, [pos.get(d, -1) if d is not None else -1 for d in deps])
+    except ScheduleCycleError as e:
+        e.task_ids = [ids[i] for i in e.cycle]
+        raise
+
+    def day(n: int) -> str:
+        return (t0 + timedelta(days=n)).isoformat()
+
+    def rows() -> Iterator[Dict[str, Any]]:
+        names = (_hierarchy(Deliverable.id, Deliverable.name, Task.id, Task.name)
+                 .where(Outcome.project_id == project_id, Task.id.is_not(None))
+                 .order_by(Outcome.id, Benefit.id, Deliverable.id, Task.id))
+        for d_id, d_name, t_id, t_name in _stream(session, names):
+            i = pos.get(t_id)
+            if i is None:  # added after the schedule was computed
+                continue
+            yield {"deliverable_id": d_id, "deliverable": d_name, "task_id": ids[i], "task": t_name,
+                   "depends_on_id": deps[i], "start": day(sched.es[i]), "end": day(sched.ef[i]),
+                   "duration_days": durations[i], "latest_start": day(sched.ls[i]),
+                   "latest_finish": day(sched.lf[i]), "slack_days": sched.slack[i], "critical": sched.critical[i]}
+    return rows()
+
+def encode_ndjson(rows: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    buf: List[str] = []
+    size = 0
+    for row in rows:
+        line = json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n"
+        buf.append(line)
+        size += len(line)
+        if size >= CHUNK_BYTES:
+            yield "".join(buf).encode("utf-8")
+            buf, size = [], 0
+    if buf:
+        yield "".join(buf).encode("utf-8")
+
+def encode_csv(rows: Iterable[Dict[str, Any]], columns: List[str]) -> Iterator[bytes]:
+    out = io.StringIO()
+    w = csv.DictWriter(out, fieldnames=columns, extrasaction="ignore")
+    w.writeheader()
+    for row in rows:
+        w.writerow(row)
+        if out.tell() >= CHUNK_BYTES:
+            yield out.getvalue().encode("utf-8")
+            out.seek(0)
+            out.truncate()
+    if out.tell():
+        yield out.getvalue().encode("utf-8")
+
+ENCODERS: Dict[str, Callable[[Iterable[Dict[str, Any]], List[str]], Iterator[bytes]]] = {
+    "ndjson": lambda rows, _cols: encode_ndjson(rows),
+    "csv": encode_csv,
+}
@@ -0,0 +1,48 @@
+
+import hashlib
+from typing import Any, Dict, Optional
+from ..core.cache import CacheBackend, SQLiteCache
+from ..core.config import settings
+from ..models.schemas import GenProject
+
+# Bump when build_prompt or the expected output changes, so old results stop matching
+PROMPT_VERSION = "1"
+
+class GenerationCache(SQLiteCache):
+    """On-disk LRU of validated GenProject JSON, shared by all workers on the host.
+
+    Entries are not tied to a project, so they are stored under project_id 0.
+    """
+    name = "sqlite-generation"
+
+    def __init__(self, path: str, max_entries: int, max_bytes: int, ttl: Optional[float]):
+        super().__init__(path, max_entries, max_bytes, float("inf") if ttl is None else ttl)
+        self.ttl_setting = ttl
+
+    def info(self) -> Dict[str, Any]:
+        return {**super().info(), "ttl_seconds": self.ttl_setting}
+
+def make_generation_cache() -> CacheBackend:
+    if not settings.gen_cache_enabled:
+        return CacheBackend()
+    return GenerationCache(settings.gen_cache_path, settings.gen_cache_max_entries,
+                           settings.gen_cache_max_bytes, settings.gen_cache_ttl_seconds)
+
+generation_cache: CacheBackend = make_generation_cache()
+
+def normalise_vision(vision: str) -> str:
+    return " ".join(vision.split())
+
+def generation_key(vision: str, model_id: Optional[str] = None) -> str:
+    raw = "\x1f".join((normalise_vision(vision), PROMPT_VERSION, model_id or settings.llm_model_id))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def get_cached(vision: str) -> Optional[GenProject]:
+    body = generation_cache.get(generation_key(vision))
+    if body is None:
+        return None
+    # visions that normalise equal share an entry; report the caller's own wording
+    return GenProject.model_validate_json(body).model_copy(update={"vision": vision})
+
+def put_cached(vision: str, gen: GenProject) -> None:
+    generation_cache.set(generation_key(vision), 0, gen.model_dump_json().encode("utf-8"))
@@ -1,8 +1,16 @@
 
-from typing import Dict, Any, List
+import json
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Callable, Optional, Union
+from sqlalchemy import insert, update
 from sqlmodel import Session
-from ..models.schemas import GenProject, GenOutcome, GenBenefit, GenDeliverable, GenTask, GenBudgetLine, GenGovernanceEvent, GenReportSpec, GenRisk
+from ..models.schemas import parse_generated, GenProject, GenOutcome, GenBenefit, GenDeliverable, GenTask, GenBudgetLine, GenGovernanceEvent, GenReportSpec, GenRisk
 from ..models.entities import Project, Outcome, Benefit, Deliverable, Task, BudgetLine, GovernanceEvent, ReportSpec, Risk
+from .rollups import insert_rollups, rollup_values_from_generated
+from .versioning import insert_versions
+from ..core.config import settings
+from .generation_cache import get_cached, put_cached
 
 def build_prompt(vision: str) -> str:
     # For now this is just a placeholder. Later, you’ll add seeds/constraints here.
@@ -70,67 +78,140 @@ def llm_generate_fixture(vision: str) -> Dict[str, Any]:
         ],
     }
 
-def validate_generated(raw: Dict[str, Any]) -> GenProject:
-    # Pydantic enforces structure and types
-    return GenProject(**raw)
+def llm_generate(prompt: str, vision: str) -> bytes:
+    # Local stand-in for the model call. It returns the raw JSON body, as the API would, so
+    # validate_generated parses it in one pass; LLM_FAKE_LATENCY_MS simulates the latency
+    if settings.llm_fake_latency_ms > 0:
+        time.sleep(settings.llm_fake_latency_ms / 1000)
+    return json.dumps(llm_generate_fixture(vision)).encode("utf-8")
 
-def persist_generated(session: Session, gen: GenProject) -> int:
-    # Insert Project
-    p = Project(name=gen.name, vision=gen.vision, description=gen.description)
-    session.add(p)
-    session.commit()
-    session.refresh(p)
-
-    # Walk tree inserting rows
-    for o in gen.outcomes:
-        o_row = Outcome(project_id=p.id, name=o.name, description=o.description)
-        session.add(o_row); session.commit()
-        for b in o.benefits:
-            b_row = Benefit(outcome_id=o_row.id, name=b.name, description=b.description)
-            session.add(b_row); session.commit()
+def validate_generated(raw: Union[bytes, str, Dict[str, Any]]) -> GenProject:
+    # Pydantic enforces structure, types and task dependencies; raw JSON skips the dict step
+    return parse_generated(raw)
+
+def _insert_ids(session: Session, model, rows: List[Dict[str, Any]]) -> List[int]:
+    if not rows:
+        return []
+    conn = session.connection()
+    if conn.dialect.name != "sqlite":
+        # executemany INSERT ... RETURNING id, ids come back in parameter order
+        stmt = insert(model).returning(model.id, sort_by_parameter_order=True)
+        return list(session.scalars(stmt, rows))
+    # SQLite has no insert sentinel, so ordered RETURNING falls back to one INSERT per row.
+    # A multi-row VALUES insert inside the write transaction assigns consecutive rowids
+    # ending at lastrowid instead.
+    per = max(1, conn.dialect.insertmanyvalues_max_parameters // len(rows[0]))
+    ids: List[int] = []
+    for i in range(0, len(rows), per):
+        chunk = rows[i:i + per]
+        last = conn.execute(insert(model).values(chunk)).lastrowid
+        ids.extend(range(last - len(chunk) + 1, last + 1))
+    return ids
+
+def _insert_rows(session: Session, model, rows: List[Dict[str, Any]]) -> None:
+    if rows:
+        session.execute(insert(model), rows)
+
+def persist_many(session: Session, gens: List[GenProject], commit: bool = True) -> List[int]:
+    """Insert many generated plans in one transaction; returns the new project ids in input order.
+
+    Each table is written with a single executemany, and task dependencies are resolved
+    in memory from the returned ids instead of re-reading rows.
+    """
+    try:
+        project_ids = _insert_ids(session, Project, [
+            {"name": g.name, "vision": g.vision, "description": g.description} for g in gens
+        ])
+
+        outcome_rows, outcome_src = [], []
+        for pid, g in zip(project_ids, gens):
+            for o in g.outcomes:
+                outcome_rows.append({"project_id": pid, "name": o.name, "description": o.description})
+                outcome_src.append(o)
+        outcome_ids = _insert_ids(session, Outcome, outcome_rows)
+
+        benefit_rows, benefit_src = [], []
+        for oid, o in zip(outcome_ids, outcome_src):
+            for b in o.benefits:
+                benefit_rows.append({"outcome_id": oid, "name": b.name, "description": b.description})
+                benefit_src.append(b)
+        benefit_ids = _insert_ids(session, Benefit, benefit_rows)
+
+        deliverable_rows, deliverable_src = [], []
+        for bid, b in zip(benefit_ids, benefit_src):
             for d in b.deliverables:
-                d_row = Deliverable(benefit_id=b_row.id, name=d.name, description=d.description)
-                session.add(d_row); session.commit()
-                # build tasks and resolve depends_on_index -> task ids
-                task_ids: List[int] = []
-                for idx, t in enumerate(d.tasks):
-                    t_row = Task(deliverable_id=d_row.id, name=t.name, est_days=t.est_days, depends_on_id=None)
-                    session.add(t_row); session.commit(); session.refresh(t_row)
-                    task_ids.append(t_row.id)
-                # now set depends_on_id if any
-                for idx, t in enumerate(d.tasks):
-                    if t.depends_on_index is not None:
-                        depends_idx = t.depends_on_index
-                        if depends_idx < 0 or depends_idx >= len(task_ids):
-                            # invalid reference; skip instead of failing hard
-                            continue
-                        target_id = task_ids[depends_idx]
-                        tr = session.get(Task, task_ids[idx])
-                        tr.depends_on_id = target_id
-                        session.add(tr)
-                session.commit()
-
-    for bl in gen.budget:
-        session.add(BudgetLine(project_id=p.id, item=bl.item, amount=bl.amount, category=bl.category))
-    for g in gen.governance:
-        session.add(GovernanceEvent(project_id=p.id, name=g.name, cadence=g.cadence, owner=g.owner))
-    for r in gen.reporting:
-        session.add(ReportSpec(project_id=p.id, name=r.name, frequency=r.frequency, audience=r.audience))
-    for rk in gen.risks:
-        session.add(Risk(project_id=p.id, title=rk.title, probability=rk.probability, impact=rk.impact, mitigation=rk.mitigation))
-
-    session.commit()
-    return p.id
-
-def generate_and_persist(session: Session, vision: str) -> int:
+                deliverable_rows.append({"benefit_id": bid, "name": d.name, "description": d.description})
+                deliverable_src.append(d)
+        deliverable_ids = _insert_ids(session, Deliverable, deliverable_rows)
+
+        task_rows, now = [], datetime.utcnow()
+        for did, d in zip(deliverable_ids, deliverable_src):
+            for t in d.tasks:
+                task_rows.append({"deliverable_id": did, "name": t.name, "est_days": t.est_days, "depends_on_id": None,
+                                  "created_at": now})
+        task_ids = _insert_ids(session, Task, task_rows)
+
+        # resolve depends_on_index -> task ids, per deliverable
+        dep_updates = []
+        pos = 0
+        for d in deliverable_src:
+            ids = task_ids[pos:pos + len(d.tasks)]
+            for idx, t in enumerate(d.tasks):
+                depends_idx = t.depends_on_index
+                if depends_idx is None or depends_idx < 0 or depends_idx >= len(ids):
+                    # invalid reference; skip instead of failing hard
+                    continue
+                dep_updates.append({"id": ids[idx], "depends_on_id": ids[depends_idx]})
+            pos += len(d.tasks)
+        if dep_updates:
+            session.execute(update(Task), dep_updates)
+
+        budget, governance, reporting, risks = [], [], [], []
+        for pid, g in zip(project_ids, gens):
+            budget += [{"project_id": pid, "item": bl.item, "amount": bl.amount, "category": bl.category} for bl in g.budget]
+            governance += [{"project_id": pid, "name": ev.name, "cadence": ev.cadence, "owner": ev.owner} for ev in g.governance]
+            reporting += [{"project_id": pid, "name": r.name, "frequency": r.frequency, "audience": r.audience} for r in g.reporting]
+            risks += [{"project_id": pid, "title": rk.title, "probability": rk.probability, "impact": rk.impact, "mitigation": rk.mitigation} for rk in g.risks]
+        _insert_rows(session, BudgetLine, budget)
+        _insert_rows(session, GovernanceEvent, governance)
+        _insert_rows(session, ReportSpec, reporting)
+        _insert_rows(session, Risk, risks)
+        insert_rollups(session, [
+            {"project_id": pid, **rollup_values_from_generated(g)} for pid, g in zip(project_ids, gens)
+        ])
+        insert_versions(session, project_ids)
+
+        if commit:
+            session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    return project_ids
+
+def persist_generated(session: Session, gen: GenProject) -> int:
+    return persist_many(session, [gen])[0]
+
+def generate_and_persist(session: Session, vision: str, on_stage: Optional[Callable[[str], None]] = None,
+                         use_cache: bool = True) -> int:
+    """Generate, validate and persist a plan. With `use_cache` a cached result for the same
+    normalised vision, prompt version and model is reused; a bypassed call still refreshes it."""
+    stage = on_stage or (lambda _name: None)
+
     # 1) build prompt (stubbed)
-    _prompt = build_prompt(vision)
+    stage("prompt")
+    prompt = build_prompt(vision)
 
     # 2) (Stub) call fixture instead of a real LLM
-    raw = llm_generate_fixture(vision)
+    stage("generate")
+    gen = get_cached(vision) if use_cache else None
+    if gen is None:
+        raw = llm_generate(prompt, vision)
 
-    # 3) validate against strict schema
-    gen = validate_generated(raw)
+        # 3) validate against strict schema
+        stage("validate")
+        gen = validate_generated(raw)
+        put_cached(vision, gen)
 
     # 4) persist to DB and return new id
+    stage("persist")
     return persist_generated(session, gen)
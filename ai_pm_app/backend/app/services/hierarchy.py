@@ -0,0 +1,118 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import aliased
+from sqlmodel import Session, select
+from ..models.entities import Project, Outcome, Benefit, Deliverable, Task, BudgetLine, GovernanceEvent, ReportSpec, Risk, TaskState
+
+@dataclass
+class ProjectSnapshot:
+    """In-memory, indexed copy of one project's hierarchy.
+
+    Every level is loaded with a single set-based query, so building a snapshot
+    costs the same number of round trips whatever the size of the project.
+    """
+    project: Project
+    outcomes: List[Outcome] = field(default_factory=list)
+    benefits: List[Benefit] = field(default_factory=list)
+    deliverables: List[Deliverable] = field(default_factory=list)
+    tasks: List[Task] = field(default_factory=list)
+    budget: List[BudgetLine] = field(default_factory=list)
+    governance: List[GovernanceEvent] = field(default_factory=list)
+    reporting: List[ReportSpec] = field(default_factory=list)
+    risks: List[Risk] = field(default_factory=list)
+    states: Dict[int, TaskState] = field(default_factory=dict)  # task_id -> TaskState
+
+    def __post_init__(self):
+        self.benefits_by_outcome: Dict[int, List[Benefit]] = _group(self.benefits, "outcome_id")
+        self.deliverables_by_benefit: Dict[int, List[Deliverable]] = _group(self.deliverables, "benefit_id")
+        self.tasks_by_deliverable: Dict[int, List[Task]] = _group(self.tasks, "deliverable_id")
+        self.deliverable_by_id: Dict[int, Deliverable] = {d.id: d for d in self.deliverables}
+        self.task_by_id: Dict[int, Task] = {t.id: t for t in self.tasks}
+
+    def iter_tasks(self):
+        """Yield (deliverable, task) in hierarchy order (outcome → benefit → deliverable → task)."""
+        for o in self.outcomes:
+            for b in self.benefits_by_outcome.get(o.id, []):
+                for d in self.deliverables_by_benefit.get(b.id, []):
+                    for t in self.tasks_by_deliverable.get(d.id, []):
+                        yield d, t
+
+    def task_status(self, task_id: int) -> str:
+        st = self.states.get(task_id)
+        return st.status if st else "todo"
+
+    def task_done(self, task_id: int) -> bool:
+        st = self.states.get(task_id)
+        return bool(st.done) if st else False
+
+def _group(rows, key: str) -> Dict[int, list]:
+    out: Dict[int, list] = {}
+    for r in rows:
+        out.setdefault(getattr(r, key), []).append(r)
+    return out
+
+def deliverable_scope(stmt, project_id: int):
+    """Restrict a statement that selects from Deliverable to the deliverables of one project."""
+    return (stmt.join(Benefit, Deliverable.benefit_id == Benefit.id)
+                .join(Outcome, Benefit.outcome_id == Outcome.id)
+                .where(Outcome.project_id == project_id))
+
+def task_scope(stmt, project_id: int):
+    """Restrict a statement that selects from Task to the tasks of one project."""
+    return deliverable_scope(stmt.join(Deliverable, Task.deliverable_id == Deliverable.id), project_id)
+
+def current_state(stmt):
+    """Keep only each task's current TaskState: its first row, the one the write paths update."""
+    first = aliased(TaskState)
+    return stmt.where(TaskState.id == select(func.min(first.id)).where(first.task_id == TaskState.task_id)
+                      .scalar_subquery())
+
+def load_project_snapshot(session: Session, project_id: int, with_states: bool = True, with_extras: bool = True) -> Optional[ProjectSnapshot]:
+    """Load a whole project in a constant number of queries; returns None if it does not exist.
+
+    `with_states` adds the TaskState rows, `with_extras` the budget/governance/reporting/risk lists.
+    """
+    p = session.get(Project, project_id)
+    if not p:
+        return None
+
+    outcomes = session.exec(
+        select(Outcome).where(Outcome.project_id == project_id).order_by(Outcome.id)
+    ).all()
+    benefits = session.exec(
+        select(Benefit)
+        .join(Outcome, Benefit.outcome_id == Outcome.id)
+        .where(Outcome.project_id == project_id)
+        .order_by(Benefit.id)
+    ).all()
+    deliverables = session.exec(
+        deliverable_scope(select(Deliverable), project_id).order_by(Deliverable.id)
+    ).all()
+    tasks = session.exec(
+        task_scope(select(Task), project_id).order_by(Task.id)
+    ).all()
+    states: Dict[int, TaskState] = {}
+    if with_states:
+        states = _load_states(session, project_id)
+
+    snap = ProjectSnapshot(
+        project=p,
+        outcomes=list(outcomes),
+        benefits=list(benefits),
+        deliverables=list(deliverables),
+        tasks=list(tasks),
+        states=states,
+    )
+    if with_extras:
+        snap.budget = list(session.exec(select(BudgetLine).where(BudgetLine.project_id == project_id)).all())
+        snap.governance = list(session.exec(select(GovernanceEvent).where(GovernanceEvent.project_id == project_id)).all())
+        snap.reporting = list(session.exec(select(ReportSpec).where(ReportSpec.project_id == project_id)).all())
+        snap.risks = list(session.exec(select(Risk).where(Risk.project_id == project_id)).all())
+    return snap
+
+def _load_states(session: Session, project_id: int) -> Dict[int, TaskState]:
+    state_rows = session.exec(
+        current_state(task_scope(select(TaskState).join(Task, TaskState.task_id == Task.id), project_id))
+    ).all()
+    return {st.task_id: st for st in state_rows}
@@ -0,0 +1,227 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import delete, func, insert, or_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import Session, select
+from ..models.entities import Outcome, Benefit, Deliverable, Task, TaskState, TaskTransition, TaskFlowDaily
+from .hierarchy import task_scope
+from .rollups import status_bucket
+from .versioning import bump_version
+
+# (task_id, from_status, to_status, points)
+Move = Tuple[int, str, str, int]
+
+_FLOW_COLUMNS = ("done_points", "done_tasks", "reopened", "started", "cycle_tasks", "cycle_seconds")
+# dialects with INSERT ... ON CONFLICT DO UPDATE
+_UPSERT = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+def _flow_delta(frm: str, to: str, points: int) -> Dict[str, float]:
+    frm, to = status_bucket(frm), status_bucket(to)
+    d: Dict[str, float] = {}
+    if to == "done" and frm != "done":
+        d["done_points"], d["done_tasks"] = points, 1
+    elif frm == "done" and to != "done":
+        d["done_points"], d["done_tasks"], d["reopened"] = -points, -1, 1
+    if frm == "todo" and to == "inprogress":
+        d["started"] = 1
+    return d
+
+def _add(acc: Dict[str, float], delta: Dict[str, float]) -> None:
+    for k, v in delta.items():
+        acc[k] = acc.get(k, 0) + v
+
+def _is_reopen(frm: str, to: str) -> bool:
+    return status_bucket(frm) == "done" and status_bucket(to) != "done"
+
+def _completion_points(session: Session, task_ids: List[int]) -> Dict[int, int]:
+    """Points each task was credited with by its latest move into done."""
+    rows = session.exec(select(TaskTransition.task_id, TaskTransition.points)
+                        .where(TaskTransition.task_id.in_(task_ids), TaskTransition.to_status == "done")
+                        .order_by(TaskTransition.at, TaskTransition.id)).all()
+    return {tid: pts for tid, pts in rows}
+
+def record_transitions(session: Session, project_id: int, moves: Iterable[Move], at: Optional[datetime] = None) -> int:
+    """Append one TaskTransition per actual status move and fold it into that day's TaskFlowDaily row.
+
+    Cycle time of a move into done runs from the task's first move to inprogress, looked up
+    with one grouped query over the (task_id, at) index. Stages changes; the caller commits.
+    """
+    at = at or datetime.utcnow()
+    moves = [(tid, frm or "todo", to, int(pts or 1)) for tid, frm, to, pts in moves if (frm or "todo") != to]
+    if not moves:
+        return 0
+    # a reopen takes back what the completion credited, even if est_days changed since
+    reopened = [tid for tid, frm, to, _ in moves if _is_reopen(frm, to)]
+    credited = _completion_points(session, reopened) if reopened else {}
+    session.execute(insert(TaskTransition), [
+        {"task_id": tid, "project_id": project_id, "from_status": frm, "to_status": to, "points": pts, "at": at}
+        for tid, frm, to, pts in moves])
+
+    delta: Dict[str, float] = {}
+    for tid, frm, to, pts in moves:
+        _add(delta, _flow_delta(frm, to, credited.get(tid, pts)))
+    finished = [tid for tid, frm, to, _ in moves if status_bucket(to) == "done" and status_bucket(frm) != "done"]
+    if finished:
+        started = session.exec(
+            select(TaskTransition.task_id, func.min(TaskTransition.at))
+            .where(TaskTransition.task_id.in_(finished), TaskTransition.to_status == "inprogress")
+            .group_by(TaskTransition.task_id)
+        ).all()
+        for _tid, first in started:
+            _add(delta, {"cycle_tasks": 1, "cycle_seconds": (at - first).total_seconds()})
+    _bump_flow(session, project_id, at.date(), delta)
+    return len(moves)
+
+def _bump_flow(session: Session, project_id: int, day: date, delta: Dict[str, float]) -> None:
+    # one INSERT ... ON CONFLICT DO UPDATE col = col + delta: concurrent writers neither lose
+    # increments nor race to create the day's row
+    delta = {k: v for k, v in delta.items() if v}
+    if not delta:
+        return
+    make_insert = _UPSERT.get(session.get_bind().dialect.name)
+    if make_insert is None:  # other backends: update, then insert when the row is missing
+        res = session.execute(update(TaskFlowDaily)
+                              .where(TaskFlowDaily.project_id == project_id, TaskFlowDaily.day == day)
+                              .values({k: getattr(TaskFlowDaily, k) + v for k, v in delta.items()}))
+        if res.rowcount == 0:
+            session.execute(insert(TaskFlowDaily), [{"project_id": project_id, "day": day, **delta}])
+        return
+    stmt = make_insert(TaskFlowDaily).values(project_id=project_id, day=day, **delta)
+    session.execute(stmt.on_conflict_do_update(
+        index_elements=[TaskFlowDaily.project_id, TaskFlowDaily.day],
+        set_={k: getattr(TaskFlowDaily, k) + stmt.excluded[k] for k in delta}))
+
+def flow_by_day(session: Session, project_id: int) -> List[TaskFlowDaily]:
+    return list(session.exec(select(TaskFlowDaily).where(TaskFlowDaily.project_id == project_id)
+                             .order_by(TaskFlowDaily.day)).all())
+
+def done_points_from_flow(flow: Sequence[TaskFlowDaily]) -> Dict[date, int]:
+    """Net completed points per day: a reopened task gives its points back on the reopen day."""
+    return {f.day: int(f.done_points) for f in flow if f.done_points}
+
+def sprint_flow(t0: date, sprint_days: int, periods: int, flow: Sequence[TaskFlowDaily]) -> Dict[str, Any]:
+    """Per-sprint completed/reopened/started counts and mean cycle time, from the daily rows."""
+    days, periods = max(1, int(sprint_days)), max(0, int(periods))
+    acc = [dict.fromkeys(_FLOW_COLUMNS, 0) for _ in range(periods)]
+    for f in flow:
+        i = (f.day - t0).days // days
+        if f.day >= t0 and i < periods:
+            for k in _FLOW_COLUMNS:
+                acc[i][k] += getattr(f, k)
+    sprints = []
+    for i, a in enumerate(acc):
+        s = t0 + timedelta(days=i * days)
+        sprints.append({
+            "start": s.isoformat(), "end": (s + timedelta(days=days)).isoformat(),
+            "completed": int(a["done_tasks"]), "points": int(a["done_points"]),
+            "reopened": int(a["reopened"]), "started": int(a["started"]),
+            "cycle_tasks": int(a["cycle_tasks"]),
+            "avg_cycle_days": round(a["cycle_seconds"] / a["cycle_tasks"] / 86400, 2) if a["cycle_tasks"] else None,
+        })
+    n = sum(a["cycle_tasks"] for a in acc)
+    total = sum(a["cycle_seconds"] for a in acc)
+    return {"sprint_days": days, "sprints": sprints,
+            "avg_cycle_days": round(total / n / 86400, 2) if n else None}
+
+def board_as_of(session: Session, project_id: int, at: datetime) -> Dict[str, Any]:
+    """Board columns as they stood at `at`: each task's last move at or before then, else todo.
+
+    Reads the (project_id, at) index range up to `at` and keeps the newest row per task.
+    Tasks created after `at` are left out, unless they already moved by then; those with no
+    created_at are assumed to predate it.
+    Points are today's est_days.
+    """
+    rn = func.row_number().over(partition_by=TaskTransition.task_id,
+                                order_by=(TaskTransition.at.desc(), TaskTransition.id.desc())).label("rn")
+    latest = (select(TaskTransition.task_id, TaskTransition.to_status, TaskTransition.at, rn)
+              .where(TaskTransition.project_id == project_id, TaskTransition.at <= at).subquery())
+    state = {tid: (status_bucket(to), since) for tid, to, since in
+             session.exec(select(latest.c.task_id, latest.c.to_status, latest.c.at).where(latest.c.rn == 1)).all()}
+
+    columns: Dict[str, List[Dict[str, Any]]] = {"todo": [], "inprogress": [], "done": []}
+    points = dict.fromkeys(columns, 0)
+    existed = or_(Task.created_at.is_(None), Task.created_at <= at, Task.id.in_(state))
+    for tid, name, est in session.exec(task_scope(select(Task.id, Task.name, Task.est_days), project_id)
+                                       .where(existed).order_by(Task.id)).all():
+        status, since = state.get(tid, ("todo", None))
+        columns[status].append({"id": tid, "name": name, "est_days": est,
+                                "since": since.isoformat() if since else None})
+        points[status] += est or 1
+    return {"project_id": project_id, "as_of": at.isoformat(), "columns": columns,
+            "counts": {k: len(v) for k, v in columns.items()}, "points": points}
+
+def rebuild_flow(session: Session, project_id: int) -> int:
+    """Recompute a project's TaskFlowDaily rows from its full transition history."""
+    daily: Dict[date, Dict[str, float]] = defaultdict(dict)
+    first_start: Dict[int, datetime] = {}
+    credited: Dict[int, int] = {}
+    rows = session.exec(select(TaskTransition.task_id, TaskTransition.from_status, TaskTransition.to_status,
+                               TaskTransition.points, TaskTransition.at)
+                        .where(TaskTransition.project_id == project_id)
+                        .order_by(TaskTransition.at, TaskTransition.id)).all()
+    for tid, frm, to, pts, at in rows:
+        delta = _flow_delta(frm, to, credited.get(tid, pts) if _is_reopen(frm, to) else pts)
+        if to == "inprogress":
+            first_start.setdefault(tid, at)
+        if delta.get("done_tasks") == 1:
+            credited[tid] = pts
+            if tid in first_start:
+                delta.update(cycle_tasks=1, cycle_seconds=(at - first_start[tid]).total_seconds())
+        _add(daily[at.date()], delta)
+    session.execute(delete(TaskFlowDaily).where(TaskFlowDaily.project_id == project_id))
+    session.add_all([TaskFlowDaily(project_id=project_id, day=d, **v) for d, v in daily.items() if any(v.values())])
+    return len(daily)
+
+def backfill_transitions(session: Session, project_id: Optional[int] = None) -> Dict[str, int]:
+    """Seed history for tasks whose TaskState predates the transition log.
+
+    Each such task gets one todo → current status move at its TaskState.updated_at, then
+    the affected projects' daily flow is rebuilt. Stages changes; the caller commits.
+    """
+    has_history = select(TaskTransition.task_id).distinct()
+    q = (select(Task.id, Task.est_days, TaskState.status, TaskState.updated_at, Outcome.project_id)
+         .join(TaskState, TaskState.task_id == Task.id)
+         .join(Deliverable, Task.deliverable_id == Deliverable.id)
+         .join(Benefit, Deliverable.benefit_id == Benefit.id)
+         .join(Outcome, Benefit.outcome_id == Outcome.id)
+         .where(TaskState.status != "todo", Task.id.not_in(has_history)))
+    if project_id is not None:
+        q = q.where(Outcome.project_id == project_id)
+    found = session.exec(q).all()
+    rows = [{"task_id": tid, "project_id": pid, "from_status": "todo", "to_status": status,
+             "points": est or 1, "at": at} for tid, est, status, at, pid in found if pid is not None]
+    if rows:
+        session.execute(insert(TaskTransition), rows)
+    pids = sorted({r["project_id"] for r in rows})
+    for pid in pids:
+        rebuild_flow(session, pid)
+        bump_version(session, pid)
+    return {"backfilled": len(rows), "projects": len(pids)}
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+    import json
+    from ..db.database import engine, create_db_and_tables
+
+    ap = argparse.ArgumentParser(description="Seed task status history for existing tasks and rebuild daily flow.")
+    ap.add_argument("--project", type=int, default=None, help="only this project (default: all)")
+    ap.add_argument("--rebuild", action="store_true", help="also rebuild daily flow for projects with nothing to backfill")
+    args = ap.parse_args(argv)
+
+    create_db_and_tables()
+    with Session(engine) as session:
+        out = backfill_transitions(session, args.project)
+        if args.rebuild:
+            pids = [args.project] if args.project is not None else \
+                session.exec(select(TaskTransition.project_id).distinct()).all()
+            for pid in pids:
+                rebuild_flow(session, pid)
+                bump_version(session, pid)
+            out["rebuilt"] = len(pids)
+        session.commit()
+        print(json.dumps(out))
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,109 @@
+
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Optional
+from sqlmodel import Session
+from ..core.config import settings
+from ..db.database import engine as db_engine
+from .generator import generate_and_persist
+
+class QueueFull(RuntimeError):
+    """Raised by JobQueue.submit when the queued-job cap is reached."""
+
+@dataclass
+class Job:
+    id: str
+    vision: str
+    use_cache: bool = True
+    status: str = "queued"   # queued | running | succeeded | failed
+    stage: str = "queued"    # queued | prompt | generate | validate | persist | done
+    project_id: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        def iso(d: Optional[datetime]) -> Optional[str]:
+            return d.isoformat() if d else None
+        return {"id": self.id, "status": self.status, "stage": self.stage, "project_id": self.project_id,
+                "error": self.error, "created_at": iso(self.created_at), "started_at": iso(self.started_at),
+                "finished_at": iso(self.finished_at)}
+
+class JobQueue:
+    """Bounded worker pool for build_prompt → generate → validate → persist.
+
+    At most `workers` generations run at once and at most `max_queued` wait behind them;
+    submit raises QueueFull beyond that so callers can push back instead of piling up.
+    Job state lives in this process only.
+    """
+
+    def __init__(self, workers: int, max_queued: int, history: int = 1000, engine=None):
+        self.workers, self.max_queued, self.history = workers, max_queued, history
+        self._engine = engine
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gen-job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self.succeeded = 0
+        self.failed = 0
+
+    def submit(self, vision: str, use_cache: bool = True) -> Job:
+        with self._lock:
+            if self._queued >= self.max_queued:
+                raise QueueFull(f"{self._queued} generation jobs already queued")
+            job = Job(id=uuid.uuid4().hex, vision=vision, use_cache=use_cache)
+            self._jobs[job.id] = job
+            self._queued += 1
+            self._prune()
+        self._pool.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _prune(self) -> None:
+        # drop the oldest finished jobs beyond the history limit (caller holds the lock)
+        excess = len(self._jobs) - self.history
+        if excess <= 0:
+            return
+        for jid in [j.id for j in self._jobs.values() if j.finished_at is not None][:excess]:
+            del self._jobs[jid]
+
+    def _run(self, job: Job) -> None:
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+        job.status, job.started_at = "running", datetime.utcnow()
+        try:
+            with Session(self._engine or db_engine) as session:
+                job.project_id = generate_and_persist(session, job.vision, on_stage=lambda s: setattr(job, "stage", s),
+                                                      use_cache=job.use_cache)
+            job.status, job.stage = "succeeded", "done"
+        except Exception as e:
+            job.status, job.error = "failed", f"{type(e).__name__}: {e}"
+        finally:
+            job.finished_at = datetime.utcnow()
+            with self._lock:
+                self._running -= 1
+                if job.status == "succeeded":
+                    self.succeeded += 1
+                else:
+                    self.failed += 1
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"workers": self.workers, "max_queued": self.max_queued, "queued": self._queued,
+                    "running": self._running, "succeeded": self.succeeded, "failed": self.failed,
+                    "tracked": len(self._jobs)}
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait, cancel_futures=not wait)
+
+job_queue = JobQueue(settings.gen_workers, settings.gen_queue_max, settings.gen_job_history)
@@ -0,0 +1,170 @@
+
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, Optional
+from sqlmodel import Session
+from ..models.entities import Project, ProjectRollup
+from .hierarchy import ProjectSnapshot, load_project_snapshot
+from .rollups import get_rollup, budget_by_category, risk_matrix
+from .scheduling import compute_schedule, ScheduleCycleError
+from . import agile
+
+# Dashboard panels in the order the UI lays them out
+PANELS = ("kpis", "budget", "risk", "backlog", "timeline", "burn", "velocity")
+_SNAPSHOT_PANELS = {"backlog", "timeline", "burn", "velocity"}
+_STATE_PANELS = {"backlog", "burn", "velocity"}
+
+def kpis_panel(p: Project, r: ProjectRollup) -> Dict[str, Any]:
+    return {
+        "project_id": p.id,
+        "name": p.name,
+        "vision": p.vision,
+        "counts": {
+            "outcomes": r.outcomes,
+            "benefits": r.benefits,
+            "deliverables": r.deliverables,
+            "tasks": r.tasks
+        },
+        "tasks_by_status": {"todo": r.tasks_todo, "inprogress": r.tasks_inprogress, "done": r.tasks_done},
+        "activity_applied": r.activity,
+        "schema_pass_rate": 1.0  # stub generator => always valid
+    }
+
+def budget_panel(p: Project, r: ProjectRollup) -> Dict[str, Any]:
+    return {"project_id": p.id, "total": r.budget_total, "by_category": budget_by_category(r), "count": r.budget_count}
+
+def risk_panel(p: Project, r: ProjectRollup) -> Dict[str, Any]:
+    # 5x5 matrix (1..5)
+    return {"project_id": p.id, "count": r.risk_count, "matrix": risk_matrix(r)}
+
+def tree_panel(snap: ProjectSnapshot) -> Dict[str, Any]:
+    p = snap.project
+    out = {
+        "id": p.id, "name": p.name, "vision": p.vision, "description": p.description,
+        "outcomes": [], "budget": [], "governance": [], "reporting": [], "risks": [],
+    }
+
+    for o in snap.outcomes:
+        o_dict = {"id": o.id, "name": o.name, "description": o.description, "benefits": []}
+        for b in snap.benefits_by_outcome.get(o.id, []):
+            b_dict = {"id": b.id, "name": b.name, "description": b.description, "deliverables": []}
+            for d in snap.deliverables_by_benefit.get(b.id, []):
+                d_dict = {"id": d.id, "name": d.name, "description": d.description, "tasks": []}
+                for t in snap.tasks_by_deliverable.get(d.id, []):
+                    d_dict["tasks"].append({"id": t.id, "name": t.name, "est_days": t.est_days, "depends_on_id": t.depends_on_id})
+                b_dict["deliverables"].append(d_dict)
+            o_dict["benefits"].append(b_dict)
+        out["outcomes"].append(o_dict)
+
+    out["budget"] = [
+        {"id": bl.id, "item": bl.item, "amount": bl.amount, "category": bl.category}
+        for bl in snap.budget
+    ]
+    out["governance"] = [
+        {"id": g.id, "name": g.name, "cadence": g.cadence, "owner": g.owner}
+        for g in snap.governance
+    ]
+    out["reporting"] = [
+        {"id": r.id, "name": r.name, "frequency": r.frequency, "audience": r.audience}
+        for r in snap.reporting
+    ]
+    out["risks"] = [
+        {"id": r.id, "title": r.title, "probability": r.probability, "impact": r.impact, "mitigation": r.mitigation}
+        for r in snap.risks
+    ]
+    return out
+
+def backlog_panel(snap: ProjectSnapshot) -> Dict[str, Any]:
+    rows = []
+    for d, t in snap.iter_tasks():
+        rows.append({
+            "task_id": t.id, "task": t.name, "deliverable": d.name,
+            "est_days": int(getattr(t, "est_days", 1) or 1),
+            "status": snap.task_status(t.id), "done": snap.task_done(t.id)
+        })
+    cols = {"todo": [], "inprogress": [], "done": []}
+    for r in rows:
+        (cols[r["status"]] if r["status"] in cols else cols["todo"]).append(r)
+    return {"project_id": snap.project.id, "columns": cols, "count": len(rows)}
+
+def timeline_panel(snap: ProjectSnapshot, t0: date) -> Dict[str, Any]:
+    """Critical-path timeline; raises ScheduleCycleError (positions mapped to task ids)."""
+    rows = list(snap.iter_tasks())
+    pos = {t.id: i for i, (_d, t) in enumerate(rows)}
+    durations = [max(int(getattr(t, "est_days", 1) or 1), 1) for _d, t in rows]
+    preds = [pos.get(t.depends_on_id, -1) if t.depends_on_id is not None else -1 for _d, t in rows]
+    try:
+        sched = compute_schedule(durations, preds)
+    except ScheduleCycleError as e:
+        e.task_ids = [rows[i][1].id for i in e.cycle]
+        raise
+
+    def day(n: int) -> str:
+        return (t0 + timedelta(days=n)).isoformat()
+
+    plan = []
+    for i, (d, t) in enumerate(rows):
+        plan.append({
+            "deliverable_id": d.id, "deliverable": d.name,
+            "task_id": t.id, "task": t.name,
+            "depends_on_id": t.depends_on_id,
+            "start": day(sched.es[i]), "end": day(sched.ef[i]),
+            "duration_days": durations[i],
+            "earliest_start": day(sched.es[i]), "earliest_finish": day(sched.ef[i]),
+            "latest_start": day(sched.ls[i]), "latest_finish": day(sched.lf[i]),
+            "slack_days": sched.slack[i], "critical": sched.critical[i],
+        })
+    return {
+        "project_id": snap.project.id, "start": t0.isoformat(), "finish": day(sched.makespan),
+        "duration_days": sched.makespan,
+        "critical_path": [rows[i][1].id for i in sched.order if sched.critical[i]],
+        "items": plan,
+    }
+
+def snapshot_points(snap: ProjectSnapshot):
+    """(total points, done points per day) from a snapshot, mirroring agile's SQL aggregates."""
+    total = 0
+    by_day: Dict[date, int] = {}
+    for t in snap.tasks:
+        pts = int(getattr(t, "est_days", 1) or 1)
+        total += pts
+        st = snap.states.get(t.id)
+        if st and st.done and st.updated_at:
+            d = st.updated_at.date()
+            by_day[d] = by_day.get(d, 0) + pts
+    return total, by_day
+
+def build_dashboard(session: Session, project_id: int, panels: Iterable[str],
+                    timeline_start: date, sprint_start: date, sprint_days: int = 14,
+                    periods: int = 4) -> Optional[Dict[str, Any]]:
+    """Every requested panel from one rollup read and at most one hierarchy snapshot.
+
+    Returns None when the project does not exist.
+    """
+    wanted = [x for x in PANELS if x in set(panels)]
+    p = session.get(Project, project_id)
+    if not p:
+        return None
+    out: Dict[str, Any] = {"project_id": p.id, "panels": wanted}
+
+    if {"kpis", "budget", "risk"} & set(wanted):
+        r = get_rollup(session, p.id)
+        if "kpis" in wanted: out["kpis"] = kpis_panel(p, r)
+        if "budget" in wanted: out["budget"] = budget_panel(p, r)
+        if "risk" in wanted: out["risk"] = risk_panel(p, r)
+
+    if _SNAPSHOT_PANELS & set(wanted):
+        snap = load_project_snapshot(session, p.id, with_states=bool(_STATE_PANELS & set(wanted)), with_extras=False)
+        if "backlog" in wanted:
+            out["backlog"] = backlog_panel(snap)
+        if "timeline" in wanted:
+            try:
+                out["timeline"] = timeline_panel(snap, timeline_start)
+            except ScheduleCycleError as e:
+                out["timeline"] = {"project_id": p.id, "error": "Task dependencies form a cycle", "task_ids": e.task_ids}
+        if "burn" in wanted or "velocity" in wanted:
+            total, done_by_day = snapshot_points(snap)
+            if "burn" in wanted:
+                out["burn"] = {"project_id": p.id, **agile.burn_down(sprint_start, sprint_days, total, done_by_day)}
+            if "velocity" in wanted:
+                out["velocity"] = {"project_id": p.id, **agile.velocity(sprint_start, sprint_days, periods, done_by_day)}
+    return out
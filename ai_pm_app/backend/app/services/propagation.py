@@ -1,8 +1,16 @@
 
-from typing import List, Tuple, Dict, Any
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Tuple, Dict, Any, Callable, Iterable, Optional
+from sqlalchemy import Float, Integer, String, insert, update
 from sqlmodel import Session, select
-from ..models.propagation_schemas import ChangeItem, SuggestedOp, PropagationRequest, PropagationPreview, ApplyRequest, ApplyResult
-from ..models.entities import Project, Outcome, Benefit, Deliverable, Task, BudgetLine
+from ..models.propagation_schemas import (ChangeItem, SuggestedOp, PropagationRequest, PropagationPreview,
+                                          ApplyRequest, ApplyResult, RejectedOp)
+from ..models.entities import Project, Outcome, Benefit, Deliverable, Task, BudgetLine, Risk, ActivityLog
+from .hierarchy import ProjectSnapshot, deliverable_scope, load_project_snapshot, task_scope
+from .rollups import ensure_rollup, record_activity, refresh_budget_and_risks
+from .versioning import bump_version
 
 MODEL_MAP = {
     "project": Project,
@@ -11,85 +19,251 @@ MODEL_MAP = {
     "deliverable": Deliverable,
     "task": Task,
     "budget": BudgetLine,
+    "risk": Risk,
 }
 
-def _get_row(session: Session, entity: str, _id: int):
-    Model = MODEL_MAP[entity]
-    return session.get(Model, _id)
+@dataclass(frozen=True)
+class Rule:
+    """Declarative ripple rule.
 
-def preview_propagation(session: Session, project_id: int, req: PropagationRequest) -> PropagationPreview:
-    suggestions: List[SuggestedOp] = []
+    When `on` = (entity, field) changes, every row returned by `targets(graph, id)` is
+    visited. If `field` is set, `tag` (formatted with the triggering value) is appended to
+    that field and suggested. If `emits` is set, the visit itself becomes a change event
+    (target entity, emits) carrying the same value, which lets rules chain transitively.
+    """
+    on: Tuple[str, str]
+    target: str
+    targets: Callable[["PropagationGraph", int], Iterable[int]]
+    reason: str = ""
+    field: Optional[str] = None
+    tag: Optional[str] = None
+    emits: Optional[str] = None
 
-    for ch in req.changes:
-        # include the original edit itself as the first suggestion
-        row = _get_row(session, ch.entity, ch.id)
+RULES: List[Rule] = []
+
+def register_rule(rule: Rule) -> Rule:
+    RULES.append(rule)
+    return rule
+
+class PropagationGraph:
+    """Rows of one project, indexed by entity and id, with parent/child/dependency edges."""
+
+    def __init__(self, snap: ProjectSnapshot):
+        self.rows: Dict[str, Dict[int, Any]] = {
+            "project": {snap.project.id: snap.project},
+            "outcome": {o.id: o for o in snap.outcomes},
+            "benefit": {b.id: b for b in snap.benefits},
+            "deliverable": snap.deliverable_by_id,
+            "task": snap.task_by_id,
+            "budget": {bl.id: bl for bl in snap.budget},
+            "risk": {r.id: r for r in snap.risks},
+        }
+        self.benefits_of = {k: [b.id for b in v] for k, v in snap.benefits_by_outcome.items()}
+        self.deliverables_of = {k: [d.id for d in v] for k, v in snap.deliverables_by_benefit.items()}
+        self.dependents: Dict[int, List[int]] = {}
+        for t in snap.tasks:
+            if t.depends_on_id is not None:
+                self.dependents.setdefault(t.depends_on_id, []).append(t.id)
+
+    def get(self, entity: str, _id: int):
+        return self.rows.get(entity, {}).get(_id)
+
+# Outcome renamed -> benefits (and, transitively, their deliverables) carry the alignment tag
+register_rule(Rule(on=("outcome", "name"), target="benefit", field="description",
+                   targets=lambda g, i: g.benefits_of.get(i, ()),
+                   tag="[Aligned with Outcome: {value}]", emits="outcome_alignment",
+                   reason="Outcome renamed; keep benefits aligned."))
+register_rule(Rule(on=("benefit", "outcome_alignment"), target="deliverable", field="description",
+                   targets=lambda g, i: g.deliverables_of.get(i, ()),
+                   tag="[Aligned with Outcome: {value}]",
+                   reason="Outcome renamed; keep deliverables aligned."))
+# Benefit renamed -> deliverables
+register_rule(Rule(on=("benefit", "name"), target="deliverable", field="description",
+                   targets=lambda g, i: g.deliverables_of.get(i, ()),
+                   tag="[Aligned with Benefit: {value}]",
+                   reason="Benefit renamed; keep deliverables aligned."))
+# Task duration changed -> its deliverable, and every task downstream of it shifts
+register_rule(Rule(on=("task", "est_days"), target="task", emits="schedule",
+                   targets=lambda g, i: (i,)))
+register_rule(Rule(on=("task", "schedule"), target="task", emits="schedule",
+                   targets=lambda g, i: g.dependents.get(i, ())))
+register_rule(Rule(on=("task", "schedule"), target="deliverable", field="description",
+                   targets=lambda g, i: (g.rows["task"][i].deliverable_id,) if i in g.rows["task"] else (),
+                   tag="[Timeline updated due to task change]",
+                   reason="Task duration changed; reflect in deliverable description."))
+
+def _rules_by_trigger(rules: Iterable[Rule]) -> Dict[Tuple[str, str], List[Rule]]:
+    out: Dict[Tuple[str, str], List[Rule]] = {}
+    for r in rules:
+        out.setdefault(r.on, []).append(r)
+    return out
+
+def preview_propagation(session: Session, project_id: int, req: PropagationRequest,
+                        rules: Optional[Iterable[Rule]] = None) -> PropagationPreview:
+    snap = load_project_snapshot(session, project_id, with_states=False)
+    if not snap:
+        return PropagationPreview()
+    return propagate(PropagationGraph(snap), req.changes, RULES if rules is None else rules)
+
+def propagate(graph: PropagationGraph, changes: Iterable[ChangeItem], rules: Iterable[Rule]) -> PropagationPreview:
+    """Compute suggestions for a change set entirely in memory.
+
+    Events are expanded breadth-first; each (entity, id, field, value) event is expanded
+    once, so dependency cycles and diamonds terminate. Suggestions are de-duplicated per
+    (entity, id, field): later tags are folded into the same op's new_value.
+    """
+    by_trigger = _rules_by_trigger(rules)
+    ops: Dict[Tuple[str, int, str], SuggestedOp] = {}
+    seen = set()
+    queue = deque()
+
+    # include the original edits themselves first
+    for ch in changes:
+        row = graph.get(ch.entity, ch.id)
         if not row:
             # skip unknown rows
             continue
-        old = getattr(row, ch.field, None)
-        suggestions.append(SuggestedOp(
+        ops[(ch.entity, ch.id, ch.field)] = SuggestedOp(
             entity=ch.entity, id=ch.id, field=ch.field,
-            old_value=old, new_value=ch.new_value,
+            old_value=getattr(row, ch.field, None), new_value=ch.new_value,
             reason="Original requested change.", original=True
-        ))
-
-        # ripple rules
-        if ch.entity == "outcome" and ch.field == "name":
-            # outcome -> benefits
-            benefits = session.exec(select(Benefit).where(Benefit.project_id == project_id))  # we don't store outcome_id on benefits? we do; use it.
-            benefits = session.exec(select(Benefit).where(Benefit.outcome_id == ch.id)).all()
-            for b in benefits:
-                tag = f"[Aligned with Outcome: {ch.new_value}]"
-                new_desc = (b.description or "")
-                if tag not in new_desc:
-                    new_desc = (new_desc + " " + tag).strip()
-                    suggestions.append(SuggestedOp(
-                        entity="benefit", id=b.id, field="description",
-                        old_value=b.description, new_value=new_desc,
-                        reason="Outcome renamed; keep benefits aligned."
-                    ))
-
-        if ch.entity == "benefit" and ch.field == "name":
-            # benefit -> deliverables
-            deliverables = session.exec(select(Deliverable).where(Deliverable.benefit_id == ch.id)).all()
-            for d in deliverables:
-                tag = f"[Aligned with Benefit: {ch.new_value}]"
-                new_desc = (d.description or "")
-                if tag not in new_desc:
-                    new_desc = (new_desc + " " + tag).strip()
-                    suggestions.append(SuggestedOp(
-                        entity="deliverable", id=d.id, field="description",
-                        old_value=d.description, new_value=new_desc,
-                        reason="Benefit renamed; keep deliverables aligned."
-                    ))
-
-        if ch.entity == "task" and ch.field == "est_days":
-            # task -> parent deliverable description
-            t = row  # already fetched
-            d = session.get(Deliverable, t.deliverable_id)
-            if d:
-                tag = "[Timeline updated due to task change]"
-                new_desc = (d.description or "")
-                if tag not in new_desc:
-                    new_desc = (new_desc + " " + tag).strip()
-                    suggestions.append(SuggestedOp(
-                        entity="deliverable", id=d.id, field="description",
-                        old_value=d.description, new_value=new_desc,
-                        reason="Task duration changed; reflect in deliverable description."
-                    ))
-
-    return PropagationPreview(suggestions=suggestions)
-
-def apply_suggestions(session: Session, project_id: int, req: ApplyRequest) -> ApplyResult:
-    applied = 0
+        )
+        queue.append((ch.entity, ch.id, ch.field, ch.new_value))
+
+    while queue:
+        event = queue.popleft()
+        key = (event[0], event[1], event[2], str(event[3]))
+        if key in seen:
+            continue
+        seen.add(key)
+        entity, _id, field, value = event
+        for rule in by_trigger.get((entity, field), ()):
+            for tid in rule.targets(graph, _id):
+                row = graph.get(rule.target, tid)
+                if row is None:
+                    continue
+                if rule.field:
+                    _suggest(ops, rule, row, tid, rule.tag.format(value=value))
+                if rule.emits:
+                    queue.append((rule.target, tid, rule.emits, value))
+
+    return PropagationPreview(suggestions=list(ops.values()))
+
+def _suggest(ops: Dict[Tuple[str, int, str], SuggestedOp], rule: Rule, row, tid: int, tag: str) -> None:
+    key = (rule.target, tid, rule.field)
+    op = ops.get(key)
+    current = op.new_value if op is not None else getattr(row, rule.field, None)
+    new_val = (current or "")
+    if tag in new_val:
+        return
+    new_val = (new_val + " " + tag).strip()
+    if op is None:
+        ops[key] = SuggestedOp(entity=rule.target, id=tid, field=rule.field,
+                               old_value=getattr(row, rule.field, None), new_value=new_val, reason=rule.reason)
+    else:
+        op.new_value = new_val
+        if rule.reason and rule.reason not in op.reason:
+            op.reason = f"{op.reason} {rule.reason}"
+
+# Columns that tie a row into the hierarchy are never rewritten by propagation
+_PROTECTED_FIELDS = {"id", "project_id", "outcome_id", "benefit_id", "deliverable_id"}
+
+def _scoped(Model, project_id: int):
+    """select(Model) restricted to the rows of one project."""
+    stmt = select(Model)
+    if Model is Project:
+        return stmt.where(Project.id == project_id)
+    if Model is Task:
+        return task_scope(stmt, project_id)
+    if Model is Deliverable:
+        return deliverable_scope(stmt, project_id)
+    if Model is Benefit:
+        return stmt.join(Outcome, Benefit.outcome_id == Outcome.id).where(Outcome.project_id == project_id)
+    return stmt.where(Model.project_id == project_id)
+
+def _coerce(column, value):
+    if value is None:
+        if not column.nullable:
+            raise ValueError("value is required")
+        return None
+    if isinstance(column.type, Integer) and not isinstance(value, bool):
+        return int(value)
+    if isinstance(column.type, Float):
+        return float(value)
+    if isinstance(column.type, String):
+        return str(value)
+    return value
+
+def _text(v) -> Optional[str]:
+    return None if v is None else str(v)
+
+def _same(column, expected, stored) -> bool:
+    # compare as the column's type, so 500 matches a stored 500.0 and "3" a stored 3
+    try:
+        return _coerce(column, expected) == stored
+    except (TypeError, ValueError):
+        return False
+
+def apply_suggestions(session: Session, project_id: int, req: ApplyRequest, commit: bool = True) -> ApplyResult:
+    """Apply ops in one pass and one transaction.
+
+    Targets are loaded with one query per entity type, old values are captured from those
+    rows, updates go out as one bulk UPDATE per type and the ActivityLog rows as one
+    executemany. An op that sets `old_value` is rejected when the stored value no longer
+    matches it (compared after coercion to the column type, so 3, "3" and 3.0 agree); later ops on the same field are
+    checked against the earlier op's new value.
+    """
+    ensure_rollup(session, project_id)
+    by_entity: Dict[str, set] = {}
     for op in req.ops:
-        row = _get_row(session, op.entity, op.id)
-        if not row:
+        by_entity.setdefault(op.entity, set()).add(op.id)
+    rows: Dict[Tuple[str, int], Any] = {}
+    for entity, ids in by_entity.items():
+        Model = MODEL_MAP[entity]
+        for row in session.exec(_scoped(Model, project_id).where(Model.id.in_(ids))).all():
+            rows[(entity, row.id)] = row
+
+    current: Dict[Tuple[str, int, str], Any] = {}
+    updates: Dict[str, Dict[int, Dict[str, Any]]] = {}
+    logs: List[Dict[str, Any]] = []
+    rejected: List[RejectedOp] = []
+    now = datetime.utcnow()
+
+    def reject(i: int, op: SuggestedOp, error: str, actual=None):
+        rejected.append(RejectedOp(index=i, entity=op.entity, id=op.id, field=op.field, error=error, current_value=actual))
+
+    for i, op in enumerate(req.ops):
+        row = rows.get((op.entity, op.id))
+        if row is None:
+            reject(i, op, "Row not found in project")
             continue
-        if not hasattr(row, op.field):
+        column = row.__table__.c.get(op.field)
+        if column is None or op.field in _PROTECTED_FIELDS:
+            reject(i, op, f"Field '{op.field}' cannot be changed")
             continue
-        setattr(row, op.field, op.new_value)
-        session.add(row)
-        applied += 1
-    session.commit()
-    return ApplyResult(applied=applied)
+        key = (op.entity, op.id, op.field)
+        old = current[key] if key in current else getattr(row, op.field)
+        if "old_value" in op.model_fields_set and not _same(column, op.old_value, old):
+            reject(i, op, "Stale old_value", actual=old)
+            continue
+        try:
+            new = _coerce(column, op.new_value)
+        except (TypeError, ValueError) as e:
+            reject(i, op, f"Invalid value: {e}")
+            continue
+        current[key] = new
+        updates.setdefault(op.entity, {}).setdefault(op.id, {"id": op.id})[op.field] = new
+        logs.append({"project_id": project_id, "entity": op.entity, "entity_id": op.id, "field": op.field,
+                     "old_value": _text(old), "new_value": _text(new), "created_at": now})
+
+    for entity, by_id in updates.items():
+        session.execute(update(MODEL_MAP[entity]), list(by_id.values()))
+    if logs:
+        session.execute(insert(ActivityLog), logs)
+        record_activity(session, project_id, len(logs))
+        if {"budget", "risk"} & set(updates):
+            refresh_budget_and_risks(session, project_id)
+        bump_version(session, project_id)
+    if commit:
+        session.commit()
+    return ApplyResult(applied=len(logs), rejected=rejected)
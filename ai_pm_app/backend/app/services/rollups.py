@@ -0,0 +1,233 @@
+
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import func, insert, update
+from sqlmodel import Session, select
+from .hierarchy import current_state, deliverable_scope, task_scope
+from ..models.schemas import GenProject
+from ..models.entities import Project, Outcome, Benefit, Deliverable, Task, BudgetLine, Risk, ActivityLog, ActivityDailySummary, TaskState, ProjectRollup
+
+STATUS_COLUMNS = {"todo": "tasks_todo", "inprogress": "tasks_inprogress", "done": "tasks_done"}
+
+def status_bucket(status: Optional[str]) -> str:
+    # the backlog files unknown statuses under "todo"; count them the same way
+    return status if status in STATUS_COLUMNS else "todo"
+
+def _budget_fields(lines: Iterable[Tuple[Optional[str], Optional[float]]]) -> Dict[str, Any]:
+    by_cat: Dict[str, float] = {}
+    total, count = 0.0, 0
+    for cat, amount in lines:
+        cat = cat or "Uncategorised"
+        by_cat[cat] = by_cat.get(cat, 0.0) + float(amount or 0.0)
+        total += float(amount or 0.0)
+        count += 1
+    return {"budget_count": count, "budget_total": total, "budget_by_category": json.dumps(by_cat)}
+
+def _risk_fields(cells: Iterable[Tuple[Optional[int], Optional[int], int]]) -> Dict[str, Any]:
+    matrix = [[0] * 5 for _ in range(5)]
+    count = 0
+    for pr, im, n in cells:
+        pr = min(max(int(pr or 0), 1), 5); im = min(max(int(im or 0), 1), 5)
+        matrix[pr - 1][im - 1] += n
+        count += n
+    return {"risk_count": count, "risk_matrix": json.dumps(matrix)}
+
+def budget_by_category(r: ProjectRollup) -> Dict[str, float]:
+    return json.loads(r.budget_by_category or "{}")
+
+def risk_matrix(r: ProjectRollup) -> Dict[int, Dict[int, int]]:
+    cells = json.loads(r.risk_matrix or "[]") or [[0] * 5 for _ in range(5)]
+    return {i: {j: cells[i - 1][j - 1] for j in range(1, 6)} for i in range(1, 6)}
+
+def _budget_values(session: Session, project_id: int) -> Dict[str, Any]:
+    rows = session.exec(
+        select(BudgetLine.category, BudgetLine.amount).where(BudgetLine.project_id == project_id)
+    ).all()
+    return _budget_fields(rows)
+
+def _risk_values(session: Session, project_id: int) -> Dict[str, Any]:
+    rows = session.exec(
+        select(Risk.probability, Risk.impact, func.count(Risk.id))
+        .where(Risk.project_id == project_id)
+        .group_by(Risk.probability, Risk.impact)
+    ).all()
+    return _risk_fields(rows)
+
+def compute_rollup_values(session: Session, project_id: int) -> Dict[str, Any]:
+    """Recompute every rollup field from the base tables with aggregate queries."""
+    def count(stmt) -> int:
+        return session.exec(stmt).one()
+
+    vals: Dict[str, Any] = {
+        "outcomes": count(select(func.count(Outcome.id)).where(Outcome.project_id == project_id)),
+        "benefits": count(select(func.count(Benefit.id))
+                          .join(Outcome, Benefit.outcome_id == Outcome.id)
+                          .where(Outcome.project_id == project_id)),
+        "deliverables": count(deliverable_scope(select(func.count(Deliverable.id)), project_id)),
+        "tasks": count(task_scope(select(func.count(Task.id)), project_id)),
+        # raw entries plus the ones already compacted into daily summaries
+        "activity": count(select(func.count(ActivityLog.id)).where(ActivityLog.project_id == project_id))
+                    + count(select(func.coalesce(func.sum(ActivityDailySummary.changes), 0))
+                            .where(ActivityDailySummary.project_id == project_id)),
+    }
+    by_status = session.exec(
+        current_state(task_scope(select(TaskState.status, func.count(TaskState.id)).select_from(Task)
+                                 .join(TaskState, TaskState.task_id == Task.id), project_id))
+        .group_by(TaskState.status)
+    ).all()
+    vals["tasks_inprogress"] = sum(n for st, n in by_status if st == "inprogress")
+    vals["tasks_done"] = sum(n for st, n in by_status if st == "done")
+    vals["tasks_todo"] = vals["tasks"] - vals["tasks_inprogress"] - vals["tasks_done"]
+    vals.update(_budget_values(session, project_id))
+    vals.update(_risk_values(session, project_id))
+    return vals
+
+def rollup_values_from_generated(gen: GenProject) -> Dict[str, Any]:
+    """Rollup fields for a freshly persisted plan, computed from the document instead of the DB."""
+    benefits = [b for o in gen.outcomes for b in o.benefits]
+    deliverables = [d for b in benefits for d in b.deliverables]
+    n_tasks = sum(len(d.tasks) for d in deliverables)
+    vals: Dict[str, Any] = {
+        "outcomes": len(gen.outcomes), "benefits": len(benefits), "deliverables": len(deliverables),
+        "tasks": n_tasks, "activity": 0, "tasks_todo": n_tasks, "tasks_inprogress": 0, "tasks_done": 0,
+    }
+    vals.update(_budget_fields((bl.category, bl.amount) for bl in gen.budget))
+    vals.update(_risk_fields((rk.probability, rk.impact, 1) for rk in gen.risks))
+    return vals
+
+def insert_rollups(session: Session, rows: List[Dict[str, Any]]) -> None:
+    if rows:
+        session.execute(insert(ProjectRollup), rows)
+
+def rebuild_rollup(session: Session, project_id: int) -> ProjectRollup:
+    """Recompute one project's rollup from scratch and stage it in the session (no commit)."""
+    vals = compute_rollup_values(session, project_id)
+    r = session.get(ProjectRollup, project_id)
+    if r is None:
+        r = ProjectRollup(project_id=project_id)
+    for k, v in vals.items():
+        setattr(r, k, v)
+    r.updated_at = datetime.utcnow()
+    session.add(r)
+    return r
+
+def get_rollup(session: Session, project_id: int) -> ProjectRollup:
+    """O(1) read of a project's rollup.
+
+    Projects created before rollups existed get a transient, freshly computed one (so this
+    also works on read-only sessions) until their next write or a rebuild persists it.
+    """
+    r = session.get(ProjectRollup, project_id)
+    if r is None:
+        r = ProjectRollup(project_id=project_id, **compute_rollup_values(session, project_id))
+    return r
+
+def ensure_rollup(session: Session, project_id: int) -> None:
+    """Persist a rollup for a project that has none; write paths call this before changing rows.
+
+    A rollup built after the change would already count it, and the delta would count it again.
+    """
+    if session.get(ProjectRollup, project_id) is None:
+        rebuild_rollup(session, project_id)
+        session.flush()
+
+def _bump(session: Session, project_id: int, **deltas: int) -> None:
+    # col = col + delta keeps concurrent writers from losing each other's increments
+    values = {k: getattr(ProjectRollup, k) + v for k, v in deltas.items() if v}
+    if not values:
+        return
+    values["updated_at"] = datetime.utcnow()
+    res = session.execute(update(ProjectRollup).where(ProjectRollup.project_id == project_id).values(**values))
+    if res.rowcount == 0:
+        # no rollup and the caller skipped ensure_rollup: build it from the (flushed) base tables
+        session.flush()
+        rebuild_rollup(session, project_id)
+
+def record_activity(session: Session, project_id: int, n: int = 1) -> None:
+    _bump(session, project_id, activity=n)
+
+def record_status_change(session: Session, project_id: int, old_status: Optional[str], new_status: Optional[str]) -> None:
+    record_status_changes(session, project_id, [(old_status, new_status)])
+
+def record_status_changes(session: Session, project_id: int, changes: Iterable[Tuple[Optional[str], Optional[str]]]) -> None:
+    """Apply many (old_status, new_status) moves as one net counter update."""
+    deltas: Dict[str, int] = {}
+    for old_status, new_status in changes:
+        old_b, new_b = status_bucket(old_status), status_bucket(new_status)
+        if old_b != new_b:
+            deltas[STATUS_COLUMNS[old_b]] = deltas.get(STATUS_COLUMNS[old_b], 0) - 1
+            deltas[STATUS_COLUMNS[new_b]] = deltas.get(STATUS_COLUMNS[new_b], 0) + 1
+    _bump(session, project_id, **deltas)
+
+def refresh_budget_and_risks(session: Session, project_id: int) -> None:
+    """Re-aggregate the budget and risk fields (used after in-place edits to those rows)."""
+    session.flush()
+    vals = {**_budget_values(session, project_id), **_risk_values(session, project_id), "updated_at": datetime.utcnow()}
+    res = session.execute(update(ProjectRollup).where(ProjectRollup.project_id == project_id).values(**vals))
+    if res.rowcount == 0:
+        rebuild_rollup(session, project_id)
+
+def project_id_for_task(session: Session, task_id: int) -> Optional[int]:
+    return session.exec(
+        select(Outcome.project_id)
+        .join(Benefit, Benefit.outcome_id == Outcome.id)
+        .join(Deliverable, Deliverable.benefit_id == Benefit.id)
+        .join(Task, Task.deliverable_id == Deliverable.id)
+        .where(Task.id == task_id)
+    ).first()
+
+def _drift(stored: ProjectRollup, fresh: Dict[str, Any]) -> Dict[str, Any]:
+    out = {}
+    for k, v in fresh.items():
+        old = getattr(stored, k)
+        if k == "budget_total":
+            if abs(float(old or 0.0) - float(v)) > 1e-6:
+                out[k] = {"stored": old, "actual": v}
+        elif k in ("budget_by_category", "risk_matrix"):
+            if json.loads(old or "null") != json.loads(v):
+                out[k] = {"stored": old, "actual": v}
+        elif old != v:
+            out[k] = {"stored": old, "actual": v}
+    return out
+
+def rebuild_all(session: Session, check_only: bool = False) -> List[Dict[str, Any]]:
+    """Recompute every project's rollup and report drift from the stored values.
+
+    With `check_only` nothing is written. Returns one entry per project that drifted
+    (or had no rollup at all).
+    """
+    report = []
+    for pid in session.exec(select(Project.id).order_by(Project.id)).all():
+        fresh = compute_rollup_values(session, pid)
+        stored = session.get(ProjectRollup, pid)
+        if stored is None:
+            report.append({"project_id": pid, "missing": True})
+        else:
+            diff = _drift(stored, fresh)
+            if diff:
+                report.append({"project_id": pid, "drift": diff})
+        if not check_only:
+            rebuild_rollup(session, pid)
+    if not check_only:
+        session.commit()
+    return report
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+    from ..db.database import engine, create_db_and_tables
+
+    ap = argparse.ArgumentParser(description="Rebuild per-project KPI rollups and report drift.")
+    ap.add_argument("--check", action="store_true", help="only report drift, do not rewrite rollups")
+    args = ap.parse_args(argv)
+
+    create_db_and_tables()
+    with Session(engine) as session:
+        report = rebuild_all(session, check_only=args.check)
+    for entry in report:
+        print(json.dumps(entry))
+    print(f"{len(report)} project(s) {'drifted' if args.check else 'rebuilt with drift'}")
+    return 1 if (args.check and report) else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
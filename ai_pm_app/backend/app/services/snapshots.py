@@ -0,0 +1,209 @@
+
+import hashlib
+import json
+import re
+import zipfile
+import zlib
+from datetime import date
+from typing import Any, Dict, Iterator, List, Optional
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import insert
+from sqlmodel import Session, select
+from ..models.entities import EvidenceBlob, EvidenceSnapshot, SnapshotPanel
+from .panels import PANELS, build_dashboard
+from .versioning import get_version
+
+CAPTURE_ATTEMPTS = 3
+
+class SnapshotConflict(RuntimeError):
+    """The project kept changing while its panels were being read."""
+
+def canonical_json(value: Any) -> bytes:
+    # sorted keys and fixed separators, so equal panels always hash equal
+    return json.dumps(jsonable_encoder(value), sort_keys=True, ensure_ascii=False,
+                      separators=(",", ":")).encode("utf-8")
+
+def store_blobs(session: Session, payloads: Dict[str, bytes]) -> Dict[str, str]:
+    """Store each payload once by sha256; returns {name: digest}. Known digests are not rewritten."""
+    digests = {name: hashlib.sha256(body).hexdigest() for name, body in payloads.items()}
+    known = set(session.exec(select(EvidenceBlob.digest).where(EvidenceBlob.digest.in_(set(digests.values())))).all())
+    rows, seen = [], set(known)
+    for name, body in payloads.items():
+        d = digests[name]
+        if d not in seen:
+            seen.add(d)
+            rows.append({"digest": d, "size": len(body), "data": zlib.compress(body, 6)})
+    if rows:
+        session.execute(insert(EvidenceBlob), rows)
+    return digests
+
+def capture_snapshot(session: Session, project_id: int, label: Optional[str], timeline_start: date,
+                     sprint_start: date, sprint_days: int = 14, periods: int = 4) -> Optional[Dict[str, Any]]:
+    """Read every dashboard panel once and store it as a snapshot; None if the project is missing.
+
+    The read is bracketed by the project version; if a write lands in between, the read is
+    repeated so all panels describe the same version.
+    """
+    for _ in range(CAPTURE_ATTEMPTS):
+        version = get_version(session, project_id)
+        out = build_dashboard(session, project_id, PANELS, timeline_start=timeline_start,
+                              sprint_start=sprint_start, sprint_days=sprint_days, periods=periods)
+        if out is None:
+            return None
+        if get_version(session, project_id) == version:
+            break
+        session.expire_all()
+    else:
+        raise SnapshotConflict(f"project {project_id} changed during {CAPTURE_ATTEMPTS} capture attempts")
+
+    params = {"timeline_start": timeline_start.isoformat(), "sprint_start": sprint_start.isoformat(),
+              "sprint_days": sprint_days, "periods": periods}
+    digests = store_blobs(session, {name: canonical_json(out[name]) for name in PANELS})
+    snap = EvidenceSnapshot(project_id=project_id, label=label, version=version, params=json.dumps(params))
+    session.add(snap)
+    session.flush()
+    session.execute(insert(SnapshotPanel), [{"snapshot_id": snap.id, "panel": name, "digest": d} for name, d in digests.items()])
+    session.commit()
+    return snapshot_meta(snap, digests)
+
+def snapshot_meta(snap: EvidenceSnapshot, digests: Dict[str, str]) -> Dict[str, Any]:
+    return {"id": snap.id, "project_id": snap.project_id, "label": snap.label, "version": snap.version,
+            "params": json.loads(snap.params), "created_at": snap.created_at.isoformat(), "panels": digests}
+
+def _panel_digests(session: Session, snapshot_ids: List[int]) -> Dict[int, Dict[str, str]]:
+    out: Dict[int, Dict[str, str]] = {sid: {} for sid in snapshot_ids}
+    for sp in session.exec(select(SnapshotPanel).where(SnapshotPanel.snapshot_id.in_(snapshot_ids))).all():
+        out[sp.snapshot_id][sp.panel] = sp.digest
+    return out
+
+def _load_blobs(session: Session, digests) -> Dict[str, Any]:
+    digests = set(digests)
+    if not digests:
+        return {}
+    return {b.digest: json.loads(zlib.decompress(b.data))
+            for b in session.exec(select(EvidenceBlob).where(EvidenceBlob.digest.in_(digests))).all()}
+
+def list_snapshots(session: Session, project_id: int) -> List[Dict[str, Any]]:
+    snaps = session.exec(select(EvidenceSnapshot).where(EvidenceSnapshot.project_id == project_id)
+                         .order_by(EvidenceSnapshot.id)).all()
+    digests = _panel_digests(session, [s.id for s in snaps])
+    return [snapshot_meta(s, digests[s.id]) for s in snaps]
+
+def get_snapshots(session: Session, project_id: int, snapshot_ids: List[int]) -> List[EvidenceSnapshot]:
+    """The project's snapshots with these ids, in the order given; missing ids are dropped."""
+    found = {s.id: s for s in session.exec(select(EvidenceSnapshot).where(
+        EvidenceSnapshot.project_id == project_id, EvidenceSnapshot.id.in_(snapshot_ids))).all()}
+    return [found[i] for i in snapshot_ids if i in found]
+
+def load_snapshot(session: Session, snap: EvidenceSnapshot) -> Dict[str, Any]:
+    digests = _panel_digests(session, [snap.id])[snap.id]
+    blobs = _load_blobs(session, digests.values())
+    return {**snapshot_meta(snap, digests), "data": {name: blobs[d] for name, d in digests.items()}}
+
+def _keyed(items: List[Any]) -> Optional[str]:
+    """The id field that identifies every element of a list of objects, if there is one."""
+    for key in ("task_id", "id"):
+        if items and all(isinstance(x, dict) and key in x for x in items):
+            return key
+    return None
+
+def json_diff(a: Any, b: Any, path: str = "") -> List[Dict[str, Any]]:
+    """Structured differences between two JSON values.
+
+    Objects are compared per key, lists of objects carrying task_id/id are matched on that
+    id (path `items[task_id=7]`), other lists by position.
+    """
+    out: List[Dict[str, Any]] = []
+    _diff(a, b, path, out)
+    return out
+
+def _diff(a: Any, b: Any, path: str, out: List[Dict[str, Any]]) -> None:
+    if isinstance(a, dict) and isinstance(b, dict):
+        for k in list(a) + [k for k in b if k not in a]:
+            p = f"{path}.{k}" if path else str(k)
+            if k not in b:
+                out.append({"path": p, "op": "removed", "from": a[k]})
+            elif k not in a:
+                out.append({"path": p, "op": "added", "to": b[k]})
+            else:
+                _diff(a[k], b[k], p, out)
+    elif isinstance(a, list) and isinstance(b, list):
+        key = _keyed(a + b)
+        if key:
+            am, bm = {x[key]: x for x in a}, {x[key]: x for x in b}
+            for k in list(am) + [k for k in bm if k not in am]:
+                p = f"{path}[{key}={k}]"
+                if k not in bm:
+                    out.append({"path": p, "op": "removed", "from": am[k]})
+                elif k not in am:
+                    out.append({"path": p, "op": "added", "to": bm[k]})
+                else:
+                    _diff(am[k], bm[k], p, out)
+        else:
+            for i in range(max(len(a), len(b))):
+                p = f"{path}[{i}]"
+                if i >= len(b):
+                    out.append({"path": p, "op": "removed", "from": a[i]})
+                elif i >= len(a):
+                    out.append({"path": p, "op": "added", "to": b[i]})
+                else:
+                    _diff(a[i], b[i], p, out)
+    elif a != b:
+        out.append({"path": path, "op": "changed", "from": a, "to": b})
+
+def diff_snapshots(session: Session, a: EvidenceSnapshot, b: EvidenceSnapshot) -> Dict[str, Any]:
+    """Per-panel diff; panels whose digests match are reported unchanged without being loaded."""
+    digests = _panel_digests(session, [a.id, b.id])
+    da, db = digests[a.id], digests[b.id]
+    changed = [p for p in PANELS if da.get(p) != db.get(p)]
+    blobs = _load_blobs(session, [da[p] for p in changed if p in da] + [db[p] for p in changed if p in db])
+    panels: Dict[str, Any] = {}
+    for p in PANELS:
+        if p not in changed:
+            panels[p] = {"changed": False}
+        else:
+            panels[p] = {"changed": True, "changes": json_diff(blobs.get(da.get(p)), blobs.get(db.get(p)))}
+    return {"from": a.id, "to": b.id, "from_version": a.version, "to_version": b.version, "panels": panels}
+
+class _ChunkSink:
+    """Write-only file object that lets zipfile stream into a generator."""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+
+    def write(self, b) -> int:
+        self.chunks.append(bytes(b))
+        return len(b)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        out, self.chunks = b"".join(self.chunks), []
+        return out
+
+def _entry_label(label: Optional[str]) -> str:
+    # labels are user input: keep zip entry names flat and portable
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", label or "")[:64] or "snapshot"
+
+def evidence_zip(session: Session, snaps: List[EvidenceSnapshot]) -> Iterator[bytes]:
+    """Stream a zip with one JSON file per (snapshot, panel), read from the stored blobs.
+
+    Files are named like the hand-made packs in reports/, plus the snapshot id:
+    {label}_{panel}_{project}_{timestamp}_{id}.json, with the label reduced to [A-Za-z0-9._-].
+    Blobs are loaded one snapshot at a time.
+    """
+    sink = _ChunkSink()
+    digests = _panel_digests(session, [s.id for s in snaps])
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        manifest = []
+        for s in snaps:
+            stamp = s.created_at.strftime("%Y%m%d_%H%M%S")
+            for b in session.exec(select(EvidenceBlob).where(EvidenceBlob.digest.in_(set(digests[s.id].values())))).all():
+                for panel, d in digests[s.id].items():
+                    if d == b.digest:
+                        zf.writestr(f"{_entry_label(s.label)}_{panel}_{s.project_id}_{stamp}_{s.id}.json", zlib.decompress(b.data))
+                yield sink.drain()
+            manifest.append(snapshot_meta(s, digests[s.id]))
+        zf.writestr("manifest.json", json.dumps(manifest, indent=2))
+    yield sink.drain()
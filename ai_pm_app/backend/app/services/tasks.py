@@ -0,0 +1,98 @@
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import insert
+from sqlmodel import Session, select
+from ..models.entities import Task, TaskState, ActivityLog
+from .hierarchy import task_scope
+from .history import record_transitions
+from .rollups import ensure_rollup, record_activity, record_status_changes
+from .versioning import bump_version
+
+VALID_STATUSES = ("todo", "inprogress", "done")
+
+def apply_patch(t: Task, ts: TaskState, project_id: int, est_days: Optional[int] = None,
+                status: Optional[str] = None, done: Optional[bool] = None) -> List[Dict[str, Any]]:
+    """Apply one est_days/status/done patch to in-memory rows; returns the ActivityLog rows to write."""
+    logs: List[Dict[str, Any]] = []
+    now = datetime.utcnow()
+
+    def log(field: str, old, new):
+        logs.append({"project_id": project_id, "entity": "task", "entity_id": t.id, "field": field,
+                     "old_value": old, "new_value": new, "created_at": now})
+
+    # Update est_days
+    if est_days is not None:
+        old = t.est_days
+        t.est_days = int(max(1, est_days))
+        log("est_days", str(old), str(t.est_days))
+
+    if status is not None:
+        old = ts.status
+        ts.status = status.lower()
+        ts.done = (ts.status == "done") if done is None else bool(done)
+        ts.updated_at = now
+        log("status", old, ts.status)
+
+    if done is not None:
+        old = ts.done
+        ts.done = bool(done)
+        ts.status = "done" if ts.done else (ts.status if ts.status != "done" else "inprogress")
+        ts.updated_at = now
+        log("done", str(old), str(ts.done))
+    return logs
+
+def bulk_patch(session: Session, project_id: int, items: List[Any], atomic: bool = True) -> Dict[str, Any]:
+    """Patch many tasks of one project in a single transaction.
+
+    Task and TaskState rows are loaded with two set-based queries, activity entries are
+    written with one executemany, and rollups/version are updated once. With `atomic`
+    any invalid item aborts the whole batch; otherwise valid items are still applied.
+    Returns {"ok", "applied", "results"} with one result per item, in order.
+    """
+    ensure_rollup(session, project_id)
+    ids = {it.task_id for it in items}
+    tasks = {t.id: t for t in session.exec(task_scope(select(Task), project_id).where(Task.id.in_(ids))).all()} if ids else {}
+    states: Dict[int, TaskState] = {}
+    if tasks:
+        for st in session.exec(select(TaskState).where(TaskState.task_id.in_(list(tasks))).order_by(TaskState.id)).all():
+            states.setdefault(st.task_id, st)
+
+    errors: Dict[int, str] = {}
+    for i, it in enumerate(items):
+        if it.task_id not in tasks:
+            errors[i] = "Task not found in project"
+        elif it.status is not None and it.status.lower() not in VALID_STATUSES:
+            errors[i] = f"Unknown status '{it.status}'"
+    if errors and atomic:
+        return {"ok": False, "applied": 0,
+                "results": [{"task_id": it.task_id, "ok": i not in errors, "error": errors.get(i)}
+                            for i, it in enumerate(items)]}
+
+    start_status = {tid: (states[tid].status if tid in states else "todo") for tid in tasks}
+    new_states = []
+    logs: List[Dict[str, Any]] = []
+    results = []
+    for i, it in enumerate(items):
+        if i in errors:
+            results.append({"task_id": it.task_id, "ok": False, "error": errors[i]})
+            continue
+        t = tasks[it.task_id]
+        ts = states.get(t.id)
+        if ts is None:
+            ts = states[t.id] = TaskState(task_id=t.id)
+            new_states.append(ts)
+        logs += apply_patch(t, ts, project_id, est_days=it.est_days, status=it.status, done=it.done)
+        results.append({"task_id": t.id, "ok": True, "est_days": t.est_days, "status": ts.status, "done": ts.done})
+
+    applied = len(results) - len(errors)
+    if logs:
+        session.add_all(new_states)
+        session.execute(insert(ActivityLog), logs)
+        record_activity(session, project_id, len(logs))
+        record_status_changes(session, project_id, [(start_status[tid], states[tid].status) for tid in start_status if tid in states])
+        record_transitions(session, project_id, [(tid, start_status[tid], states[tid].status, tasks[tid].est_days)
+                                                 for tid in start_status if tid in states])
+        bump_version(session, project_id)
+    session.commit()
+    return {"ok": not errors, "applied": applied, "results": results}
@@ -0,0 +1,37 @@
+
+from datetime import datetime
+from typing import Iterable, Optional
+from sqlalchemy import insert, update
+from sqlmodel import Session, select
+from ..core.cache import response_cache
+from ..models.entities import ProjectVersion
+
+def get_version(session: Session, project_id: int) -> int:
+    """Current change counter of a project (0 for projects that were never versioned)."""
+    v = session.exec(select(ProjectVersion.version).where(ProjectVersion.project_id == project_id)).first()
+    return int(v or 0)
+
+def bump_version(session: Session, project_id: int) -> None:
+    """Increment the project's version inside the caller's transaction (no commit).
+
+    Cached responses of the project are keyed on the version and dropped here as well.
+    """
+    res = session.execute(
+        update(ProjectVersion)
+        .where(ProjectVersion.project_id == project_id)
+        .values(version=ProjectVersion.version + 1, updated_at=datetime.utcnow())
+    )
+    if res.rowcount == 0:
+        session.execute(insert(ProjectVersion), [{"project_id": project_id, "version": 1, "updated_at": datetime.utcnow()}])
+    response_cache.invalidate_project(project_id)
+
+def insert_versions(session: Session, project_ids: Iterable[int]) -> None:
+    rows = [{"project_id": pid, "version": 1, "updated_at": datetime.utcnow()} for pid in project_ids]
+    if rows:
+        session.execute(insert(ProjectVersion), rows)
+
+def etag_for(project_id: int, version: int, day: Optional[str] = None) -> str:
+    # Weak: the body also depends on content negotiation. The UTC day is part of the tag
+    # because several read endpoints default their start date to "today".
+    day = day or datetime.utcnow().date().isoformat()
+    return f'W/"p{project_id}-v{version}-{day}"'
@@ -0,0 +1,178 @@
+"""Time every GET /projects/{project_id}/... endpoint and the core services on synthetic projects.
+
+    python -m benchmarks.bench_endpoints [--sizes 10 1000 10000] [--repeat 3] [--out results.json]
+    python -m benchmarks.bench_endpoints --compare old.json new.json [--threshold 0.25]
+
+Each run uses a fresh SQLite file (override with DB_URL) and disables the read cache unless
+--with-cache is given, so the numbers reflect the handlers. Per endpoint the JSON output holds
+median/min wall time, SQL statements per request, peak traced memory and response size.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+def _configure(with_cache: bool) -> None:
+    # settings are read at import time, so this runs before any app module is imported
+    if "DB_URL" not in os.environ:
+        os.environ["DB_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='ai_pm_bench_')}/bench.db"
+    os.environ.setdefault("CACHE_BACKEND", "memory" if with_cache else "none")
+    os.environ.setdefault("GEN_CACHE_ENABLED", "false")
+
+class QueryCounter:
+    def __init__(self, engines):
+        from sqlalchemy import event
+        self.n = 0
+        for e in set(engines):
+            event.listen(e, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *_args, **_kw):
+        self.n += 1
+
+def _measure(fn, repeat: int, counter: QueryCounter):
+    """(result of last call, wall times in ms, statements per call, peak KiB)."""
+    fn()  # warm-up: compiled-statement cache, imports
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        out = fn()
+        times.append((time.perf_counter() - t) * 1000)
+    before = counter.n
+    tracemalloc.start()
+    fn()
+    _cur, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return out, times, counter.n - before, peak / 1024
+
+def _project_routes(app):
+    from fastapi.routing import APIRoute
+    for r in app.routes:
+        if isinstance(r, APIRoute) and "GET" in r.methods and r.path.startswith("/projects/{project_id}"):
+            yield r.path
+
+def run(sizes, repeat: int, with_cache: bool):
+    _configure(with_cache)
+    from fastapi.testclient import TestClient
+    from sqlmodel import Session
+    from ai_pm_app.backend.app.main import app
+    from ai_pm_app.backend.app.db.database import engine, read_engine, create_db_and_tables
+    from ai_pm_app.backend.app.models.propagation_schemas import PropagationRequest, ChangeItem, ApplyRequest
+    from ai_pm_app.backend.app.services.generator import persist_many
+    from ai_pm_app.backend.app.services.hierarchy import load_project_snapshot
+    from ai_pm_app.backend.app.services.propagation import preview_propagation, apply_suggestions
+    from benchmarks.synthetic import PlanShape, synthetic_plan, seed_project
+
+    create_db_and_tables()
+    client = TestClient(app)
+    counter = QueryCounter([engine, read_engine])
+    results = []
+
+    def record(size, name, times, queries, peak_kib, **extra):
+        row = {"size": size, "name": name, "ms_median": round(statistics.median(times), 3),
+               "ms_min": round(min(times), 3), "queries": queries, "peak_kib": round(peak_kib, 1), **extra}
+        results.append(row)
+        print(f"{size:>7} {name:<58} {row['ms_median']:>10.2f} ms {queries:>5} q {row['peak_kib']:>10.0f} KiB", flush=True)
+
+    for n in sizes:
+        shape = PlanShape.for_tasks(n)
+        t = time.perf_counter()
+        with Session(engine) as s:
+            pid = seed_project(s, shape)
+        print(f"seeded {n} tasks in {time.perf_counter() - t:.2f}s (project {pid})", flush=True)
+        sid = client.post(f"/projects/{pid}/snapshots", json={"label": "bench"}).json()["id"]
+        params = {"project_id": pid, "snapshot_id": sid, "a": sid, "b": sid}
+
+        gen = synthetic_plan(shape)
+
+        def generate():
+            with Session(engine) as s:
+                return persist_many(s, [gen])
+        _, times, q, peak = _measure(generate, max(1, repeat // 2), counter)
+        record(n, "service persist_many", times, q, peak)
+
+        with Session(engine) as s:
+            snap = load_project_snapshot(s, pid, with_states=False)
+            changes = [ChangeItem(entity="task", id=tk.id, field="est_days", new_value=3) for tk in snap.tasks[:500]]
+            changes += [ChangeItem(entity="outcome", id=o.id, field="name", new_value="Renamed") for o in snap.outcomes]
+        req = PropagationRequest(changes=changes)
+
+        def preview():
+            with Session(engine) as s:
+                return preview_propagation(s, pid, req)
+        out, times, q, peak = _measure(preview, repeat, counter)
+        record(n, f"service preview_propagation ({len(changes)} changes)", times, q, peak, suggestions=len(out.suggestions))
+
+        ops = ApplyRequest(ops=out.suggestions)
+
+        def apply():
+            # rolled back so every repeat (and the endpoints below) sees the seeded project
+            with Session(engine) as s:
+                res = apply_suggestions(s, pid, ops, commit=False)
+                s.rollback()
+                return res
+        out, times, q, peak = _measure(apply, repeat, counter)
+        record(n, f"service apply_suggestions ({len(ops.ops)} ops)", times, q, peak, applied=out.applied, rejected=len(out.rejected))
+
+        for path in _project_routes(app):
+            url = path.format(**params)
+            out, times, q, peak = _measure(lambda: client.get(url), repeat, counter)
+            record(n, f"GET {path}", times, q, peak, status=out.status_code, bytes=len(out.content))
+    return results
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+def compare(old_path: str, new_path: str, threshold: float) -> int:
+    """Print per-entry ratios; exit status 1 if any timing or query count regressed beyond threshold."""
+    def load(p):
+        with open(p) as f:
+            return {(r["size"], r["name"]): r for r in json.load(f)["results"]}
+    old, new = load(old_path), load(new_path)
+    regressions = 0
+    for key in sorted(set(old) & set(new)):
+        a, b = old[key], new[key]
+        ratio = b["ms_median"] / a["ms_median"] if a["ms_median"] else 1.0
+        flag = ""
+        if ratio > 1 + threshold or b["queries"] > a["queries"]:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{key[0]:>7} {key[1]:<58} {a['ms_median']:>9.2f} -> {b['ms_median']:>9.2f} ms  x{ratio:4.2f}  "
+              f"{a['queries']:>4} -> {b['queries']:<4} q{flag}")
+    print(f"{regressions} regression(s)")
+    return 1 if regressions else 0
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10, 1_000, 10_000], help="tasks per synthetic project")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--with-cache", action="store_true", help="keep the read-through response cache enabled")
+    ap.add_argument("--out", default=None, help="results file (default benchmarks/results/endpoints-<time>.json)")
+    ap.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    ap.add_argument("--threshold", type=float, default=0.25, help="relative slowdown reported as a regression")
+    args = ap.parse_args(argv)
+
+    if args.compare:
+        return compare(*args.compare, args.threshold)
+
+    results = run(args.sizes, args.repeat, args.with_cache)
+    out = args.out or os.path.join("benchmarks", "results", f"endpoints-{datetime.utcnow():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    meta = {"commit": _git_commit(), "created_at": datetime.utcnow().isoformat(), "python": sys.version.split()[0],
+            "platform": platform.platform(), "sizes": args.sizes, "repeat": args.repeat, "with_cache": args.with_cache}
+    with open(out, "w") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=1)
+    print(f"wrote {out}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
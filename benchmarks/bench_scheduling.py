@@ -0,0 +1,27 @@
+"""Time the critical-path scheduler on large synthetic task DAGs.
+
+    python -m benchmarks.bench_scheduling [n_tasks ...]
+"""
+import random
+import sys
+import time
+
+from ai_pm_app.backend.app.services.scheduling import compute_schedule
+
+def synthetic_dag(n: int, dep_ratio: float = 0.7, seed: int = 0):
+    rnd = random.Random(seed)
+    durations = [rnd.randint(1, 10) for _ in range(n)]
+    # depend on an earlier task only, so the graph is acyclic
+    preds = [rnd.randrange(i) if i and rnd.random() < dep_ratio else -1 for i in range(n)]
+    return durations, preds
+
+def main(sizes):
+    for n in sizes:
+        durations, preds = synthetic_dag(n)
+        t = time.perf_counter()
+        s = compute_schedule(durations, preds)
+        dt = time.perf_counter() - t
+        print(f"{n:>8} tasks  {dt*1000:8.1f} ms  makespan={s.makespan}d  critical={sum(s.critical)}")
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [1_000, 10_000, 100_000])
@@ -0,0 +1,53 @@
+"""Serialisation and transfer size of the large read payloads (tree, timeline, backlog).
+
+    python -m benchmarks.bench_serialisation [n_tasks ...]
+
+"default" is FastAPI's path (jsonable_encoder, then json.dumps); "dumps" is
+core.responses.dumps (orjson when installed). Sizes are the identity body and the body
+gzipped at the levels given, as sent by CompressionMiddleware.
+"""
+import gzip
+import json
+import os
+import sys
+import tempfile
+from datetime import date
+
+def _configure() -> None:
+    if "DB_URL" not in os.environ:
+        os.environ["DB_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='ai_pm_bench_')}/bench.db"
+
+def main(sizes, levels=(1, 6, 9)):
+    _configure()
+    from fastapi.encoders import jsonable_encoder
+    from sqlmodel import Session
+    from ai_pm_app.backend.app.core.responses import dumps, orjson
+    from ai_pm_app.backend.app.db.database import engine, create_db_and_tables
+    from ai_pm_app.backend.app.services.hierarchy import load_project_snapshot
+    from ai_pm_app.backend.app.services.panels import tree_panel, timeline_panel, backlog_panel
+    from benchmarks.bench_validation import best_of
+    from benchmarks.synthetic import PlanShape, seed_project
+
+    def default(content):
+        return json.dumps(jsonable_encoder(content), ensure_ascii=False, allow_nan=False,
+                          separators=(",", ":")).encode("utf-8")
+
+    create_db_and_tables()
+    print(f"dumps backend: {'orjson ' + orjson.__version__ if orjson else 'stdlib json'}")
+    for n in sizes:
+        with Session(engine) as s:
+            snap = load_project_snapshot(s, seed_project(s, PlanShape.for_tasks(n)), with_states=False)
+            payloads = {"tree": tree_panel(snap), "timeline": timeline_panel(snap, date(2025, 1, 6)),
+                        "backlog": backlog_panel(snap)}
+        for name, content in payloads.items():
+            body = dumps(content)
+            assert json.loads(body) == json.loads(default(content))
+            old = best_of(lambda: default(content))
+            new = best_of(lambda: dumps(content))
+            sizes_kib = "  ".join(f"gz{lvl} {len(gzip.compress(body, lvl)) / 1024:7.0f} KiB" for lvl in levels)
+            gz_ms = best_of(lambda: gzip.compress(body, 6), repeat=3)
+            print(f"{n:>7} tasks {name:<8} default {old * 1000:8.1f} ms  dumps {new * 1000:7.1f} ms  x{old / new:4.1f}"
+                  f"  | {len(body) / 1024:7.0f} KiB  {sizes_kib}  (gz6 {gz_ms * 1000:.1f} ms)")
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [1_000, 10_000])
@@ -0,0 +1,44 @@
+"""Compare GenProject validation paths on large synthetic generated plans.
+
+    python -m benchmarks.bench_validation [n_tasks ...]
+
+"dict" is the old path (json.loads then GenProject(**raw)); "json" parses the raw
+bytes with model_validate_json and also checks task dependencies.
+"""
+import json
+import random
+import sys
+import time
+
+from ai_pm_app.backend.app.models.schemas import GenProject, parse_generated
+
+def synthetic_plan(n_tasks: int, per_deliverable: int = 20, seed: int = 0) -> bytes:
+    rnd = random.Random(seed)
+    deliverables = []
+    for d in range(max(1, n_tasks // per_deliverable)):
+        tasks = [{"name": f"Task {d}.{i}", "est_days": rnd.randint(1, 10),
+                  "depends_on_index": rnd.randrange(i) if i and rnd.random() < 0.7 else None}
+                 for i in range(per_deliverable)]
+        deliverables.append({"name": f"Deliverable {d}", "description": "synthetic", "tasks": tasks})
+    benefits = [{"name": f"Benefit {i}", "deliverables": deliverables[i::10]} for i in range(10)]
+    raw = {"name": "Bench", "vision": "Benchmark plan", "outcomes": [{"name": "Outcome", "benefits": benefits}],
+           "risks": [{"title": "r", "probability": 3, "impact": 3}]}
+    return json.dumps(raw).encode()
+
+def best_of(fn, repeat: int = 5) -> float:
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return min(times)
+
+def main(sizes):
+    for n in sizes:
+        body = synthetic_plan(n)
+        old = best_of(lambda: GenProject(**json.loads(body)))
+        new = best_of(lambda: parse_generated(body))
+        print(f"{n:>8} tasks  {len(body)/1024:8.0f} KiB  dict {old*1000:8.1f} ms  json {new*1000:8.1f} ms  x{old/new:4.2f}")
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [1_000, 10_000, 50_000])
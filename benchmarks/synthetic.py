@@ -0,0 +1,92 @@
+"""Synthetic project plans of configurable size for benchmarks.
+
+    from benchmarks.synthetic import PlanShape, synthetic_plan, seed_project
+"""
+import random
+from dataclasses import dataclass, asdict
+from datetime import datetime, timedelta
+from typing import Any, Dict
+
+from sqlalchemy import insert, select
+from sqlmodel import Session
+
+from ai_pm_app.backend.app.models.entities import Task, TaskState
+from ai_pm_app.backend.app.models.schemas import GenProject, parse_generated
+from ai_pm_app.backend.app.services.generator import persist_many
+from ai_pm_app.backend.app.services.hierarchy import task_scope
+from ai_pm_app.backend.app.services.history import backfill_transitions
+from ai_pm_app.backend.app.services.rollups import rebuild_rollup
+
+@dataclass
+class PlanShape:
+    tasks: int = 1000
+    outcomes: int = 4
+    benefits_per_outcome: int = 3
+    tasks_per_deliverable: int = 10
+    dep_density: float = 0.6       # share of tasks that depend on an earlier task of their deliverable
+    inprogress: float = 0.2         # TaskState mix; the rest stays todo (no TaskState row)
+    done: float = 0.3
+    risks: int = 20
+    budget_lines: int = 20
+    history_days: int = 28          # done/inprogress updates are spread over this many past days
+    seed: int = 0
+
+    @classmethod
+    def for_tasks(cls, n: int, **kw) -> "PlanShape":
+        """A shape whose fan-out grows with n, so the tree stays roughly balanced."""
+        outcomes = max(1, min(20, n // 2000 + 1))
+        return cls(tasks=n, outcomes=outcomes, benefits_per_outcome=max(1, min(10, n // 500 + 1)),
+                   tasks_per_deliverable=max(1, min(25, n // 10 or 1)), **kw)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+def synthetic_plan(shape: PlanShape) -> GenProject:
+    rnd = random.Random(shape.seed)
+    n_deliverables = max(1, -(-shape.tasks // shape.tasks_per_deliverable))
+    n_benefits = shape.outcomes * shape.benefits_per_outcome
+    deliverables = []
+    remaining = shape.tasks
+    for d in range(n_deliverables):
+        k = min(shape.tasks_per_deliverable, remaining)
+        remaining -= k
+        tasks = [{"name": f"Task {d}.{i}", "est_days": rnd.randint(1, 10),
+                  "depends_on_index": rnd.randrange(i) if i and rnd.random() < shape.dep_density else None}
+                 for i in range(k)]
+        deliverables.append({"name": f"Deliverable {d}", "description": f"Synthetic deliverable {d}", "tasks": tasks})
+    benefits = [{"name": f"Benefit {b}", "description": "Synthetic benefit", "deliverables": deliverables[b::n_benefits]}
+                for b in range(n_benefits)]
+    outcomes = [{"name": f"Outcome {o}", "description": "Synthetic outcome",
+                 "benefits": benefits[o * shape.benefits_per_outcome:(o + 1) * shape.benefits_per_outcome]}
+                for o in range(shape.outcomes)]
+    categories = ["People", "Tooling", "Licences", "Infrastructure", "Training"]
+    raw = {
+        "name": f"Synthetic {shape.tasks} tasks", "vision": f"Benchmark plan with {shape.tasks} tasks",
+        "description": "Synthetic benchmark plan", "outcomes": outcomes,
+        "budget": [{"item": f"Line {i}", "amount": round(rnd.uniform(100, 50000), 2), "category": rnd.choice(categories)}
+                   for i in range(shape.budget_lines)],
+        "governance": [{"name": "Sprint review", "cadence": "Bi-weekly", "owner": "PM"}],
+        "reporting": [{"name": "Status report", "frequency": "Weekly", "audience": "Sponsors"}],
+        "risks": [{"title": f"Risk {i}", "probability": rnd.randint(1, 5), "impact": rnd.randint(1, 5)}
+                  for i in range(shape.risks)],
+    }
+    return parse_generated(raw)
+
+def seed_project(session: Session, shape: PlanShape) -> int:
+    """Persist a synthetic plan plus its TaskState mix and status history; returns the project id."""
+    pid = persist_many(session, [synthetic_plan(shape)])[0]
+    rnd = random.Random(shape.seed + 1)
+    now = datetime.utcnow()
+    rows = []
+    for tid in session.scalars(task_scope(select(Task.id), pid)).all():
+        x = rnd.random()
+        if x < shape.done + shape.inprogress:
+            done = x < shape.done
+            rows.append({"task_id": tid, "status": "done" if done else "inprogress", "done": done,
+                         "updated_at": now - timedelta(days=rnd.randrange(max(1, shape.history_days)))})
+    if rows:
+        session.execute(insert(TaskState), rows)
+    rebuild_rollup(session, pid)
+    backfill_transitions(session, pid)
+    session.commit()
+    return pid
@@ -0,0 +1,15 @@
+import os
+import shutil
+import tempfile
+
+# Settings and engines are read at import time, so point every on-disk store at a fresh
+# per-run directory before any test module imports the app. Nothing is written into the
+# repo, and the generation/response caches do not carry over between runs.
+_TMP = tempfile.mkdtemp(prefix="ai_pm_tests_")
+os.environ.setdefault("DB_URL", f"sqlite:///{_TMP}/ai_pm.db")
+os.environ["CACHE_PATH"] = os.path.join(_TMP, "response_cache.db")
+os.environ["GEN_CACHE_PATH"] = os.path.join(_TMP, "generation_cache.db")
+os.environ["PROFILE_DIR"] = os.path.join(_TMP, "profiles")
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_TMP, ignore_errors=True)
@@ -0,0 +1,39 @@
+import os, sys
+sys.path.insert(0, os.getcwd())
+
+from datetime import date, timedelta
+import pytest
+from ai_pm_app.backend.app.services import agile
+
+T0 = date(2025, 1, 1)
+DONE = {T0 - timedelta(days=3): 2, T0 + timedelta(days=1): 3, T0 + timedelta(days=5): 4, T0 + timedelta(days=40): 1}
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param == "python":
+        monkeypatch.setattr(agile, "np", None)
+    elif agile.np is None:
+        pytest.skip("numpy not installed")
+
+def _naive_actual(total, days):
+    return [max(0, total - sum(p for d, p in DONE.items() if d <= T0 + timedelta(days=i))) for i in range(days + 1)]
+
+def test_burn_down_matches_naive_scan(backend):
+    out = agile.burn_down(T0, 7, 12, DONE)
+    assert out["actual"] == _naive_actual(12, 7)
+    assert out["ideal"][0] == 12 and out["ideal"][-1] == 0
+    assert len(out["labels"]) == 8
+
+def test_velocity_buckets_per_sprint(backend):
+    out = agile.velocity(T0, 7, 6, DONE)
+    # before-start completions are ignored, day 40 falls in sprint 6
+    assert out["velocity"] == [7, 0, 0, 0, 0, 1]
+    assert out["labels"][0].startswith("S1 2025-01-01")
+
+def test_burn_up_scope_line(backend):
+    # +2 points logged on day 2, -1 on day 20 (after the horizon)
+    out = agile.burn_up(T0, 5, 2, 20, DONE, {T0 + timedelta(days=2): 2, T0 + timedelta(days=20): -1})
+    assert out["scope"][:3] == [19, 19, 21]
+    assert out["scope"][-1] == 21
+    assert out["done"][0] == 2 and out["done"][-1] == 9
+    assert out["sprint_boundaries"] == ["2025-01-01", "2025-01-06", "2025-01-11"]
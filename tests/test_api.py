@@ -4,10 +4,29 @@ sys.path.insert(0, os.getcwd())
 
 from fastapi.testclient import TestClient
 from datetime import date
+from sqlalchemy import event
+from sqlmodel import Session
 from ai_pm_app.backend.app.main import app
+from ai_pm_app.backend.app.core.profiling import profiler
+from ai_pm_app.backend.app.db.database import engine, create_db_and_tables
+from ai_pm_app.backend.app.models.entities import Task
+from ai_pm_app.backend.app.services.hierarchy import load_project_snapshot
 
+# TestClient is used without a lifespan context, so create the tables up front
+create_db_and_tables()
 client = TestClient(app)
 
+def _count_queries(fn):
+    n = {"q": 0}
+    def on_exec(*_a, **_k):
+        n["q"] += 1
+    event.listen(engine, "before_cursor_execute", on_exec)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", on_exec)
+    return n["q"]
+
 def test_health():
     r = client.get('/health')
     assert r.status_code == 200
@@ -43,3 +62,493 @@ def test_dashboard_route():
     r = client.get('/dashboard')
     assert r.status_code == 200
     assert 'AI PM Dashboard' in r.text
+
+def test_snapshot_query_count_is_constant():
+    pid = client.post('/projects/generate', json={'vision':'Scale test'}).json()['project_id']
+    with Session(engine) as s:
+        before = _count_queries(lambda: load_project_snapshot(s, pid))
+        snap = load_project_snapshot(s, pid)
+        did = snap.deliverables[0].id
+        s.add_all([Task(deliverable_id=did, name=f"extra {i}", est_days=1) for i in range(50)])
+        s.commit()
+        s.expunge_all()
+        after = _count_queries(lambda: load_project_snapshot(s, pid))
+        assert len(load_project_snapshot(s, pid).tasks) == len(snap.tasks) + 50
+    assert before == after
+
+    tree = client.get(f'/projects/{pid}').json()
+    n_tasks = sum(len(d['tasks']) for o in tree['outcomes'] for b in o['benefits'] for d in b['deliverables'])
+    assert n_tasks == len(snap.tasks) + 50
+    assert client.get(f'/projects/{pid}/backlog').json()['count'] == n_tasks
+
+def test_import_persists_many_projects_with_dependencies():
+    from ai_pm_app.backend.app.services.generator import llm_generate_fixture
+    docs = [llm_generate_fixture(f'Import {i}') for i in range(3)]
+    commits = {"n": 0}
+    def on_commit(_conn):
+        commits["n"] += 1
+    event.listen(engine, "commit", on_commit)
+    try:
+        r = client.post('/projects/import', json={'projects': docs})
+    finally:
+        event.remove(engine, "commit", on_commit)
+    assert r.status_code == 200
+    ids = r.json()['project_ids']
+    assert len(ids) == 3 and commits["n"] == 1
+
+    tree = client.get(f'/projects/{ids[1]}').json()
+    assert tree['name'] == docs[1]['name']
+    tasks = tree['outcomes'][0]['benefits'][0]['deliverables'][0]['tasks']
+    assert tasks[0]['depends_on_id'] is None
+    assert tasks[1]['depends_on_id'] == tasks[0]['id']
+    assert len(tree['budget']) == 1 and len(tree['risks']) == 1
+
+    assert client.post('/projects/import', json={'projects': []}).status_code == 400
+
+def test_import_statement_count_grows_with_tables_not_rows():
+    from ai_pm_app.backend.app.services.generator import llm_generate_fixture
+    def run(n):
+        docs = [llm_generate_fixture(f'Bulk {i}') for i in range(n)]
+        ids = []
+        q = _count_queries(lambda: ids.extend(client.post('/projects/import', json={'projects': docs}).json()['project_ids']))
+        return q, ids
+    small, _ = run(2)
+    large, ids = run(50)
+    assert large == small
+    tree = client.get(f'/projects/{ids[-1]}').json()
+    assert tree['name'] == llm_generate_fixture('Bulk 49')['name']
+    tasks = tree['outcomes'][0]['benefits'][0]['deliverables'][0]['tasks']
+    assert tasks[1]['depends_on_id'] == tasks[0]['id']
+
+def test_timeline_follows_dependencies_and_reports_cycles():
+    pid = client.post('/projects/generate', json={'vision':'Timeline'}).json()['project_id']
+    tl = client.get(f'/projects/{pid}/timeline?start=2025-01-01').json()
+    items = {x['task_id']: x for x in tl['items']}
+    for x in tl['items']:
+        if x['depends_on_id']:
+            assert x['earliest_start'] == items[x['depends_on_id']]['earliest_finish']
+        assert x['slack_days'] >= 0
+    assert tl['duration_days'] == 8  # Design intents (3) -> Implement flows (5)
+    assert all(items[t]['critical'] for t in tl['critical_path'])
+
+    first, second = tl['items'][0]['task_id'], tl['items'][1]['task_id']
+    with Session(engine) as s:
+        s.get(Task, first).depends_on_id = second
+        s.commit()
+    r = client.get(f'/projects/{pid}/timeline')
+    assert r.status_code == 409
+    assert sorted(r.json()['detail']['task_ids']) == sorted([first, second])
+
+def test_rollups_track_write_paths_without_drift():
+    from ai_pm_app.backend.app.services.rollups import rebuild_all
+    pid = client.post('/projects/generate', json={'vision':'Rollups'}).json()['project_id']
+    k = client.get(f'/projects/{pid}/kpis').json()
+    assert k['counts'] == {'outcomes': 2, 'benefits': 2, 'deliverables': 2, 'tasks': 4}
+    assert k['tasks_by_status'] == {'todo': 4, 'inprogress': 0, 'done': 0}
+
+    tid = client.get(f'/projects/{pid}/backlog').json()['columns']['todo'][0]['task_id']
+    client.patch(f'/projects/tasks/{tid}', json={'status': 'inprogress'})
+    client.patch(f'/projects/tasks/{tid}', json={'status': 'done', 'done': True, 'est_days': 2})
+    k = client.get(f'/projects/{pid}/kpis').json()
+    assert k['tasks_by_status'] == {'todo': 3, 'inprogress': 0, 'done': 1}
+    assert k['activity_applied'] == 4
+
+    bl = client.get(f'/projects/{pid}').json()['budget'][0]
+    r = client.post(f'/projects/{pid}/propagate/apply', json={'ops': [
+        {'entity': 'budget', 'id': bl['id'], 'field': 'amount', 'new_value': 750.0, 'reason': 'test'}]})
+    assert r.status_code == 200
+    assert client.get(f'/projects/{pid}/budget/summary').json()['total'] == 750.0
+    assert client.get(f'/projects/{pid}/kpis').json()['activity_applied'] == 5
+    assert client.get(f'/projects/{pid}/risk/summary').json()['matrix']['3']['3'] == 1
+
+    with Session(engine) as s:
+        drift = [d for d in rebuild_all(s, check_only=True) if d['project_id'] == pid]
+    assert drift == []
+
+def test_write_paths_do_not_double_count_a_missing_rollup():
+    from ai_pm_app.backend.app.models.entities import ProjectRollup
+    pid = client.post('/projects/generate', json={'vision': 'Missing rollup'}).json()['project_id']
+    tids = [t['task_id'] for t in client.get(f'/projects/{pid}/backlog').json()['columns']['todo']]
+    def drop_rollup():
+        with Session(engine) as s:
+            s.delete(s.get(ProjectRollup, pid))
+            s.commit()
+
+    drop_rollup()
+    client.patch(f'/projects/tasks/{tids[0]}', json={'status': 'done'})
+    k = client.get(f'/projects/{pid}/kpis').json()
+    assert k['tasks_by_status'] == {'todo': 3, 'inprogress': 0, 'done': 1}
+    assert k['activity_applied'] == 1
+
+    drop_rollup()
+    client.patch(f'/projects/{pid}/tasks', json={'items': [{'task_id': tids[1], 'status': 'inprogress'}]})
+    k = client.get(f'/projects/{pid}/kpis').json()
+    assert k['tasks_by_status'] == {'todo': 2, 'inprogress': 1, 'done': 1}
+    assert k['activity_applied'] == 2
+
+    drop_rollup()
+    client.post(f'/projects/{pid}/propagate/apply', json={'ops': [
+        {'entity': 'task', 'id': tids[2], 'field': 'name', 'new_value': 'Renamed', 'reason': 'test'}]})
+    assert client.get(f'/projects/{pid}/kpis').json()['activity_applied'] == 3
+
+def test_burnup_tracks_scope_and_done():
+    pid = client.post('/projects/generate', json={'vision':'Burnup'}).json()['project_id']
+    today = date.today().isoformat()
+    tid = client.get(f'/projects/{pid}/backlog').json()['columns']['todo'][0]['task_id']
+    client.patch(f'/projects/tasks/{tid}', json={'est_days': 6})
+    client.patch(f'/projects/tasks/{tid}', json={'status': 'done', 'done': True})
+    bu = client.get(f'/projects/{pid}/burnup?start={today}&sprint_days=7&sprints=2').json()
+    assert bu['total_points'] == bu['scope'][-1] == 17
+    assert bu['done'][0] == 6
+    burn = client.get(f'/projects/{pid}/burn?start={today}&sprint_days=7').json()
+    assert burn['actual'][0] == 11
+    vel = client.get(f'/projects/{pid}/velocity?start={today}&sprint_days=7').json()
+    assert vel['velocity'] == [6, 0, 0, 0]
+
+def test_dashboard_matches_individual_panels():
+    pid = client.post('/projects/generate', json={'vision':'Dashboard'}).json()['project_id']
+    start = date.today().isoformat()
+    tid = client.get(f'/projects/{pid}/backlog').json()['columns']['todo'][0]['task_id']
+    client.patch(f'/projects/tasks/{tid}', json={'status': 'done', 'done': True})
+
+    dash = client.get(f'/projects/{pid}/dashboard?timeline_start={start}&sprint_start={start}').json()
+    assert dash['panels'] == ['kpis', 'budget', 'risk', 'backlog', 'timeline', 'burn', 'velocity']
+    assert dash['kpis'] == client.get(f'/projects/{pid}/kpis').json()
+    assert dash['budget'] == client.get(f'/projects/{pid}/budget/summary').json()
+    assert dash['risk'] == client.get(f'/projects/{pid}/risk/summary').json()
+    assert dash['backlog'] == client.get(f'/projects/{pid}/backlog').json()
+    assert dash['timeline'] == client.get(f'/projects/{pid}/timeline?start={start}').json()
+    assert dash['burn'] == client.get(f'/projects/{pid}/burn?start={start}').json()
+    assert dash['velocity'] == client.get(f'/projects/{pid}/velocity?start={start}').json()
+
+    sub = client.get(f'/projects/{pid}/dashboard?panels=burn,kpis').json()
+    assert sub['panels'] == ['kpis', 'burn'] and 'backlog' not in sub
+    assert client.get(f'/projects/{pid}/dashboard?panels=nope').status_code == 400
+    assert client.get('/projects/999999/dashboard').status_code == 404
+
+def test_completed_points_count_each_task_once():
+    from ai_pm_app.backend.app.models.entities import TaskState
+    from ai_pm_app.backend.app.services.rollups import rebuild_all
+    pid = client.post('/projects/generate', json={'vision':'Duplicate states'}).json()['project_id']
+    start = date.today().isoformat()
+    tids = [t['task_id'] for t in client.get(f'/projects/{pid}/backlog').json()['columns']['todo']]
+    client.patch(f'/projects/tasks/{tids[0]}', json={'status': 'inprogress'})
+    with Session(engine) as s:  # a stray second row for the same task is not its current state
+        s.add(TaskState(task_id=tids[0], status='done', done=True))
+        s.commit()
+
+    dash = client.get(f'/projects/{pid}/dashboard?panels=burn,velocity&sprint_start={start}').json()
+    burn = client.get(f'/projects/{pid}/burn?start={start}').json()
+    assert dash['burn'] == burn and burn['actual'][0] == burn['total_points']
+    assert dash['velocity'] == client.get(f'/projects/{pid}/velocity?start={start}').json()
+    with Session(engine) as s:
+        assert [d for d in rebuild_all(s, check_only=True) if d['project_id'] == pid] == []
+
+def test_etag_revalidation_and_version_bumps():
+    pid = client.post('/projects/generate', json={'vision':'ETag'}).json()['project_id']
+    r = client.get(f'/projects/{pid}/backlog')
+    etag = r.headers['etag']
+    assert f'p{pid}-v1-' in etag
+
+    seen = []
+    def on_exec(_conn, _cur, statement, *_a):
+        seen.append(statement.lower())
+    event.listen(engine, "before_cursor_execute", on_exec)
+    try:
+        r304 = client.get(f'/projects/{pid}/backlog', headers={'If-None-Match': etag})
+    finally:
+        event.remove(engine, "before_cursor_execute", on_exec)
+    assert r304.status_code == 304 and r304.headers['etag'] == etag
+    assert not any(t in stmt for stmt in seen for t in (' task', ' outcome', ' deliverable'))
+
+    tid = r.json()['columns']['todo'][0]['task_id']
+    client.patch(f'/projects/tasks/{tid}', json={'status': 'inprogress'})
+    r2 = client.get(f'/projects/{pid}/backlog', headers={'If-None-Match': etag})
+    assert r2.status_code == 200 and f'p{pid}-v2-' in r2.headers['etag']
+
+    client.post(f'/projects/{pid}/propagate/apply', json={'ops': []})
+    assert f'p{pid}-v2-' in client.get(f'/projects/{pid}').headers['etag']
+    client.post(f'/projects/{pid}/propagate/apply', json={'ops': [
+        {'entity': 'task', 'id': tid, 'field': 'est_days', 'new_value': 4, 'reason': 'test'}]})
+    assert f'p{pid}-v3-' in client.get(f'/projects/{pid}').headers['etag']
+    assert 'etag' not in client.get('/health').headers
+
+def test_etag_does_not_answer_304_for_unknown_projects():
+    r = client.get('/projects/99999/kpis', headers={'If-None-Match': '*'})
+    assert r.status_code == 404 and 'etag' not in r.headers
+
+def test_read_cache_hits_and_write_invalidation(monkeypatch):
+    pid = client.post('/projects/generate', json={'vision':'Cache'}).json()['project_id']
+    first = client.get(f'/projects/{pid}/timeline?start=2025-02-01')
+    again = client.get(f'/projects/{pid}/timeline?start=2025-02-01')
+    assert first.headers['x-cache'] == 'MISS' and again.headers['x-cache'] == 'HIT'
+    assert first.json() == again.json()
+    assert client.get(f'/projects/{pid}/timeline?start=2025-03-01').headers['x-cache'] == 'MISS'
+
+    tid = first.json()['items'][0]['task_id']
+    client.patch(f'/projects/tasks/{tid}', json={'est_days': 9})
+    after = client.get(f'/projects/{pid}/timeline?start=2025-02-01')
+    assert after.headers['x-cache'] == 'MISS'
+    assert after.json()['items'][0]['duration_days'] == 9
+
+    monkeypatch.setattr(profiler, "token", "t")
+    stats = client.get('/admin/cache', headers={'X-Admin-Token': 't'}).json()
+    assert stats['hits'] >= 1 and stats['invalidations'] >= 2
+
+def test_bulk_task_patch_modes():
+    pid = client.post('/projects/generate', json={'vision':'Bulk'}).json()['project_id']
+    other = client.post('/projects/generate', json={'vision':'Other'}).json()['project_id']
+    ids = [t['task_id'] for t in client.get(f'/projects/{pid}/backlog').json()['columns']['todo']]
+    foreign = client.get(f'/projects/{other}/backlog').json()['columns']['todo'][0]['task_id']
+
+    bad = {'items': [{'task_id': ids[0], 'status': 'done'}, {'task_id': foreign, 'status': 'done'}]}
+    r = client.patch(f'/projects/{pid}/tasks', json=bad)
+    assert r.status_code == 422
+    assert [x['ok'] for x in r.json()['detail']['results']] == [True, False]
+    assert client.get(f'/projects/{pid}/kpis').json()['tasks_by_status']['done'] == 0
+
+    r = client.patch(f'/projects/{pid}/tasks', json={**bad, 'mode': 'best_effort'})
+    assert r.status_code == 200 and r.json()['applied'] == 1 and not r.json()['ok']
+
+    queries = _count_queries(lambda: client.patch(f'/projects/{pid}/tasks', json={'items': [
+        {'task_id': ids[1], 'status': 'inprogress'},
+        {'task_id': ids[2], 'est_days': 7, 'status': 'done', 'done': True},
+        {'task_id': ids[3], 'status': 'sideways'},
+    ], 'mode': 'best_effort'}))
+    back = client.get(f'/projects/{pid}/backlog').json()['columns']
+    assert {t['task_id'] for t in back['done']} == {ids[0], ids[2]}
+    assert [t['task_id'] for t in back['inprogress']] == [ids[1]]
+    k = client.get(f'/projects/{pid}/kpis').json()
+    assert k['tasks_by_status'] == {'todo': 1, 'inprogress': 1, 'done': 2}
+    assert k['activity_applied'] == 5
+    assert queries < 20
+
+def test_propagation_preview_ripples_transitively():
+    pid = client.post('/projects/generate', json={'vision':'Ripple test'}).json()['project_id']
+    with Session(engine) as s:
+        snap = load_project_snapshot(s, pid)
+        o = snap.outcomes[0]
+        b = snap.benefits_by_outcome[o.id][0]
+        dels = snap.deliverables_by_benefit[b.id]
+        # chain a task in another deliverable behind the first task of this benefit
+        first = snap.tasks_by_deliverable[dels[0].id][0]
+        other = next(t for t in snap.tasks if t.deliverable_id not in {d.id for d in dels})
+        s.get(Task, other.id).depends_on_id = first.id
+        o_id, b_id, d0_id, first_id, other_did = o.id, b.id, dels[0].id, first.id, other.deliverable_id
+        task_ids = [t.id for t in snap.tasks]
+        s.commit()
+
+    changes = [
+        {'entity': 'outcome', 'id': o_id, 'field': 'name', 'new_value': 'Renamed'},
+        {'entity': 'benefit', 'id': b_id, 'field': 'name', 'new_value': 'B2'},
+        {'entity': 'task', 'id': first_id, 'field': 'est_days', 'new_value': 9},
+    ]
+    sug = client.post(f'/projects/{pid}/propagate/preview', json={'changes': changes}).json()['suggestions']
+    keys = [(x['entity'], x['id'], x['field']) for x in sug]
+    assert len(keys) == len(set(keys))
+    by_key = {(x['entity'], x['id']): x for x in sug if x['field'] == 'description'}
+    d0 = by_key[('deliverable', d0_id)]['new_value']
+    assert '[Aligned with Outcome: Renamed]' in d0
+    assert '[Aligned with Benefit: B2]' in d0
+    assert '[Timeline updated due to task change]' in d0
+    assert '[Timeline updated due to task change]' in by_key[('deliverable', other_did)]['new_value']
+
+    # unknown rows are skipped; a large batch costs a fixed number of queries
+    many = [{'entity': 'task', 'id': tid, 'field': 'est_days', 'new_value': 2} for tid in task_ids] * 20
+    few = _count_queries(lambda: client.post(f'/projects/{pid}/propagate/preview', json={'changes': changes[:1]}))
+    lots = _count_queries(lambda: client.post(f'/projects/{pid}/propagate/preview', json={'changes': many + [{'entity': 'task', 'id': 10**9, 'field': 'name', 'new_value': 'x'}]}))
+    assert few == lots
+
+def test_propagate_apply_is_single_pass_and_optimistic():
+    pid = client.post('/projects/generate', json={'vision':'Apply test'}).json()['project_id']
+    other = client.post('/projects/generate', json={'vision':'Other project'}).json()['project_id']
+    tree = client.get(f'/projects/{pid}').json()
+    d = tree['outcomes'][0]['benefits'][0]['deliverables'][0]
+    t = d['tasks'][0]
+    risk = tree['risks'][0]
+    foreign = client.get(f'/projects/{other}').json()['outcomes'][0]
+    before = client.get(f'/projects/{pid}/kpis').json()['activity_applied']
+
+    ops = [
+        {'entity': 'deliverable', 'id': d['id'], 'field': 'description', 'old_value': d['description'], 'new_value': 'new desc', 'reason': 'r'},
+        {'entity': 'task', 'id': t['id'], 'field': 'est_days', 'old_value': t['est_days'], 'new_value': '7', 'reason': 'r'},
+        {'entity': 'task', 'id': t['id'], 'field': 'est_days', 'old_value': 7, 'new_value': 8, 'reason': 'r'},
+        {'entity': 'risk', 'id': risk['id'], 'field': 'impact', 'old_value': risk['impact'], 'new_value': 1, 'reason': 'r'},
+        {'entity': 'deliverable', 'id': d['id'], 'field': 'name', 'old_value': 'not the name', 'new_value': 'x', 'reason': 'r'},
+        {'entity': 'outcome', 'id': foreign['id'], 'field': 'name', 'new_value': 'x', 'reason': 'r'},
+        {'entity': 'task', 'id': t['id'], 'field': 'deliverable_id', 'new_value': 1, 'reason': 'r'},
+    ]
+    n = {}
+    def go():
+        n['r'] = client.post(f'/projects/{pid}/propagate/apply', json={'ops': ops}).json()
+    queries = _count_queries(go)
+    body = n['r']
+    assert body['applied'] == 4
+    assert [r['index'] for r in body['rejected']] == [4, 5, 6]
+    assert body['rejected'][0]['current_value'] == d['name']
+
+    tree = client.get(f'/projects/{pid}').json()
+    d2 = tree['outcomes'][0]['benefits'][0]['deliverables'][0]
+    assert d2['description'] == 'new desc' and d2['name'] == d['name']
+    assert d2['tasks'][0]['est_days'] == 8
+    assert client.get(f'/projects/{other}').json()['outcomes'][0]['name'] == foreign['name']
+    assert client.get(f'/projects/{pid}/risk/summary').json()['matrix'][str(risk['probability'])]['1'] >= 1
+    assert client.get(f'/projects/{pid}/kpis').json()['activity_applied'] == before + 4
+
+    # a larger batch does not add per-op queries
+    ops = [{'entity': 'task', 'id': t['id'], 'field': 'name', 'new_value': f'n{i}', 'reason': 'r'} for i in range(200)]
+    assert _count_queries(go) <= queries
+
+def test_propagate_apply_compares_old_value_as_column_type():
+    # JSON.stringify sends a stored 500.0 back as 500; that must not read as stale
+    pid = client.post('/projects/generate', json={'vision':'Typed old values'}).json()['project_id']
+    line = client.get(f'/projects/{pid}').json()['budget'][0]
+    amount = int(line['amount'])
+    assert amount == line['amount']
+    ops = [
+        {'entity': 'budget', 'id': line['id'], 'field': 'amount', 'old_value': amount, 'new_value': 650, 'reason': 'r'},
+        {'entity': 'budget', 'id': line['id'], 'field': 'amount', 'old_value': '650', 'new_value': 700.5, 'reason': 'r'},
+        {'entity': 'budget', 'id': line['id'], 'field': 'amount', 'old_value': 700, 'new_value': 1, 'reason': 'r'},
+        {'entity': 'budget', 'id': line['id'], 'field': 'amount', 'old_value': 'n/a', 'new_value': 1, 'reason': 'r'},
+    ]
+    body = client.post(f'/projects/{pid}/propagate/apply', json={'ops': ops}).json()
+    assert body['applied'] == 2
+    assert [(r['index'], r['error'], r['current_value']) for r in body['rejected']] == [
+        (2, 'Stale old_value', 700.5), (3, 'Stale old_value', 700.5)]
+    assert client.get(f'/projects/{pid}').json()['budget'][0]['amount'] == 700.5
+
+def test_activity_feed_pagination_and_compaction():
+    from datetime import datetime, timedelta
+    from ai_pm_app.backend.app.models.entities import ActivityLog, ProjectVersion
+    from ai_pm_app.backend.app.services.activity import backfill_project_ids, compact_activity
+
+    pid = client.post('/projects/generate', json={'vision':'Activity test'}).json()['project_id']
+    tids = [r['task_id'] for r in client.get(f'/projects/{pid}/backlog').json()['columns']['todo']][:3]
+    for i in range(3):
+        for tid in tids:
+            client.patch(f'/projects/tasks/{tid}', json={'est_days': i + 2})
+    client.patch(f'/projects/tasks/{tids[0]}', json={'status': 'inprogress'})
+    with Session(engine) as s:
+        s.add(ActivityLog(project_id=0, entity='task', entity_id=tids[1], field='name', old_value='a', new_value='b'))
+        s.commit()
+        assert backfill_project_ids(s) >= 1
+        s.commit()
+
+    seen, cursor = [], None
+    while True:
+        page = client.get(f'/projects/{pid}/activity', params={'limit': 4, **({'cursor': cursor} if cursor else {})}).json()
+        seen += page['items']
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+    assert len(seen) == 11
+    assert len({x['id'] for x in seen}) == 11
+    assert [(x['created_at'], x['id']) for x in seen] == sorted(((x['created_at'], x['id']) for x in seen), reverse=True)
+    assert client.get(f'/projects/{pid}/kpis').json()['activity_applied'] == 11
+
+    only = client.get(f'/projects/{pid}/activity', params={'entity': 'task', 'entity_id': tids[0], 'field': 'est_days'}).json()
+    assert [x['new_value'] for x in only['items']] == ['4', '3', '2']
+    assert client.get(f'/projects/{pid}/activity', params={'cursor': 'bogus'}).status_code == 400
+
+    start = date.today().isoformat()
+    scope_before = client.get(f'/projects/{pid}/burnup?start={start}').json()['scope']
+    with Session(engine) as s:
+        # an entry no project owns: compacted, but must not create a ProjectVersion row
+        s.add(ActivityLog(project_id=0, entity='deliverable', entity_id=10**9, field='name', old_value='a', new_value='b'))
+        s.commit()
+        out = compact_activity(s, datetime.utcnow() + timedelta(seconds=1))
+        s.commit()
+        assert s.get(ProjectVersion, 0) is None
+    assert out['compacted'] >= 12
+    assert client.get(f'/projects/{pid}/activity').json()['items'] == []
+    assert client.get(f'/projects/{pid}/kpis').json()['activity_applied'] == 11
+    assert client.get(f'/projects/{pid}/burnup?start={start}').json()['scope'] == scope_before
+    with Session(engine) as s:
+        from ai_pm_app.backend.app.services.rollups import rebuild_all
+        assert not [e for e in rebuild_all(s, check_only=True) if e['project_id'] == pid]
+
+def test_streaming_export_matches_read_endpoints():
+    import csv, io, json
+    pid = client.post('/projects/generate', json={'vision':'Export test'}).json()['project_id']
+    tree = client.get(f'/projects/{pid}').json()
+
+    r = client.get(f'/projects/{pid}/export', params={'format': 'ndjson', 'what': 'tree'})
+    assert r.status_code == 200
+    assert r.headers['content-type'].startswith('application/x-ndjson')
+    assert 'attachment' in r.headers['content-disposition']
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert rows[0] == {'type': 'project', 'id': pid, 'name': tree['name'], 'description': tree['description']}
+    tasks = [x['id'] for x in rows if x['type'] == 'task']
+    assert tasks == [t['id'] for o in tree['outcomes'] for b in o['benefits'] for d in b['deliverables'] for t in d['tasks']]
+    assert len([x for x in rows if x['type'] == 'risk']) == len(tree['risks'])
+
+    back = client.get(f'/projects/{pid}/backlog').json()
+    r = client.get(f'/projects/{pid}/export', params={'format': 'csv', 'what': 'backlog'})
+    assert r.headers['content-type'].startswith('text/csv')
+    rows = list(csv.DictReader(io.StringIO(r.text)))
+    assert len(rows) == back['count']
+    assert {x['task_id'] for x in rows} == {str(x['task_id']) for col in back['columns'].values() for x in col}
+
+    start = date.today().isoformat()
+    tl = client.get(f'/projects/{pid}/timeline?start={start}').json()
+    r = client.get(f'/projects/{pid}/export', params={'what': 'timeline', 'start': start})
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert [(x['task_id'], x['start'], x['end'], x['critical']) for x in rows] == \
+           [(x['task_id'], x['start'], x['end'], x['critical']) for x in tl['items']]
+
+    assert client.get('/projects/999999/export').status_code == 404
+    assert client.get(f'/projects/{pid}/export', params={'format': 'xml'}).status_code == 422
+
+def test_evidence_snapshots_dedupe_diff_and_zip():
+    import io, json, zipfile
+    from sqlmodel import select
+    from ai_pm_app.backend.app.models.entities import EvidenceBlob
+    pid = client.post('/projects/generate', json={'vision':'Evidence test'}).json()['project_id']
+    start = date.today().isoformat()
+    params = {'timeline_start': start, 'sprint_start': start}
+
+    with Session(engine) as s:
+        blobs_before = len(s.exec(select(EvidenceBlob.digest)).all())
+    base = client.post(f'/projects/{pid}/snapshots', json={'label': 'baseline', **params}).json()
+    again = client.post(f'/projects/{pid}/snapshots', json={'label': 'baseline', **params}).json()
+    assert again['panels'] == base['panels']
+    with Session(engine) as s:
+        assert len(s.exec(select(EvidenceBlob.digest)).all()) - blobs_before <= len(base['panels'])
+
+    tid = client.get(f'/projects/{pid}/backlog').json()['columns']['todo'][0]['task_id']
+    client.patch(f'/projects/tasks/{tid}', json={'status': 'done', 'done': True})
+    after = client.post(f'/projects/{pid}/snapshots', json={'label': 'after', **params}).json()
+    assert after['version'] > base['version']
+    assert after['panels']['budget'] == base['panels']['budget']
+
+    listing = client.get(f'/projects/{pid}/snapshots').json()['snapshots']
+    assert [x['id'] for x in listing] == [base['id'], again['id'], after['id']]
+    full = client.get(f'/projects/{pid}/snapshots/{after["id"]}').json()
+    assert full['data']['kpis']['tasks_by_status']['done'] == 1
+
+    diff = client.get(f'/projects/{pid}/snapshots/{base["id"]}/diff/{after["id"]}').json()
+    assert diff['panels']['budget'] == {'changed': False}
+    changes = {c['path']: c for c in diff['panels']['kpis']['changes']}
+    assert changes['tasks_by_status.done'] == {'path': 'tasks_by_status.done', 'op': 'changed', 'from': 0, 'to': 1}
+    assert any(f'[task_id={tid}]' in c['path'] for c in diff['panels']['backlog']['changes'])
+    assert client.get(f'/projects/{pid}/snapshots/999999').status_code == 404
+
+    r = client.get(f'/projects/{pid}/snapshots/evidence.zip', params={'ids': f'{base["id"]},{after["id"]}'})
+    assert r.status_code == 200 and r.headers['content-type'] == 'application/zip'
+    zf = zipfile.ZipFile(io.BytesIO(r.content))
+    names = zf.namelist()
+    assert len(names) == 2 * len(base['panels']) + 1
+    kpis = next(n for n in names if n.startswith('after_kpis_'))
+    assert json.loads(zf.read(kpis)) == full['data']['kpis']
+    assert [m['id'] for m in json.loads(zf.read('manifest.json'))] == [base['id'], after['id']]
+
+def test_evidence_zip_entry_names_ignore_hostile_labels():
+    import io, zipfile
+    pid = client.post('/projects/generate', json={'vision':'Evidence names'}).json()['project_id']
+    label = '../../etc/passwd\\C:\\x ' + 'y' * 100
+    snap = client.post(f'/projects/{pid}/snapshots', json={'label': label}).json()
+    r = client.get(f'/projects/{pid}/snapshots/evidence.zip', params={'ids': str(snap['id'])})
+    names = [n for n in zipfile.ZipFile(io.BytesIO(r.content)).namelist() if n != 'manifest.json']
+    assert names and all('/' not in n and '\\' not in n and ':' not in n for n in names)
+    slug = '.._.._etc_passwd_C_x_' + 'y' * 43  # 64 characters
+    assert f"{slug}_kpis_{pid}_" in {n[:len(slug) + len(f'_kpis_{pid}_')] for n in names}
@@ -0,0 +1,43 @@
+import os, sys
+sys.path.insert(0, os.getcwd())
+
+import time
+import pytest
+from ai_pm_app.backend.app.core.cache import MemoryCache, SQLiteCache
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make(request, tmp_path):
+    def _make(max_entries=100, max_bytes=1000, ttl=60.0):
+        if request.param == "memory":
+            return MemoryCache(max_entries, max_bytes, ttl)
+        return SQLiteCache(str(tmp_path / "cache.db"), max_entries, max_bytes, ttl)
+    return _make
+
+def test_hit_miss_and_lru_eviction(make):
+    c = make(max_entries=2)
+    c.set("a", 1, b"A"); c.set("b", 1, b"B")
+    time.sleep(0.01)
+    assert c.get("a") == b"A"          # a is now most recently used
+    c.set("c", 2, b"C")                # evicts b
+    assert c.get("b") is None
+    assert c.get("c") == b"C"
+    info = c.info()
+    assert (info["hits"], info["misses"], info["evictions"], info["entries"]) == (2, 1, 1, 2)
+
+def test_size_bound_and_ttl(make):
+    c = make(max_bytes=10)
+    c.set("a", 1, b"x" * 6); c.set("b", 1, b"y" * 6)
+    assert c.get("a") is None and c.get("b") == b"y" * 6
+    c.set("huge", 1, b"z" * 11)        # larger than the whole cache: not stored
+    assert c.get("huge") is None
+
+    c = make(ttl=0.0)
+    c.set("a", 1, b"A")
+    assert c.get("a") is None
+    assert c.info()["expirations"] == 1
+
+def test_invalidate_project(make):
+    c = make()
+    c.set("a", 1, b"A"); c.set("b", 1, b"B"); c.set("c", 2, b"C")
+    assert c.invalidate_project(1) == 2
+    assert c.get("a") is None and c.get("c") == b"C"
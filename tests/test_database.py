@@ -0,0 +1,55 @@
+import os, sys
+sys.path.insert(0, os.getcwd())
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from ai_pm_app.backend.app.core.config import Settings
+from ai_pm_app.backend.app.db.database import build_engine, build_read_engine
+
+def test_sqlite_pragmas_and_lazy_directory(tmp_path):
+    db = tmp_path / "nested" / "pm.db"
+    cfg = Settings(sqlite_busy_timeout_ms=1234, sqlite_cache_size_kib=2048)
+    eng = build_engine(f"sqlite:///{db.as_posix()}", cfg=cfg)
+    assert not db.parent.exists()  # nothing touched until the first connection
+    with eng.connect() as c:
+        assert c.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert c.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert c.execute(text("PRAGMA busy_timeout")).scalar() == 1234
+        assert c.execute(text("PRAGMA cache_size")).scalar() == -2048
+    assert eng.pool.size() == cfg.db_pool_size
+
+def test_read_only_engine_rejects_writes(tmp_path):
+    url = f"sqlite:///{(tmp_path / 'pm.db').as_posix()}"
+    with build_engine(url).begin() as c:
+        c.execute(text("CREATE TABLE t (x INTEGER)"))
+    ro = build_engine(url, read_only=True)
+    with ro.connect() as c:
+        assert c.execute(text("SELECT COUNT(*) FROM t")).scalar() == 0
+        with pytest.raises(OperationalError):
+            c.execute(text("INSERT INTO t VALUES (1)"))
+
+def test_in_memory_url_skips_pool_sizing():
+    eng = build_engine("sqlite://", cfg=Settings())
+    with eng.connect() as c:
+        assert c.execute(text("SELECT 1")).scalar() == 1
+
+def test_in_memory_database_is_shared_by_the_read_engine():
+    from concurrent.futures import ThreadPoolExecutor
+    cfg = Settings()
+    eng = build_engine("sqlite://", cfg=cfg)
+    ro = build_read_engine(eng, "sqlite://", cfg=cfg)
+    assert ro is eng
+    with eng.begin() as c:
+        c.execute(text("CREATE TABLE t (x INTEGER)"))
+        c.execute(text("INSERT INTO t VALUES (1)"))
+    def count():
+        with ro.connect() as c:
+            return c.execute(text("SELECT COUNT(*) FROM t")).scalar()
+    with ThreadPoolExecutor(1) as pool:  # request handlers run on worker threads
+        assert pool.submit(count).result() == 1
+
+def test_file_database_gets_a_separate_read_engine(tmp_path):
+    url = f"sqlite:///{(tmp_path / 'pm.db').as_posix()}"
+    eng = build_engine(url)
+    assert build_read_engine(eng, url) is not eng
@@ -0,0 +1,55 @@
+import os, sys
+sys.path.insert(0, os.getcwd())
+
+import pytest
+from fastapi.testclient import TestClient
+from ai_pm_app.backend.app.main import app
+from ai_pm_app.backend.app.core.profiling import profiler
+from ai_pm_app.backend.app.db.database import create_db_and_tables
+from ai_pm_app.backend.app.services import generation_cache as gc
+from ai_pm_app.backend.app.services import generator
+
+create_db_and_tables()
+client = TestClient(app)
+
+@pytest.fixture
+def calls(monkeypatch, tmp_path):
+    monkeypatch.setattr(gc, "generation_cache", gc.GenerationCache(str(tmp_path / "gen.db"), 100, 10**6, None))
+    n = {"llm": 0}
+    real = generator.llm_generate
+    def counting(prompt, vision):
+        n["llm"] += 1
+        return real(prompt, vision)
+    monkeypatch.setattr(generator, "llm_generate", counting)
+    return n
+
+def test_repeated_visions_hit_the_cache(calls):
+    a = client.post('/projects/generate', json={'vision': 'Onboard  PMO team'}).json()['project_id']
+    b = client.post('/projects/generate', json={'vision': ' Onboard PMO team '}).json()['project_id']
+    assert calls["llm"] == 1 and a != b
+    assert client.get(f'/projects/{b}').json()['vision'] == ' Onboard PMO team '
+
+    client.post('/projects/generate', json={'vision': 'Onboard PMO team', 'bypass_cache': True})
+    assert calls["llm"] == 2
+    info = gc.generation_cache.info()
+    assert (info["hits"], info["entries"], info["ttl_seconds"]) == (1, 1, None)
+
+def test_key_covers_prompt_version_and_model(calls, monkeypatch):
+    k = gc.generation_key("x")
+    assert gc.generation_key("  x ") == k
+    assert gc.generation_key("x", model_id="other") != k
+    monkeypatch.setattr(gc, "PROMPT_VERSION", "2")
+    assert gc.generation_key("x") != k
+
+def test_ttl_and_admin_endpoints(calls, monkeypatch, tmp_path):
+    monkeypatch.setattr(gc, "generation_cache", gc.GenerationCache(str(tmp_path / "ttl.db"), 100, 10**6, 0.0))
+    client.post('/projects/generate', json={'vision': 'Short lived'})
+    client.post('/projects/generate', json={'vision': 'Short lived'})
+    assert calls["llm"] == 2
+
+    monkeypatch.setattr("ai_pm_app.backend.app.api.admin.generation_cache", gc.generation_cache)
+    monkeypatch.setattr(profiler, "token", "t")
+    admin = {'X-Admin-Token': 't'}
+    assert client.get('/admin/generation-cache', headers=admin).json()["expirations"] == 1
+    assert client.delete('/admin/generation-cache', headers=admin).json() == {"ok": True}
+    assert client.get('/admin/generation-cache', headers=admin).json()["entries"] == 0
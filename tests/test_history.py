@@ -0,0 +1,153 @@
+import os, sys
+sys.path.insert(0, os.getcwd())
+
+from datetime import date, datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+from ai_pm_app.backend.app.main import app
+from ai_pm_app.backend.app.db.database import engine, create_db_and_tables
+from ai_pm_app.backend.app.models.entities import Task, TaskState, TaskTransition
+from ai_pm_app.backend.app.services.history import (record_transitions, flow_by_day, rebuild_flow, board_as_of,
+                                                     backfill_transitions, sprint_flow)
+
+create_db_and_tables()
+client = TestClient(app)
+
+T0 = datetime(2025, 3, 3, 9, 0)
+
+def _project(vision):
+    pid = client.post('/projects/generate', json={'vision': vision}).json()['project_id']
+    ids = [t['task_id'] for t in client.get(f'/projects/{pid}/backlog').json()['columns']['todo']]
+    return pid, ids
+
+def _flow(session, pid):
+    return [(f.day, f.done_points, f.done_tasks, f.reopened, f.started, f.cycle_tasks, f.cycle_seconds)
+            for f in flow_by_day(session, pid)]
+
+def test_patches_append_transitions_and_board_replays_them():
+    pid, ids = _project('History board')
+    before = datetime.utcnow()
+    client.patch(f'/projects/tasks/{ids[0]}', json={'status': 'inprogress'})
+    client.patch(f'/projects/tasks/{ids[0]}', json={'est_days': 4})  # no status move, no transition
+    client.patch(f'/projects/{pid}/tasks', json={'items': [{'task_id': ids[0], 'status': 'done'},
+                                                           {'task_id': ids[1], 'status': 'inprogress'}]})
+    client.patch(f'/projects/tasks/{ids[0]}', json={'done': False})  # reopened
+
+    with Session(engine) as s:
+        moves = s.exec(select(TaskTransition.task_id, TaskTransition.from_status, TaskTransition.to_status)
+                       .where(TaskTransition.project_id == pid).order_by(TaskTransition.id)).all()
+    assert moves == [(ids[0], 'todo', 'inprogress'), (ids[0], 'inprogress', 'done'),
+                     (ids[1], 'todo', 'inprogress'), (ids[0], 'done', 'inprogress')]
+
+    old = client.get(f'/projects/{pid}/history/board', params={'at': before.isoformat()}).json()
+    assert old['counts'] == {'todo': len(ids), 'inprogress': 0, 'done': 0}
+    now = client.get(f'/projects/{pid}/history/board').json()
+    assert now['counts'] == {'todo': len(ids) - 2, 'inprogress': 2, 'done': 0}
+    assert now['points']['inprogress'] == 4 + next(t['est_days'] for t in now['columns']['inprogress'] if t['id'] == ids[1])
+
+    cyc = client.get(f'/projects/{pid}/history/cycle-time', params={'sprint_days': 7, 'periods': 1}).json()
+    s1 = cyc['sprints'][0]
+    assert (s1['completed'], s1['points'], s1['reopened'], s1['started'], s1['cycle_tasks']) == (0, 0, 1, 2, 1)
+    assert client.get(f'/projects/{pid}/history/board?at=yesterday').status_code == 422
+    assert client.get('/projects/999999/history/burn').status_code == 404
+
+def test_daily_flow_matches_rebuild_and_gives_points_back_on_reopen():
+    pid, ids = _project('History flow')
+    a, b = ids[0], ids[1]
+    with Session(engine) as s:
+        record_transitions(s, pid, [(a, 'todo', 'inprogress', 3), (b, 'todo', 'inprogress', 2)], at=T0)
+        record_transitions(s, pid, [(a, 'inprogress', 'done', 3)], at=T0 + timedelta(days=2))
+        record_transitions(s, pid, [(b, 'inprogress', 'done', 2), (a, 'done', 'inprogress', 3)],
+                           at=T0 + timedelta(days=2, hours=12))
+        record_transitions(s, pid, [(a, 'inprogress', 'done', 3), (b, 'done', 'done', 2)], at=T0 + timedelta(days=5))
+        s.commit()
+        incremental = _flow(s, pid)
+        assert incremental == [
+            (date(2025, 3, 3), 0, 0, 0, 2, 0, 0.0),
+            (date(2025, 3, 5), 2, 1, 1, 0, 2, 2 * 86400 + 2.5 * 86400),
+            (date(2025, 3, 8), 3, 1, 0, 0, 1, 5 * 86400),
+        ]
+        rebuild_flow(s, pid)
+        s.commit()
+        assert _flow(s, pid) == incremental
+
+        out = sprint_flow(date(2025, 3, 3), 7, 2, flow_by_day(s, pid))
+        assert [x['completed'] for x in out['sprints']] == [2, 0]
+        assert out['sprints'][0]['avg_cycle_days'] == round(9.5 / 3, 2)
+
+        board = board_as_of(s, pid, T0 + timedelta(days=3))
+        assert {t['id'] for t in board['columns']['inprogress']} == {a}
+        assert {t['id'] for t in board['columns']['done']} == {b}
+
+def test_history_burn_and_velocity_from_flow():
+    pid, ids = _project('History burn')
+    with Session(engine) as s:
+        record_transitions(s, pid, [(ids[0], 'todo', 'done', 5)], at=T0 + timedelta(days=1))
+        record_transitions(s, pid, [(ids[0], 'done', 'todo', 5)], at=T0 + timedelta(days=3))
+        s.commit()
+    burn = client.get(f'/projects/{pid}/history/burn', params={'start': '2025-03-03', 'sprint_days': 4}).json()
+    total = burn['actual'][0]
+    assert burn['actual'] == [total, total - 5, total - 5, total, total]
+    vel = client.get(f'/projects/{pid}/history/velocity', params={'start': '2025-03-03', 'sprint_days': 7, 'periods': 1}).json()
+    assert vel['velocity'] == [0]
+
+def test_board_leaves_out_tasks_created_after_at():
+    pid, ids = _project('History late task')
+    at = datetime.utcnow()
+    with Session(engine) as s:
+        late = Task(deliverable_id=s.get(Task, ids[0]).deliverable_id, name='Added later', est_days=2,
+                    created_at=at + timedelta(seconds=1))
+        legacy = s.get(Task, ids[1])
+        legacy.created_at = None  # predates the column: assumed to have existed all along
+        s.add_all([late, legacy])
+        s.commit()
+        late_id = late.id
+    old = client.get(f'/projects/{pid}/history/board', params={'at': at.isoformat()}).json()
+    assert {t['id'] for t in old['columns']['todo']} == set(ids)
+    later = client.get(f'/projects/{pid}/history/board', params={'at': (at + timedelta(seconds=2)).isoformat()}).json()
+    assert {t['id'] for t in later['columns']['todo']} == set(ids) | {late_id}
+
+def test_backfill_seeds_one_move_per_task_without_history():
+    pid, ids = _project('History backfill')
+    with Session(engine) as s:
+        s.add(TaskState(task_id=ids[0], status='done', done=True, updated_at=T0))
+        s.add(TaskState(task_id=ids[1], status='inprogress', updated_at=T0))
+        s.commit()
+        assert backfill_transitions(s, pid) == {'backfilled': 2, 'projects': 1}
+        s.commit()
+        assert backfill_transitions(s, pid)['backfilled'] == 0
+        pts = s.exec(select(TaskTransition.points).where(TaskTransition.task_id == ids[0])).one()
+        assert _flow(s, pid) == [(date(2025, 3, 3), pts, 1, 0, 1, 0, 0.0)]
+
+def test_reopen_takes_back_the_points_credited_at_completion():
+    pid, ids = _project('History repoint')
+    tid = ids[0]
+    client.patch(f'/projects/tasks/{tid}', json={'est_days': 3})
+    client.patch(f'/projects/tasks/{tid}', json={'status': 'done'})
+    client.patch(f'/projects/tasks/{tid}', json={'est_days': 8})  # re-estimated while done
+    client.patch(f'/projects/tasks/{tid}', json={'done': False})
+    with Session(engine) as s:
+        incremental = _flow(s, pid)
+        assert [row[1:4] for row in incremental] == [(0, 0, 1)]  # done_points, done_tasks, reopened
+        rebuild_flow(s, pid)
+        s.commit()
+        assert _flow(s, pid) == incremental
+
+def test_daily_rows_are_upserted_in_one_statement():
+    from sqlalchemy import event
+    pid, ids = _project('History upsert')
+    seen = []
+    def on_exec(_conn, _cur, statement, *_a):
+        if 'taskflowdaily' in statement.lower():
+            seen.append(statement.lower())
+    event.listen(engine, "before_cursor_execute", on_exec)
+    try:
+        for tid in ids[:2]:  # separate sessions, same day: the second hits the conflict path
+            with Session(engine) as s:
+                record_transitions(s, pid, [(tid, 'todo', 'done', 2)], at=T0)
+                s.commit()
+    finally:
+        event.remove(engine, "before_cursor_execute", on_exec)
+    assert len(seen) == 2 and all('on conflict' in stmt for stmt in seen)
+    with Session(engine) as s:
+        assert _flow(s, pid) == [(T0.date(), 4, 2, 0, 0, 0, 0.0)]
@@ -0,0 +1,48 @@
+import os, sys, logging
+sys.path.insert(0, os.getcwd())
+
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlmodel import Session, create_engine
+from ai_pm_app.backend.app.main import app
+from ai_pm_app.backend.app.db.database import create_db_and_tables
+from ai_pm_app.backend.app.core.instrumentation import (InstrumentedRoute, RequestInstrumentationMiddleware,
+                                                       instrument_engines)
+
+create_db_and_tables()
+client = TestClient(app)
+
+def _timing(header):
+    return {p.split(";")[0].strip(): p for p in header.split(",")}
+
+def test_server_timing_counts_project_queries():
+    pid = client.post('/projects/generate', json={'vision': 'Instrumented'}).json()['project_id']
+    r = client.get(f'/projects/{pid}/backlog')
+    parts = _timing(r.headers['server-timing'])
+    assert {'db', 'handler', 'serialize', 'total'} <= set(parts)
+    # the ETag version lookup plus the backlog reads
+    assert int(parts['db'].split('desc="')[1].split()[0]) >= 2
+
+def test_repeated_statement_is_flagged_and_logged(caplog):
+    eng = create_engine("sqlite://")
+    instrument_engines(eng)
+    router = APIRouter(route_class=InstrumentedRoute)
+
+    @router.get("/loop/{n}")
+    def loop(n: int):
+        with Session(eng) as s:
+            return [s.execute(text("SELECT :i"), {"i": i}).scalar() for i in range(n)]
+
+    mini = FastAPI()
+    mini.include_router(router)
+    mini.add_middleware(RequestInstrumentationMiddleware, threshold=5, slow_ms=10_000)
+    c = TestClient(mini)
+
+    with caplog.at_level(logging.WARNING, logger="ai_pm_app.requests"):
+        quiet = c.get("/loop/4")
+        noisy = c.get("/loop/6")
+    assert 'desc="4 queries"' in quiet.headers['server-timing'] and 'n-plus-one' not in quiet.headers['server-timing']
+    assert 'n-plus-one;desc="6x SELECT ?"' in noisy.headers['server-timing']
+    # only the flagged request is logged: neither is slower than 10s
+    assert len(caplog.records) == 1 and "/loop/6" in caplog.records[0].getMessage()
@@ -0,0 +1,56 @@
+import os, sys, time
+sys.path.insert(0, os.getcwd())
+
+import pytest
+from fastapi.testclient import TestClient
+from ai_pm_app.backend.app.main import app
+from ai_pm_app.backend.app.core.config import settings
+from ai_pm_app.backend.app.db.database import create_db_and_tables
+from ai_pm_app.backend.app.services import jobs
+from ai_pm_app.backend.app.services.jobs import JobQueue, QueueFull
+
+create_db_and_tables()
+client = TestClient(app)
+
+def _wait(get, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = get()
+        if job["status"] in ("succeeded", "failed"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError("job did not finish")
+
+def test_job_runs_pipeline_and_reports_project():
+    r = client.post('/jobs/generate', json={'vision': 'Queued vision'})
+    assert r.status_code == 202
+    job = _wait(lambda: client.get(r.json()['url']).json())
+    assert job['status'] == 'succeeded' and job['stage'] == 'done'
+    assert client.get(f"/projects/{job['project_id']}").json()['vision'] == 'Queued vision'
+    assert client.get('/jobs/nope').status_code == 404
+    assert client.get('/jobs').json()['succeeded'] >= 1
+
+def test_queue_cap_and_concurrency(monkeypatch):
+    monkeypatch.setattr(settings, "llm_fake_latency_ms", 150)
+    q = JobQueue(workers=2, max_queued=2)
+    try:
+        t0 = time.monotonic()
+        submitted = [q.submit(f"v{i}", use_cache=False) for i in range(4)]  # 2 start running, 2 wait
+        time.sleep(0.02)
+        with pytest.raises(QueueFull):
+            for _ in range(3):
+                q.submit("overflow", use_cache=False)
+        for j in submitted:
+            _wait(lambda: j.as_dict())
+        # four 150ms generations on two workers take about two rounds, not four
+        assert time.monotonic() - t0 < 0.55
+        assert q.info()['succeeded'] >= 4 and q.info()['running'] == 0
+    finally:
+        q.shutdown()
+
+def test_full_queue_returns_429(monkeypatch):
+    monkeypatch.setattr(jobs.job_queue, "max_queued", 0)
+    r = client.post('/jobs/generate', json={'vision': 'Refused'})
+    assert r.status_code == 429
+    assert r.headers['retry-after'] == '1'
+    assert 'queue' in r.json()['detail'].lower()
@@ -0,0 +1,43 @@
+import os, sys, threading
+sys.path.insert(0, os.getcwd())
+
+from fastapi.testclient import TestClient
+from ai_pm_app.backend.app.main import app
+from ai_pm_app.backend.app.db.database import create_db_and_tables
+from ai_pm_app.backend.app.core.metrics import Histogram
+
+create_db_and_tables()
+client = TestClient(app)
+
+def test_histogram_buckets_merge_across_threads():
+    h = Histogram("t_seconds", "test", ("route",), buckets=(0.1, 1.0))
+    def work():
+        for v in (0.05, 0.1, 0.5, 3.0):
+            h.observe(("/x",), v)
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    cum, total = h.snapshot()[("/x",)]
+    assert cum == [8, 12, 16]  # le=0.1 is inclusive
+    assert abs(total - 4 * 3.65) < 1e-9
+    text = "\n".join(h.render())
+    assert 't_seconds_bucket{route="/x",le="+Inf"} 16' in text and 't_seconds_count{route="/x"} 16' in text
+
+def test_metrics_use_route_templates():
+    pid = client.post('/projects/generate', json={'vision': 'Metrics'}).json()['project_id']
+    etag = client.get(f'/projects/{pid}/burn').headers['etag']
+    assert client.get(f'/projects/{pid}/burn', headers={'If-None-Match': etag}).status_code == 304
+    client.get('/no/such/path')
+
+    r = client.get('/metrics')
+    assert r.headers['content-type'].startswith('text/plain; version=0.0.4')
+    text = r.text
+    # the 304 is answered before routing but still gets the template label
+    assert 'http_request_duration_seconds_count{method="GET",route="/projects/{project_id}/burn",status="304"}' in text
+    assert 'route="unmatched",status="404"' in text
+    assert f'/projects/{pid}/burn' not in text
+    assert 'http_requests_in_flight 1' in text  # the /metrics request itself
+    assert 'db_session_checkout_seconds_count{engine="read"}' in text
+    assert 'http_response_size_bytes_bucket{method="GET",route="/projects/{project_id}/burn",le="+Inf"}' in text
@@ -0,0 +1,73 @@
+import os, sys
+sys.path.insert(0, os.getcwd())
+
+import pstats
+import pytest
+from fastapi.testclient import TestClient
+from ai_pm_app.backend.app.main import app
+from ai_pm_app.backend.app.db.database import create_db_and_tables
+from ai_pm_app.backend.app.core.profiling import profiler
+
+create_db_and_tables()
+client = TestClient(app)
+ADMIN = {'X-Admin-Token': 's3cret'}
+
+@pytest.fixture
+def prof(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiler, "dir", tmp_path)
+    monkeypatch.setattr(profiler, "token", "s3cret")
+    monkeypatch.setattr(profiler, "keep", 2)
+    return profiler
+
+def test_profiling_is_off_without_token_or_sampling(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiler, "dir", tmp_path)
+    pid = client.post('/projects/generate', json={'vision': 'Unprofiled'}).json()['project_id']
+    r = client.get(f'/projects/{pid}/backlog?__profile=1')
+    assert r.status_code == 200 and 'x-profile-id' not in r.headers
+    assert not list(tmp_path.iterdir())
+
+def test_admin_gated_profile_is_stored_and_listed(prof, tmp_path_factory):
+    pid = client.post('/projects/generate', json={'vision': 'Profiled'}).json()['project_id']
+    assert 'x-profile-id' not in client.get(f'/projects/{pid}/kpis?__profile=1').headers
+    assert 'x-profile-id' not in client.get(f'/projects/{pid}/kpis?__profile=1',
+                                            headers={'X-Admin-Token': 'wrong'}).headers
+
+    r = client.get(f'/projects/{pid}/backlog?__profile=1', headers={'X-Admin-Token': 's3cret'})
+    assert r.status_code == 200
+    prof_id = r.headers['x-profile-id']
+    listed = client.get('/admin/profiles', headers=ADMIN).json()['profiles']
+    assert listed[0]['id'] == prof_id and listed[0]['route'] == '/projects/{project_id}/backlog'
+
+    doc = client.get(f'/admin/profiles/{prof_id}', headers=ADMIN).json()
+    assert doc['tree'] and doc['functions'] and doc['trigger'] == 'request'
+    # the read-cache wrapper is the root; the handler itself ran below it (cold cache)
+    folded = client.get(f'/admin/profiles/{prof_id}/collapsed', headers=ADMIN).text
+    assert ';backlog (' in folded
+    raw = client.get(f'/admin/profiles/{prof_id}/pstats', headers=ADMIN)
+    dl = tmp_path_factory.mktemp('dl') / 'dl.prof'
+    dl.write_bytes(raw.content)
+    pstats.Stats(str(dl))  # loads
+    assert client.get('/admin/profiles/..%2Fnope', headers=ADMIN).status_code == 404
+
+    # header trigger; the ring buffer keeps the newest two
+    for _ in range(2):
+        client.get(f'/projects/{pid}/kpis', headers={'X-Profile': '1', 'X-Admin-Token': 's3cret'})
+    listed = client.get('/admin/profiles', headers=ADMIN).json()['profiles']
+    assert len(listed) == 2 and prof_id not in {p['id'] for p in listed}
+    assert len(list(prof.dir.glob('*.prof'))) == 2
+
+def test_sampling_profiles_every_nth_request(prof, monkeypatch):
+    monkeypatch.setattr(profiler, "token", None)
+    monkeypatch.setattr(profiler, "sample_every", 3)
+    hits = [('x-profile-id' in client.get('/jobs').headers) for _ in range(6)]
+    assert sum(hits) == 2
+
+def test_admin_routes_need_the_admin_token(prof, monkeypatch):
+    for method, url in [('get', '/admin/profiles'), ('delete', '/admin/profiles'), ('get', '/admin/cache'),
+                        ('post', '/admin/activity/compact'), ('post', '/admin/history/backfill')]:
+        assert getattr(client, method)(url).status_code == 403
+        assert getattr(client, method)(url, headers={'X-Admin-Token': 'wrong'}).status_code == 403
+    assert client.get('/admin/profiles', headers=ADMIN).status_code == 200
+    monkeypatch.setattr(profiler, "token", None)
+    r = client.get('/admin/cache', headers=ADMIN)
+    assert r.status_code == 403 and 'disabled' in r.json()['detail']
@@ -0,0 +1,79 @@
+import os, sys, json
+sys.path.insert(0, os.getcwd())
+
+from datetime import date, datetime
+from decimal import Decimal
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+from ai_pm_app.backend.app.main import app
+from ai_pm_app.backend.app.db.database import create_db_and_tables
+from ai_pm_app.backend.app.core import responses
+from ai_pm_app.backend.app.core.responses import dumps
+
+create_db_and_tables()
+client = TestClient(app)
+
+class Item(BaseModel):
+    id: int
+    due: date
+
+def _reference(content):
+    return json.loads(json.dumps(jsonable_encoder(content)))
+
+def test_dumps_matches_default_encoding(monkeypatch):
+    content = {"tasks": [{"id": 1, "name": "Ünïcode", "est": 2.5, "done": None}],
+               "day": date(2025, 1, 6), "at": datetime(2025, 1, 6, 12, 30, 5, 123456),
+               "model": Item(id=3, due=date(2025, 2, 1)), "tags": {"x"}, "money": Decimal("1.5"),
+               "by_day": {date(2025, 1, 6): 3}, "matrix": {1: {2: 4}}}
+    expected = _reference(content)
+    assert json.loads(dumps(content)) == expected
+    monkeypatch.setattr(responses, "orjson", None)  # stdlib fallback
+    assert json.loads(dumps(content)) == expected
+
+def test_large_reads_are_gzipped_when_accepted():
+    pid = client.post('/projects/generate', json={'vision': 'Compressed'}).json()['project_id']
+    r = client.get(f'/projects/{pid}/export?what=tree', headers={'Accept-Encoding': 'gzip'})
+    assert r.headers.get('content-encoding') == 'gzip' and 'content-length' not in r.headers  # streamed
+    assert r.text.count('\n') >= 1
+
+    tree = client.get(f'/projects/{pid}', headers={'Accept-Encoding': 'gzip'})
+    plain = client.get(f'/projects/{pid}', headers={'Accept-Encoding': 'gzip;q=0, identity'})
+    assert 'content-encoding' not in plain.headers and tree.json() == plain.json()
+    assert len(plain.content) >= 1024 and tree.headers['content-encoding'] == 'gzip'
+    assert tree.num_bytes_downloaded < plain.num_bytes_downloaded
+    assert 'content-encoding' not in client.get('/health', headers={'Accept-Encoding': 'gzip'}).headers
+
+def test_zip_is_not_recompressed():
+    pid = client.post('/projects/generate', json={'vision': 'Zipped'}).json()['project_id']
+    client.post(f'/projects/{pid}/snapshots', json={'label': 'baseline'})
+    r = client.get(f'/projects/{pid}/snapshots/evidence.zip', headers={'Accept-Encoding': 'gzip'})
+    assert r.status_code == 200 and 'content-encoding' not in r.headers
+    assert r.content[:2] == b'PK'
+
+def _asgi(chunks, headers=()):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json"), *headers]})
+        for i, c in enumerate(chunks):
+            await send({"type": "http.response.body", "body": c, "more_body": i < len(chunks) - 1})
+    return TestClient(responses.CompressionMiddleware(app, minimum_size=100, compresslevel=6))
+
+def test_compression_middleware_streams_and_respects_thresholds():
+    import gzip
+    rows = [(b'{"row": %d}\n' % i) * 50 for i in range(4)]
+    r = _asgi(rows).get('/', headers={'Accept-Encoding': 'gzip'})
+    assert r.headers['content-encoding'] == 'gzip' and 'content-length' not in r.headers
+    assert r.headers['vary'] == 'Accept-Encoding' and r.content == b''.join(rows)
+
+    one = _asgi([b'x' * 500], headers=[(b"content-length", b"500")]).get('/', headers={'Accept-Encoding': 'gzip'})
+    assert one.headers['content-encoding'] == 'gzip' and int(one.headers['content-length']) < 500
+    assert one.content == b'x' * 500
+
+    for client_, headers in [(_asgi([b'x' * 50]), {'Accept-Encoding': 'gzip'}),
+                             (_asgi([b'x' * 500]), {'Accept-Encoding': 'gzip;q=0'}),
+                             (_asgi([gzip.compress(b'x' * 500)], headers=[(b"content-encoding", b"gzip")]),
+                              {'Accept-Encoding': 'gzip'})]:
+        r = client_.get('/', headers=headers)
+        assert 'vary' not in r.headers
+        assert r.headers.get('content-encoding') in (None, 'gzip') and len(r.content) in (50, 500)
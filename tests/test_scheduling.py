@@ -0,0 +1,32 @@
+import os, sys
+sys.path.insert(0, os.getcwd())
+
+import pytest
+from ai_pm_app.backend.app.services.scheduling import compute_schedule, ScheduleCycleError
+
+def test_critical_path_and_slack():
+    # 0 -> 1 -> 3 (3+5+1 = 9 days) and 0 -> 2 (3+2 = 5 days)
+    durations = [3, 5, 2, 1]
+    preds = [-1, 0, 0, 1]
+    s = compute_schedule(durations, preds)
+    assert s.makespan == 9
+    assert s.es == [0, 3, 3, 8]
+    assert s.ef == [3, 8, 5, 9]
+    assert s.lf == [3, 8, 9, 9]
+    assert s.slack == [0, 0, 4, 0]
+    assert s.critical == [True, True, False, True]
+
+def test_independent_tasks_run_in_parallel():
+    s = compute_schedule([2, 4], [-1, -1])
+    assert s.es == [0, 0]
+    assert s.makespan == 4
+    assert s.slack == [2, 0]
+
+def test_cycle_is_reported():
+    with pytest.raises(ScheduleCycleError) as e:
+        compute_schedule([1, 1, 1, 1], [-1, 2, 3, 1])
+    assert sorted(e.value.cycle) == [1, 2, 3]
+
+def test_empty_plan():
+    s = compute_schedule([], [])
+    assert s.makespan == 0 and s.order == []
@@ -0,0 +1,65 @@
+import os, sys
+sys.path.insert(0, os.getcwd())
+
+import json
+import pytest
+from ai_pm_app.backend.app.models.schemas import GenValidationError, parse_generated
+from ai_pm_app.backend.app.services.generator import llm_generate_fixture
+
+def _plan(tasks):
+    raw = llm_generate_fixture("Schema test")
+    raw["outcomes"][0]["benefits"][0]["deliverables"][0]["tasks"] = tasks
+    return raw
+
+def test_json_and_dict_paths_agree():
+    raw = llm_generate_fixture("Schema test")
+    assert parse_generated(json.dumps(raw).encode()) == parse_generated(raw)
+
+def test_model_output_is_validated_from_raw_json(monkeypatch):
+    from ai_pm_app.backend.app.db.database import engine, create_db_and_tables
+    from ai_pm_app.backend.app.services import generator
+    from sqlmodel import Session
+    seen = []
+    def spy(raw):
+        seen.append(type(raw))
+        return parse_generated(raw)
+    monkeypatch.setattr(generator, "validate_generated", spy)
+    create_db_and_tables()
+    with Session(engine) as s:
+        generator.generate_and_persist(s, "Raw JSON path", use_cache=False)
+    assert seen == [bytes]
+
+def test_dependency_index_out_of_range_is_reported_per_field():
+    raw = _plan([{"name": "a", "est_days": 1}, {"name": "b", "est_days": 1, "depends_on_index": 5}])
+    with pytest.raises(GenValidationError) as e:
+        parse_generated(json.dumps(raw))
+    [err] = e.value.errors
+    assert err["loc"] == "outcomes.0.benefits.0.deliverables.0.tasks.1.depends_on_index"
+    assert err["type"] == "dependency_index"
+
+def test_dependency_cycle_and_field_errors():
+    raw = _plan([{"name": "a", "est_days": 1, "depends_on_index": 2},
+                 {"name": "b", "est_days": 1, "depends_on_index": 0},
+                 {"name": "c", "est_days": 1, "depends_on_index": 1},
+                 {"name": "d", "est_days": 1, "depends_on_index": 3}])
+    with pytest.raises(GenValidationError) as e:
+        parse_generated(raw)
+    assert e.value.errors[0]["type"] == "dependency_cycle"
+    assert "0, 2, 1" in e.value.errors[0]["msg"]
+
+    raw = _plan([{"name": "a", "est_days": 0}])
+    raw["risks"][0]["impact"] = 9
+    raw["outcomes"][1]["benefits"][0]["deliverables"][0]["tasks"][0]["depends_on_index"] = 1  # 0 <-> 1
+    with pytest.raises(GenValidationError) as e:
+        parse_generated(json.dumps(raw))
+    # every failing field is reported from the one pass, not just the first
+    locs = {x["loc"] for x in e.value.errors}
+    assert locs == {"outcomes.0.benefits.0.deliverables.0.tasks.0.est_days",
+                    "outcomes.1.benefits.0.deliverables.0.tasks.0.depends_on_index", "risks.0.impact"}
+
+def test_at_least_one_outcome():
+    raw = llm_generate_fixture("Schema test")
+    raw["outcomes"] = []
+    with pytest.raises(GenValidationError) as e:
+        parse_generated(raw)
+    assert e.value.errors[0]["loc"] == "outcomes"
@@ -0,0 +1,46 @@
+import os, sys, gzip, time
+sys.path.insert(0, os.getcwd())
+
+import pathlib
+from fastapi.testclient import TestClient
+from ai_pm_app.backend.app.main import app
+from ai_pm_app.backend.app.core.assets import AssetStore, accepted_codings, choose_variant
+
+client = TestClient(app)
+UI_DIR = pathlib.Path("ai_pm_app/backend/app/ui")
+
+def test_pages_are_compressed_and_revalidated():
+    raw = (UI_DIR / "dashboard.html").read_bytes()
+    r = client.get('/dashboard', headers={'Accept-Encoding': 'gzip'})
+    assert r.status_code == 200 and r.headers['content-encoding'] == 'gzip'
+    assert int(r.headers['content-length']) < len(raw)
+    assert r.content == raw  # httpx decodes the gzip body
+    assert r.headers['cache-control'] == 'no-cache' and r.headers['vary'] == 'Accept-Encoding'
+
+    plain = client.get('/dashboard', headers={'Accept-Encoding': 'identity'})
+    assert 'content-encoding' not in plain.headers and plain.content == raw
+    assert plain.headers['etag'] != r.headers['etag'] and not plain.headers['etag'].startswith('W/')
+
+    again = client.get('/dashboard', headers={'Accept-Encoding': 'gzip', 'If-None-Match': r.headers['etag']})
+    assert again.status_code == 304 and again.content == b''
+    assert client.get('/assets/nope.123.js').status_code == 404
+
+def test_accept_encoding_q_values():
+    assert accepted_codings('gzip;q=0, br;q=0.5, *') == {'gzip': 0.0, 'br': 0.5, '*': 1.0}
+
+def test_bundles_get_hashed_immutable_urls_and_reload(tmp_path):
+    (tmp_path / "app.js").write_text("console.log('v1');" * 50)
+    (tmp_path / "page.html").write_text('<script src="{{ asset:app.js }}"></script>')
+    store = AssetStore(tmp_path, reload=True, poll_seconds=0)
+    url = store.url("app.js")
+    assert url.startswith("/assets/app.") and url.endswith(".js")
+    page = store.get("page.html")
+    assert url.encode() in page.body
+    coding, body = choose_variant(store.get_hashed(url[len("/assets/"):]), "gzip, deflate")
+    assert coding == "gzip" and gzip.decompress(body) == (tmp_path / "app.js").read_bytes()
+
+    time.sleep(0.01)
+    (tmp_path / "app.js").write_text("console.log('v2');" * 50)
+    new_page = store.get("page.html")
+    assert store.url("app.js") != url and store.url("app.js").encode() in new_page.body
+    assert new_page.digest != page.digest and store.get_hashed(url[len("/assets/"):]) is None